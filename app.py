@@ -10,16 +10,29 @@ import pandas as pd
 from datetime import datetime, date, timedelta
 import time
 import random
+from functools import wraps
 
 from database import (
-    init_db, register_user, login_user, save_design_request,
+    init_db, register_user, login_user, save_design_request_async,
     get_user_designs, get_all_designers, create_booking,
     get_user_bookings, admin_stats, admin_all_users, admin_all_bookings,
 )
 from database import (
-    update_booking_status
+    update_booking_status, get_free_slots, SlotTakenError, TIME_SLOTS,
+    search_designers, count_designers, booking_events,
 )
-from ai_engine import generate_recommendations, COLOR_PALETTES, BUDGET_ADVICE
+from ai_engine import generate_recommendations
+from matching import DesignerIndex, match_score
+from images import portrait_url, initials_avatar
+from payment_qr import UPI_ID, upi_qr_png
+from moodboard import render_moodboard
+from report import get_report, submit_report, wait_for_report
+from similarity import get_index as similarity_index
+import tracing
+import metrics
+from sessions import RESUME_TTL, get_store
+from ratelimit import RateLimited, client_key
+from knowledge import current as knowledge_base
 
 # ── Page Config ────────────────────────────────────────────────────────────────
 st.set_page_config(
@@ -397,17 +410,77 @@ header {visibility: hidden;}
 # ── Initialise DB & Session State ───────────────────────────────────────────────
 init_db()
 
-def init_session():
-    defaults = {
-        "logged_in": False, "user": None,
-        "page": "home", "last_design": None,
-        "show_results": False,
-    }
-    for k, v in defaults.items():
-        if k not in st.session_state:
-            st.session_state[k] = v
+RERUNS = metrics.counter("app_reruns_total", "Script runs (initial loads and reruns) across all sessions.")
+SESSIONS = metrics.counter("app_sessions_total", "Browser sessions started; reruns per session = reruns / sessions.")
+
+def _lru_lookups():
+    stats = {}
+    for cache, fn in (("upi_qr", upi_qr_png), ("initials_avatar", initials_avatar),
+                      ("moodboard", render_moodboard)):
+        info = fn.cache_info()
+        stats[(cache, "hit")], stats[(cache, "miss")] = info.hits, info.misses
+    return stats
+
+metrics.counter("app_lru_lookups_total", "Memoised renderer lookups by result.", ("cache", "result"), fn=_lru_lookups)
+metrics.start_http_server()
 
-init_session()
+HOT_SESSIONS = metrics.gauge("app_hot_sessions", "Sessions held in this process's memory.",
+                             fn=lambda: {(): get_store().hot_count()})
+
+SESSION_DEFAULTS = {
+    "logged_in": False, "user": None,
+    "page": "home", "last_design": None,
+    "show_results": False,
+}
+
+def init_session():
+    """This browser session's server-side state; only its id is kept in Streamlit state.
+
+    A new Streamlit session (a reload, or a reconnect after a restart or to
+    another worker) finds it again through the single-use resume token in the
+    URL, which swaps it for a fresh id – the id itself never goes in the URL.
+    """
+    store = get_store()
+    sid = st.session_state.get("sid")
+    session = store.get(sid) if sid else None
+    if session is None and st.query_params.get("resume"):
+        session = store.resume(st.query_params["resume"])
+    if session is None:
+        session = store.create()
+        SESSIONS.inc()
+    _bind_session(session)
+    _apply_defaults(session)
+    return session
+
+def _apply_defaults(s):
+    for k, v in SESSION_DEFAULTS.items():
+        if k not in s:
+            s[k] = v
+
+def _bind_session(s):
+    if st.session_state.get("sid") != s.id:
+        st.session_state.sid = s.id
+    st.query_params.pop("sid", None)  # links from before resume tokens
+    # Re-issued while the tab is in use, so the token in its URL outlives a short pause
+    if (st.session_state.get("resume_sid") != s.id
+            or time.time() - st.session_state.get("resume_at", 0) > RESUME_TTL / 2):
+        token = get_store().issue_resume(s, revoke=st.session_state.get("resume"))
+        st.session_state.resume, st.session_state.resume_sid = token, s.id
+        st.session_state.resume_at = time.time()
+        st.query_params["resume"] = token
+
+def rotate_session():
+    """Issue a new session id on login/logout, so an id seen before can't be reused.
+
+    Nothing carries over – the next user must not inherit the wizard or a booking in progress.
+    """
+    global session
+    session = get_store().rotate(session)
+    _apply_defaults(session)
+    _bind_session(session)
+
+session = init_session()
+RERUNS.inc()
 
 
 # ── Helper Components ──────────────────────────────────────────────────────────
@@ -431,6 +504,17 @@ def section_header(icon, title):
         <h2 class="section-title">{title}</h2>
     </div>""", unsafe_allow_html=True)
 
+@st.cache_resource(ttl=300)
+def designer_index():
+    return DesignerIndex(get_all_designers())
+
+def current_design_prefs():
+    """(furniture_style, budget) from the wizard session, else the user's latest saved design."""
+    if session.get("w_furniture_style"):
+        return session.w_furniture_style, session.get("w_budget")
+    designs = get_user_designs(session.user['id'])
+    return (designs[0]['furniture_style'], designs[0]['budget']) if designs else (None, None)
+
 def toast_success(msg):
     st.markdown(f'<div class="success-toast">✅ {msg}</div>', unsafe_allow_html=True)
 
@@ -449,30 +533,32 @@ def render_header():
         st.markdown('<h2 style="margin:0; color:#8B5E3C;">🏠 InteriorAI</h2>', unsafe_allow_html=True)
 
     with col_nav:
-        is_logged_in = st.session_state.get('logged_in', False)
-        user = st.session_state.get('user', {})
+        is_logged_in = session.get('logged_in', False)
+        user = session.get('user', {})
         role = user.get('role', 'user') if user else 'user'
 
         if is_logged_in:
             # --- DIFFERENT MENUS FOR ADMIN VS USER ---
             if role == 'admin':
                 # Admin Menu: Only Management Options
-                cols = st.columns(4)
+                cols = st.columns(5)
                 nav_items = [
                     ("📊 Dashboard", "admin"), 
                     ("👥 Users", "admin_users"), 
                     ("📋 Bookings & UTR", "admin_bookings"), 
+                    ("⏱️ Performance", "admin_performance"),
                 ]
                 # Render Admin Buttons
                 for i, (label, page_key) in enumerate(nav_items):
                     if cols[i].button(label, key=f"head_{page_key}", use_container_width=True):
-                        st.session_state.page = page_key
+                        session.page = page_key
                         st.rerun()
                 # Logout Button for Admin
-                if cols[3].button("🚪 Logout", type="secondary", use_container_width=True):
-                    st.session_state.logged_in = False
-                    st.session_state.user = None
-                    st.session_state.page = "home"
+                if cols[4].button("🚪 Logout", type="secondary", use_container_width=True):
+                    session.logged_in = False
+                    session.user = None
+                    session.page = "home"
+                    rotate_session()
                     st.rerun()
 
             else:
@@ -485,22 +571,23 @@ def render_header():
                 ]
                 for i, (label, page_key) in enumerate(nav_items):
                     if cols[i].button(label, key=f"head_{page_key}", use_container_width=True):
-                        st.session_state.page = page_key
+                        session.page = page_key
                         st.rerun()
                 if cols[6].button("🚪 Logout", type="secondary", use_container_width=True):
-                    st.session_state.logged_in = False
-                    st.session_state.user = None
-                    st.session_state.page = "home"
+                    session.logged_in = False
+                    session.user = None
+                    session.page = "home"
+                    rotate_session()
                     st.rerun()
         else:
             # Guest Menu
             cols = st.columns([3, 1, 1, 1])
             if cols[1].button("🏠 Home", use_container_width=True):
-                st.session_state.page = "home"; st.rerun()
+                session.page = "home"; st.rerun()
             if cols[2].button("🔐 Login", use_container_width=True):
-                st.session_state.page = "login"; st.rerun()
+                session.page = "login"; st.rerun()
             if cols[3].button("📝 Register", use_container_width=True, type="primary"):
-                st.session_state.page = "register"; st.rerun()
+                session.page = "register"; st.rerun()
     st.markdown("---")
 
 # ── Pages ──────────────────────────────────────────────────────────────────────
@@ -603,6 +690,17 @@ def page_home():
     """, unsafe_allow_html=True)
 
 
+def client_address():
+    """The browser's address for per-client rate limits, or None when Streamlit can't tell.
+
+    X-Forwarded-For counts only behind a trusted proxy (TRUST_FORWARDED_FOR, set by cluster.py);
+    otherwise a client could pick its own key by sending the header itself.
+    """
+    context = getattr(st, "context", None)  # Streamlit >= 1.37
+    if context is None:
+        return None
+    return client_key(context.headers, getattr(context, "ip_address", None))
+
 def page_login():
     st.markdown('<div class="auth-container">', unsafe_allow_html=True)
     section_header("🔐", "Welcome Back")
@@ -620,16 +718,21 @@ def page_login():
         if not email or not password:
             toast_warning("Please fill in all fields.")
         else:
-            with st.spinner("Authenticating..."):
-                time.sleep(0.5)
-                user = login_user(email, password)
-            if user:
-                st.session_state.logged_in = True
-                st.session_state.user = user
-                st.session_state.page = "admin" if user['role'] == 'admin' else "dashboard"
-                st.rerun()
+            try:
+                with st.spinner("Authenticating..."):
+                    time.sleep(0.5)
+                    user = login_user(email, password, client=client_address())
+            except RateLimited as e:
+                toast_warning(f"Too many login attempts. Please wait {e.retry_after:.0f} seconds and try again.")
             else:
-                toast_warning("Invalid email or password. Please try again.")
+                if user:
+                    rotate_session()
+                    session.logged_in = True
+                    session.user = user
+                    session.page = "admin" if user['role'] == 'admin' else "dashboard"
+                    st.rerun()
+                else:
+                    toast_warning("Invalid email or password. Please try again.")
 
     st.markdown("---")
     st.markdown("""
@@ -672,7 +775,7 @@ def page_register():
             if success:
                 toast_success(f"Account created! Welcome, {name}. Please login.")
                 time.sleep(1)
-                st.session_state.page = "login"
+                session.page = "login"
                 st.rerun()
             else:
                 toast_warning(msg)
@@ -681,7 +784,7 @@ def page_register():
 
 
 def page_dashboard():
-    user = st.session_state.user
+    user = session.user
     hour = datetime.now().hour
     greeting = "Good Morning" if hour < 12 else "Good Afternoon" if hour < 17 else "Good Evening"
 
@@ -732,7 +835,7 @@ def page_dashboard():
                 st.markdown(f"**{label}**  \n<small style='color:#6B5A4A;'>{desc}</small>", unsafe_allow_html=True)
             with col_b:
                 if st.button("Go →", key=f"qa_{page_key}", use_container_width=True):
-                    st.session_state.page = page_key
+                    session.page = page_key
                     st.rerun()
             st.markdown("<hr style='border-color:#F0EAE2;margin:10px 0;'>", unsafe_allow_html=True)
 
@@ -773,7 +876,7 @@ def page_design_wizard():
     """, unsafe_allow_html=True)
 
     # Step indicator
-    step = st.session_state.get("wizard_step", 1)
+    step = session.get("wizard_step", 1)
     st.markdown(f"""
     <div class="step-indicator">
         <div class="step">
@@ -799,54 +902,62 @@ def page_design_wizard():
     </div>
     """, unsafe_allow_html=True)
 
+    # Option lists follow the active knowledge base, so appended options appear without a restart
+    options = knowledge_base().options
+
     if step == 1:
         with st.form("wizard_step1"):
             st.subheader("🏡 Step 1: Tell Us About Your Room")
             col1, col2 = st.columns(2)
             with col1:
-                room_type = st.selectbox("Room Type *", ["Living Room", "Bedroom", "Kitchen", "Bathroom", "Office", "Dining Room"])
-                room_size = st.selectbox("Room Size *", ["Small (< 100 sq ft)", "Medium (100–250 sq ft)", "Large (250–500 sq ft)", "Very Large (500+ sq ft)"])
+                room_type = st.selectbox("Room Type *", options["room_type"])
+                room_size = st.selectbox("Room Size *", options["room_size"])
             with col2:
-                budget = st.selectbox("Budget Range *", list(BUDGET_ADVICE.keys()))
-                lifestyle = st.selectbox("Your Lifestyle *", ["Young Professional", "Couple", "Family with Kids", "Senior Living", "Work From Home", "Entertainer"])
+                budget = st.selectbox("Budget Range *", options["budget"])
+                lifestyle = st.selectbox("Your Lifestyle *", options["lifestyle"])
 
             next1 = st.form_submit_button("Next: Style Preferences →", use_container_width=True, type="primary")
 
         if next1:
-            st.session_state.w_room_type = room_type
-            st.session_state.w_room_size = room_size
-            st.session_state.w_budget = budget
-            st.session_state.w_lifestyle = lifestyle
-            st.session_state.wizard_step = 2
+            session.w_room_type = room_type
+            session.w_room_size = room_size
+            session.w_budget = budget
+            session.w_lifestyle = lifestyle
+            session.wizard_step = 2
             st.rerun()
 
     elif step == 2:
+        popular, support = similarity_index().popular_choices(
+            session.w_room_type, session.w_room_size,
+            session.w_budget, session.w_lifestyle,
+        )
+        if popular:
+            st.markdown(f"""
+            <div style="background:#FAF7F4;border-left:4px solid #C4956A;padding:12px 18px;border-radius:8px;margin-bottom:16px;">
+                <div style="font-weight:600;color:#5C3317;margin-bottom:6px;">
+                    👥 Popular with similar users <span style="font-weight:400;font-size:0.8rem;color:#6B5A4A;">
+                    ({support:,} designs for rooms like yours)</span>
+                </div>
+                {''.join(f"<span style='background:#F0EAE2;color:#5C3317;padding:3px 10px;border-radius:20px;font-size:0.8rem;border:1px solid #C4956A;margin-right:6px;'>{s_} · {t_} – {share:.0%}</span>" for s_, t_, share in popular)}
+            </div>
+            """, unsafe_allow_html=True)
+            top_style, top_theme = popular[0][0], popular[0][1]
+        else:
+            top_style, top_theme = options["furniture_style"][0], options["color_theme"][0]
+
         with st.form("wizard_step2"):
             st.subheader("🎨 Step 2: Your Style Preferences")
             col1, col2 = st.columns(2)
             with col1:
-                color_theme = st.selectbox("Colour Theme *", [
-                    "Warm & Cosy", "Cool & Calm", "Nature Inspired",
-                    "Bold & Vibrant", "Neutral & Elegant", "Soft Pastels",
-                    "Dark & Luxurious", "Mediterranean",
-                ])
-                furniture_style = st.selectbox("Furniture Style *", [
-                    "Modern", "Classic", "Minimalist", "Rustic", "Bohemian", "Industrial", "Scandinavian",
-                ])
+                color_theme = st.selectbox("Colour Theme *", options["color_theme"],
+                                           index=options["color_theme"].index(top_theme))
+                furniture_style = st.selectbox("Furniture Style *", options["furniture_style"],
+                                               index=options["furniture_style"].index(top_style))
             with col2:
                 special_notes = st.text_area("Special Requirements / Notes",
                     placeholder="E.g. I have two cats, need pet-friendly fabrics. I work night shifts so need blackout options...",
                     height=120)
 
-            # Live preview of selected styles
-            st.markdown("**🎨 Your Selected Palette Preview:**")
-            palette_map = {
-                "Warm & Cosy": "Warm Neutrals", "Cool & Calm": "Cool Blues",
-                "Nature Inspired": "Earthy Greens", "Bold & Vibrant": "Vibrant Bold",
-                "Neutral & Elegant": "Monochrome Elegance", "Soft Pastels": "Pastel Dream",
-                "Dark & Luxurious": "Dark Luxury", "Mediterranean": "Terracotta Warmth",
-            }
-
             col_prev, col_next = st.columns([1, 3])
             with col_prev:
                 back2 = st.form_submit_button("← Back", use_container_width=True)
@@ -854,195 +965,298 @@ def page_design_wizard():
                 generate = st.form_submit_button("🤖 Generate AI Design →", use_container_width=True, type="primary")
 
         if back2:
-            st.session_state.wizard_step = 1
+            session.wizard_step = 1
             st.rerun()
 
         if generate:
-            st.session_state.w_color_theme = color_theme
-            st.session_state.w_furniture_style = furniture_style
-            st.session_state.w_special_notes = special_notes
-            st.session_state.wizard_step = 3
+            session.w_color_theme = color_theme
+            session.w_furniture_style = furniture_style
+            session.w_special_notes = special_notes
+            session.wizard_step = 3
+            session.wizard_result = None
             st.rerun()
 
     elif step == 3:
-        # Gather all inputs
-        data = {
-            "room_type": st.session_state.get("w_room_type", "Living Room"),
-            "room_size": st.session_state.get("w_room_size", "Medium (100–250 sq ft)"),
-            "budget": st.session_state.get("w_budget", "₹50,000–₹1,50,000 / $600–$1,800"),
-            "color_theme": st.session_state.get("w_color_theme", "Warm & Cosy"),
-            "furniture_style": st.session_state.get("w_furniture_style", "Modern"),
-            "lifestyle": st.session_state.get("w_lifestyle", "Young Professional"),
-            "special_notes": st.session_state.get("w_special_notes", ""),
-        }
-
-        with st.spinner("🤖 AI is analysing your preferences and generating personalised recommendations..."):
-            time.sleep(1.5)
-            recs = generate_recommendations(**data)
-
-        # Save to DB
-        design_id = save_design_request(st.session_state.user['id'], data)
-        st.session_state.last_design_id = design_id
-
-        # === RESULTS ===
-        st.balloons()
-        toast_success(f"Your personalised design plan is ready! (Design #{design_id})")
-
-        # AI Compatibility Score
-        col_score, col_info = st.columns([1, 3])
-        with col_score:
+        result, fresh = wizard_result()
+        if fresh:
+            st.balloons()
+            toast_success(f"Your personalised design plan is ready! (Design #{result['design_id']})")
+
+        # Tabs, report and buttons are fragments: a widget in one reruns just that one, never the generation
+        _results_summary(result)
+        st.markdown("<br>", unsafe_allow_html=True)
+        tabs = st.tabs(["🎨 Colour Palette", "🛋️ Furniture & Layout", "📐 Design Concepts", "💰 Budget Plan", "🌿 Extras"])
+        with tabs[0]:
+            _palette_tab(result)
+        with tabs[1]:
+            _furniture_tab(result)
+        with tabs[2]:
+            _concepts_tab(result)
+        with tabs[3]:
+            _budget_tab(result)
+        with tabs[4]:
+            _extras_tab(result)
+        _report_section(result)
+        _wizard_actions()
+
+
+def wizard_result():
+    """(result, fresh): the stored plan for the current answers, generated and saved on first use.
+
+    Reruns of step 3 – any widget outside a fragment, a reconnect – reuse the stored result
+    instead of inserting the design again; "Generate" and "Create Another" clear it.
+    """
+    result = session.get("wizard_result")
+    if result is not None:
+        return result, False
+    # An answer missing from the session falls back to the knowledge base's default
+    data = {col: session.get(f"w_{col}", label) for col, label in knowledge_base().defaults.items()}
+    data["special_notes"] = session.get("w_special_notes", "")
+
+    # Save to DB – queued for the next group commit while the recommendations render
+    saved = save_design_request_async(session.user['id'], data)
+
+    with st.spinner("🤖 AI is analysing your preferences and generating personalised recommendations..."):
+        time.sleep(1.5)
+        recs = generate_recommendations(**data)
+
+    design_id = saved.result()
+    session.last_design_id = design_id
+    # Full plan as a downloadable report, rendered off the request thread
+    submit_report(design_id, data, recs)
+    session.wizard_result = result = {"design_id": design_id, "data": data, "recs": recs}
+    return result, True
+
+
+REPORT_POLL_SECS = 1  # how often a pending report download re-checks the render
+
+def fragment(fn=None, *, run_every=None):
+    """Make `fn` a Streamlit fragment: its widgets rerun `fn` alone instead of the whole script.
+
+    With run_every (seconds) the fragment also reruns on that timer, for content that changes
+    without user input. A fragment rerun bypasses route(), so the span ("fragment", name) and
+    the session save happen here. On Streamlit versions without fragments `fn` just runs inline.
+    """
+    if fn is None:
+        return lambda f: fragment(f, run_every=run_every)
+    make = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    name = fn.__name__.strip("_")
+
+    @wraps(fn)
+    def run(*args, **kwargs):
+        try:
+            with tracing.span("fragment", name):
+                return fn(*args, **kwargs)
+        finally:
+            if session.dirty:
+                get_store().save(session)
+    if make is None:
+        return run
+    return make(run, run_every=run_every) if run_every else make(run)
+
+
+def _results_summary(result):
+    data, recs = result['data'], result['recs']
+    # AI Compatibility Score
+    col_score, col_info = st.columns([1, 3])
+    with col_score:
+        st.markdown(f"""
+        <div style="text-align:center;padding:20px 0;">
+            <div class="score-badge">{recs['compatibility_score']}</div>
+            <div style="font-size:0.8rem;color:#6B5A4A;margin-top:8px;">AI Match Score</div>
+            <div style="font-size:0.75rem;color:#27AE60;font-weight:600;">Excellent ✓</div>
+        </div>
+        """, unsafe_allow_html=True)
+    with col_info:
+        st.markdown(f"""
+        <div style="background:linear-gradient(135deg,#FAF7F4,#F0EAE2);border-radius:14px;padding:20px;border:1px solid #EDE5DC;">
+            <h3 style="font-family:'Playfair Display',serif;color:#2C1810;margin:0 0 8px;">
+                {data['furniture_style']} {data['room_type']} Design
+            </h3>
+            <p style="color:#5C3317;margin:0 0 10px;font-size:0.9rem;">{recs['style_description']}</p>
+            <div style="display:flex;gap:8px;flex-wrap:wrap;">
+                <span style="background:#8B5E3C;color:white;padding:3px 10px;border-radius:20px;font-size:0.75rem;">{data['room_type']}</span>
+                <span style="background:#C4956A;color:white;padding:3px 10px;border-radius:20px;font-size:0.75rem;">{data['furniture_style']}</span>
+                <span style="background:#2C5F8A;color:white;padding:3px 10px;border-radius:20px;font-size:0.75rem;">{data['color_theme']}</span>
+                <span style="background:#27AE60;color:white;padding:3px 10px;border-radius:20px;font-size:0.75rem;">⏱ {recs['estimated_time']}</span>
+                {''.join(f"<span style='background:#F0EAE2;color:#5C3317;padding:3px 10px;border-radius:20px;font-size:0.75rem;border:1px solid #C4956A;'>📝 {n}</span>" for n in recs.get('note_insights', []))}
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+
+
+@fragment
+def _palette_tab(result):
+    data, recs = result['data'], result['recs']
+    palette = recs['palette']
+    col_pal, col_desc = st.columns([1, 2])
+    with col_pal:
+        swatches = colour_swatch(palette['primary'], 60, "Primary") + \
+                   colour_swatch(palette['secondary'], 60, "Secondary") + \
+                   colour_swatch(palette['accent'], 60, "Accent") + \
+                   colour_swatch(palette['wall'], 60, "Wall")
+        st.markdown(f"<div style='text-align:center;padding:20px;'>{swatches}</div>", unsafe_allow_html=True)
+        st.markdown(f"""
+        <div style="text-align:center;margin-top:10px;">
+            <span style="background:{palette['primary']};color:white;padding:4px 10px;border-radius:6px;font-size:0.75rem;margin:2px;">{palette['primary']}</span>
+            <span style="background:{palette['secondary']};color:white;padding:4px 10px;border-radius:6px;font-size:0.75rem;margin:2px;">{palette['secondary']}</span>
+            <span style="background:{palette['accent']};color:white;padding:4px 10px;border-radius:6px;font-size:0.75rem;margin:2px;">{palette['accent']}</span>
+        </div>
+        """, unsafe_allow_html=True)
+    with col_desc:
+        st.markdown(f"""
+        <h3 style="font-family:'Playfair Display',serif;color:#2C1810;">{recs['palette_name']}</h3>
+        <p style="color:#5C3317;">{palette['description']}</p>
+        """, unsafe_allow_html=True)
+
+        # Colour Usage Donut Chart
+        fig = go.Figure(data=[go.Pie(
+            labels=["Primary (60%)", "Secondary (30%)", "Accent (10%)"],
+            values=[60, 30, 10],
+            hole=0.5,
+            marker_colors=[palette['primary'], palette['secondary'], palette['accent']],
+            textinfo="label+percent",
+            textfont_size=11,
+        )])
+        fig.update_layout(
+            title="Colour Distribution Rule (60-30-10)",
+            showlegend=False,
+            height=280,
+            margin=dict(l=10, r=10, t=40, b=10),
+            paper_bgcolor="rgba(0,0,0,0)",
+            plot_bgcolor="rgba(0,0,0,0)",
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    board = render_moodboard(recs['palette_name'], data['furniture_style'], data['room_type'])
+    st.image(board, caption=f"{recs['palette_name']} mood board", use_container_width=True)
+    st.download_button("⬇️ Download Mood Board", data=board, mime="image/png",
+                       file_name=f"moodboard_{data['furniture_style']}_{data['room_type']}.png".replace(" ", "_"))
+
+
+@fragment
+def _furniture_tab(result):
+    recs = result['recs']
+    col_furn, col_layout = st.columns([1, 1])
+    with col_furn:
+        st.markdown("### 🛋️ Recommended Furniture")
+        for i, item in enumerate(recs['furniture'], 1):
             st.markdown(f"""
-            <div style="text-align:center;padding:20px 0;">
-                <div class="score-badge">{recs['compatibility_score']}</div>
-                <div style="font-size:0.8rem;color:#6B5A4A;margin-top:8px;">AI Match Score</div>
-                <div style="font-size:0.75rem;color:#27AE60;font-weight:600;">Excellent ✓</div>
+            <div style="display:flex;align-items:center;gap:10px;padding:10px 12px;
+                        background:{'#F0EAE2' if i%2==0 else 'white'};border-radius:8px;margin-bottom:6px;
+                        border:1px solid #EDE5DC;">
+                <span style="background:#8B5E3C;color:white;width:24px;height:24px;border-radius:50%;
+                             display:inline-flex;align-items:center;justify-content:center;
+                             font-size:0.75rem;font-weight:700;flex-shrink:0;">{i}</span>
+                <span style="color:#2C1810;font-size:0.9rem;">{item}</span>
             </div>
             """, unsafe_allow_html=True)
-        with col_info:
+
+    with col_layout:
+        st.markdown("### 📐 Layout & Placement Tips")
+        for tip in recs['layout_tips']:
+            st.markdown(f'<div class="tip-tag">{tip}</div>', unsafe_allow_html=True)
+
+
+@fragment
+def _concepts_tab(result):
+    recs = result['recs']
+    st.markdown("### 💡 Three Design Concepts for Your Space")
+    for i, concept in enumerate(recs['concepts'], 1):
+        with st.expander(f"Concept {i}: {concept['name']} — {concept['mood']}", expanded=(i==1)):
             st.markdown(f"""
-            <div style="background:linear-gradient(135deg,#FAF7F4,#F0EAE2);border-radius:14px;padding:20px;border:1px solid #EDE5DC;">
-                <h3 style="font-family:'Playfair Display',serif;color:#2C1810;margin:0 0 8px;">
-                    {data['furniture_style']} {data['room_type']} Design
-                </h3>
-                <p style="color:#5C3317;margin:0 0 10px;font-size:0.9rem;">{recs['style_description']}</p>
+            <div class="concept-card">
+                <h4 style="color:#2C1810;margin:0 0 8px;">{concept['name']}</h4>
+                <p style="color:#5C3317;margin:0 0 12px;">{concept['description']}</p>
                 <div style="display:flex;gap:8px;flex-wrap:wrap;">
-                    <span style="background:#8B5E3C;color:white;padding:3px 10px;border-radius:20px;font-size:0.75rem;">{data['room_type']}</span>
-                    <span style="background:#C4956A;color:white;padding:3px 10px;border-radius:20px;font-size:0.75rem;">{data['furniture_style']}</span>
-                    <span style="background:#2C5F8A;color:white;padding:3px 10px;border-radius:20px;font-size:0.75rem;">{data['color_theme']}</span>
-                    <span style="background:#27AE60;color:white;padding:3px 10px;border-radius:20px;font-size:0.75rem;">⏱ {recs['estimated_time']}</span>
+                    {''.join([f"<span style='background:#F0EAE2;color:#5C3317;padding:3px 10px;border-radius:20px;font-size:0.8rem;border:1px solid #C4956A;'>✓ {h}</span>" for h in concept['highlights']])}
                 </div>
             </div>
             """, unsafe_allow_html=True)
 
-        st.markdown("<br>", unsafe_allow_html=True)
-        tabs = st.tabs(["🎨 Colour Palette", "🛋️ Furniture & Layout", "📐 Design Concepts", "💰 Budget Plan", "🌿 Extras"])
 
-        with tabs[0]:
-            palette = recs['palette']
-            col_pal, col_desc = st.columns([1, 2])
-            with col_pal:
-                swatches = colour_swatch(palette['primary'], 60, "Primary") + \
-                           colour_swatch(palette['secondary'], 60, "Secondary") + \
-                           colour_swatch(palette['accent'], 60, "Accent") + \
-                           colour_swatch(palette['wall'], 60, "Wall")
-                st.markdown(f"<div style='text-align:center;padding:20px;'>{swatches}</div>", unsafe_allow_html=True)
-                st.markdown(f"""
-                <div style="text-align:center;margin-top:10px;">
-                    <span style="background:{palette['primary']};color:white;padding:4px 10px;border-radius:6px;font-size:0.75rem;margin:2px;">{palette['primary']}</span>
-                    <span style="background:{palette['secondary']};color:white;padding:4px 10px;border-radius:6px;font-size:0.75rem;margin:2px;">{palette['secondary']}</span>
-                    <span style="background:{palette['accent']};color:white;padding:4px 10px;border-radius:6px;font-size:0.75rem;margin:2px;">{palette['accent']}</span>
-                </div>
-                """, unsafe_allow_html=True)
-            with col_desc:
-                st.markdown(f"""
-                <h3 style="font-family:'Playfair Display',serif;color:#2C1810;">{recs['palette_name']}</h3>
-                <p style="color:#5C3317;">{palette['description']}</p>
-                """, unsafe_allow_html=True)
-
-                # Colour Usage Donut Chart
-                fig = go.Figure(data=[go.Pie(
-                    labels=["Primary (60%)", "Secondary (30%)", "Accent (10%)"],
-                    values=[60, 30, 10],
-                    hole=0.5,
-                    marker_colors=[palette['primary'], palette['secondary'], palette['accent']],
-                    textinfo="label+percent",
-                    textfont_size=11,
-                )])
-                fig.update_layout(
-                    title="Colour Distribution Rule (60-30-10)",
-                    showlegend=False,
-                    height=280,
-                    margin=dict(l=10, r=10, t=40, b=10),
-                    paper_bgcolor="rgba(0,0,0,0)",
-                    plot_bgcolor="rgba(0,0,0,0)",
-                )
-                st.plotly_chart(fig, use_container_width=True)
-
-        with tabs[1]:
-            col_furn, col_layout = st.columns([1, 1])
-            with col_furn:
-                st.markdown("### 🛋️ Recommended Furniture")
-                for i, item in enumerate(recs['furniture'], 1):
-                    st.markdown(f"""
-                    <div style="display:flex;align-items:center;gap:10px;padding:10px 12px;
-                                background:{'#F0EAE2' if i%2==0 else 'white'};border-radius:8px;margin-bottom:6px;
-                                border:1px solid #EDE5DC;">
-                        <span style="background:#8B5E3C;color:white;width:24px;height:24px;border-radius:50%;
-                                     display:inline-flex;align-items:center;justify-content:center;
-                                     font-size:0.75rem;font-weight:700;flex-shrink:0;">{i}</span>
-                        <span style="color:#2C1810;font-size:0.9rem;">{item}</span>
-                    </div>
-                    """, unsafe_allow_html=True)
+@fragment
+def _budget_tab(result):
+    recs = result['recs']
+    budget_info = recs['budget_info']
+    st.markdown(f"### 💰 {budget_info['label']} Budget Strategy")
+    col_pie, col_tips = st.columns([1, 1])
+    with col_pie:
+        fig = px.pie(
+            values=list(budget_info['allocation'].values()),
+            names=list(budget_info['allocation'].keys()),
+            title="Recommended Budget Allocation",
+            color_discrete_sequence=["#8B5E3C", "#C4956A", "#D4AF7A", "#E8D5B0", "#F0EAE2"],
+            hole=0.35,
+        )
+        fig.update_layout(height=320, paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
+                          margin=dict(l=0, r=0, t=40, b=0))
+        st.plotly_chart(fig, use_container_width=True)
+    with col_tips:
+        st.markdown("**💡 Budget Tips:**")
+        for tip in budget_info['tips']:
+            st.markdown(f'<div class="tip-tag">💰 {tip}</div>', unsafe_allow_html=True)
+
+
+@fragment
+def _extras_tab(result):
+    recs = result['recs']
+    col_sus, col_smart = st.columns(2)
+    with col_sus:
+        st.markdown("### 🌿 Sustainability Tips")
+        for tip in recs['sustainability_tips']:
+            st.markdown(f'<div class="tip-tag">♻️ {tip}</div>', unsafe_allow_html=True)
+    with col_smart:
+        st.markdown("### 🏠 Smart Home Suggestions")
+        for item in recs['smart_home']:
+            st.markdown(f'<div class="tip-tag">💡 {item}</div>', unsafe_allow_html=True)
+
+
+def _report_section(result):
+    st.markdown("<br>", unsafe_allow_html=True)
+    # Rendering started when the plan was generated; usually done within the wait
+    report = wait_for_report(result['design_id'], result['data'], result['recs'])
+    if report:
+        _report_download(result['design_id'], report)
+    else:
+        _report_pending(result['design_id'])
 
-            with col_layout:
-                st.markdown("### 📐 Layout & Placement Tips")
-                for tip in recs['layout_tips']:
-                    st.markdown(f'<div class="tip-tag">{tip}</div>', unsafe_allow_html=True)
 
-        with tabs[2]:
-            st.markdown("### 💡 Three Design Concepts for Your Space")
-            for i, concept in enumerate(recs['concepts'], 1):
-                with st.expander(f"Concept {i}: {concept['name']} — {concept['mood']}", expanded=(i==1)):
-                    st.markdown(f"""
-                    <div class="concept-card">
-                        <h4 style="color:#2C1810;margin:0 0 8px;">{concept['name']}</h4>
-                        <p style="color:#5C3317;margin:0 0 12px;">{concept['description']}</p>
-                        <div style="display:flex;gap:8px;flex-wrap:wrap;">
-                            {''.join([f"<span style='background:#F0EAE2;color:#5C3317;padding:3px 10px;border-radius:20px;font-size:0.8rem;border:1px solid #C4956A;'>✓ {h}</span>" for h in concept['highlights']])}
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
+@fragment
+def _report_download(design_id, report):
+    st.download_button("📄 Download Full Design Report", data=report, mime="text/html",
+                       file_name=f"design_{design_id}_report.html", use_container_width=True)
 
-        with tabs[3]:
-            budget_info = recs['budget_info']
-            st.markdown(f"### 💰 {budget_info['label']} Budget Strategy")
-            col_pie, col_tips = st.columns([1, 1])
-            with col_pie:
-                fig = px.pie(
-                    values=list(budget_info['allocation'].values()),
-                    names=list(budget_info['allocation'].keys()),
-                    title="Recommended Budget Allocation",
-                    color_discrete_sequence=["#8B5E3C", "#C4956A", "#D4AF7A", "#E8D5B0", "#F0EAE2"],
-                    hole=0.35,
-                )
-                fig.update_layout(height=320, paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
-                                  margin=dict(l=0, r=0, t=40, b=0))
-                st.plotly_chart(fig, use_container_width=True)
-            with col_tips:
-                st.markdown("**💡 Budget Tips:**")
-                for tip in budget_info['tips']:
-                    st.markdown(f'<div class="tip-tag">💰 {tip}</div>', unsafe_allow_html=True)
 
-        with tabs[4]:
-            col_sus, col_smart = st.columns(2)
-            with col_sus:
-                st.markdown("### 🌿 Sustainability Tips")
-                for tip in recs['sustainability_tips']:
-                    st.markdown(f'<div class="tip-tag">♻️ {tip}</div>', unsafe_allow_html=True)
-            with col_smart:
-                st.markdown("### 🏠 Smart Home Suggestions")
-                for item in recs['smart_home']:
-                    st.markdown(f'<div class="tip-tag">💡 {item}</div>', unsafe_allow_html=True)
+@fragment(run_every=REPORT_POLL_SECS)
+def _report_pending(design_id):
+    """Re-checks on a timer (its only widget is disabled); a full rerun then offers the download."""
+    if get_report(design_id) is not None:
+        st.rerun()
+    st.button("📄 Preparing your design report…", disabled=True, use_container_width=True)
 
-        st.markdown("<br>", unsafe_allow_html=True)
-        col_a, col_b, col_c = st.columns(3)
-        with col_a:
-            if st.button("🔄 Create Another Design", use_container_width=True):
-                st.session_state.wizard_step = 1
-                st.rerun()
-        with col_b:
-            if st.button("👨‍🎨 Book a Designer", use_container_width=True, type="primary"):
-                st.session_state.page = "designers"
-                st.rerun()
-        with col_c:
-            if st.button("📋 View My Designs", use_container_width=True):
-                st.session_state.page = "my_designs"
-                st.rerun()
 
+@fragment
+def _wizard_actions():
+    st.markdown("<br>", unsafe_allow_html=True)
+    col_a, col_b, col_c = st.columns(3)
+    with col_a:
+        if st.button("🔄 Create Another Design", use_container_width=True):
+            session.wizard_step = 1
+            session.wizard_result = None
+            st.rerun()
+    with col_b:
+        if st.button("👨‍🎨 Book a Designer", use_container_width=True, type="primary"):
+            session.page = "designers"
+            st.rerun()
+    with col_c:
+        if st.button("📋 View My Designs", use_container_width=True):
+            session.page = "my_designs"
+            st.rerun()
 
 def page_my_designs():
     section_header("📋", "My Design Recommendations")
-    designs = get_user_designs(st.session_state.user['id'])
+    designs = get_user_designs(session.user['id'])
 
     if not designs:
         st.markdown("""
@@ -1053,7 +1267,7 @@ def page_my_designs():
         </div>
         """, unsafe_allow_html=True)
         if st.button("✨ Start AI Design Wizard", type="primary"):
-            st.session_state.page = "design"
+            session.page = "design"
             st.rerun()
         return
 
@@ -1077,64 +1291,135 @@ def page_my_designs():
                 st.markdown(f"**Notes:** *{design['special_notes']}*")
 
             if st.button(f"📅 Book Designer for this Room", key=f"book_{design['id']}"):
-                st.session_state.page = "designers"
+                session.page = "designers"
                 st.rerun()
 
 
+INR_PER_USD = 75  # the app's display rate; prices are stored in USD
+PRICE_BANDS = {  # label -> (min, max) hourly USD, edges taken from the ₹ in the label
+    "Any Price": (None, None),
+    "Under ₹7,500 / hr": (None, 7_500 / INR_PER_USD),
+    "₹7,500–₹10,000 / hr": (7_500 / INR_PER_USD, 10_000 / INR_PER_USD),
+    "₹10,000+ / hr": (10_000 / INR_PER_USD, None),
+}
+RATING_FILTERS = {"Any Rating": None, "4.5★ & up": 4.5, "4.0★ & up": 4.0, "3.5★ & up": 3.5}
+DESIGNERS_PER_PAGE = 12
+
+def designer_card(designer, slots, match=None):
+    stars = "★" * int(designer['rating']) + "☆" * (5 - int(designer['rating']))
+    available = bool(slots)
+    avail_color = "#27AE60" if available else "#E74C3C"
+    slot_note = f"{len(slots)} free slots this week · next {slots[0][0]}, {slots[0][1]}" if slots else "Fully booked this week"
+    match_note = f'<div style="font-size:0.8rem;color:#8B5E3C;font-weight:600;">{match}% match</div>' if match is not None else ""
+    st.markdown(f"""
+    <div class="designer-card">
+        <img src="{portrait_url(designer)}" loading="lazy" width="80" height="80" style="border-radius:50%;
+             border:3px solid #8B5E3C;object-fit:cover;margin-bottom:12px;">
+        <h4 style="font-family:'Playfair Display',serif;color:#2C1810;margin:0 0 4px;">{designer['name']}</h4>
+        <div style="font-size:0.82rem;color:#6B5A4A;margin-bottom:8px;">{designer['specialization']}</div>
+        <div class="designer-rating">{stars}</div>
+        <div style="font-size:0.82rem;color:#6B5A4A;margin:4px 0;">{designer['rating']}/5 · {designer['experience']}</div>
+        {match_note}
+        <div style="margin:8px 0;">
+            <span style="background:{avail_color}22;color:{avail_color};border:1px solid {avail_color}66;
+                         padding:2px 10px;border-radius:20px;font-size:0.75rem;font-weight:600;">
+                ● {"Available" if available else "Busy"}
+            </span>
+            <div style="font-size:0.75rem;color:#6B5A4A;margin-top:6px;">
+                {slot_note}
+            </div>
+        </div>
+        <div style="font-size:1rem;font-weight:700;color:#8B5E3C;margin:6px 0;">
+            ₹{int(designer['price_per_hour']*INR_PER_USD):,} / hour
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+def book_designer_button(designer, available, key_prefix):
+    if available:
+        if st.button(f"📅 Book {designer['name'].split()[0]}", key=f"{key_prefix}_{designer['id']}", use_container_width=True, type="primary"):
+            session.booking_designer_id = designer['id']
+            session.booking_designer_name = designer['name']
+            session.booking_designer_price = designer['price_per_hour']
+            session.page = "payment"
+            st.rerun()
+    else:
+        st.button("🕐 Unavailable", key=f"{key_prefix}_busy_{designer['id']}", use_container_width=True, disabled=True)
+
 def page_designers():
     section_header("👨‍🎨", "Expert Interior Designers")
     st.markdown("<p style='color:#6B5A4A;margin:-10px 0 24px;'>Book a certified professional to bring your AI design to life.</p>", unsafe_allow_html=True)
 
-    designers = get_all_designers()
-
-    filter_col, _ = st.columns([2, 3])
-    with filter_col:
-        availability = st.selectbox("Filter by Availability", ["All", "Available", "Busy"])
-
-    filtered = [d for d in designers if availability == "All" or d['availability'] == availability]
+    week_start = date.today() + timedelta(days=1)
+    week = (week_start, week_start + timedelta(days=6))
+    style, budget = current_design_prefs()
+
+    # Best matches for the user's design come straight from the precomputed ranking
+    if style:
+        top = designer_index().top_k(style, budget, k=3)
+        top_free = get_free_slots([d['id'] for d, _ in top], *week)
+        st.markdown(f"#### ✨ Best matches for your {style} design")
+        cols = st.columns(3)
+        for col, (designer, score) in zip(cols, top):
+            with col:
+                designer_card(designer, top_free[designer['id']], score)
+                book_designer_button(designer, bool(top_free[designer['id']]), "match")
+        st.markdown("<hr style='border-color:#EDE5DC;'>", unsafe_allow_html=True)
+
+    # Filters are pushed down to SQL; only one page of designers is ever loaded
+    f1, f2, f3, f4 = st.columns(4)
+    with f1:
+        spec = st.selectbox("Specialization", ["All Styles", *knowledge_base().options["furniture_style"]])
+    with f2:
+        band = st.selectbox("Price", list(PRICE_BANDS))
+    with f3:
+        rating = st.selectbox("Rating", list(RATING_FILTERS))
+    with f4:
+        availability = st.selectbox("Filter by Availability", ["All", "Available this week"])
+
+    min_price, max_price = PRICE_BANDS[band]
+    filters = dict(
+        style=None if spec == "All Styles" else spec,
+        min_price=min_price, max_price=max_price,
+        min_rating=RATING_FILTERS[rating],
+        free_between=week if availability != "All" else None,
+    )
+    total = count_designers(**filters)
+    pages = max(1, -(-total // DESIGNERS_PER_PAGE))
+    if session.get("designer_filters") != filters:
+        # New filter, back to the first page
+        session.designer_filters = filters
+        session.designer_page = 1
+    page_no = min(session.get("designer_page", 1), pages)
+    designers = search_designers(page=page_no, page_size=DESIGNERS_PER_PAGE, **filters)
+    free = get_free_slots([d['id'] for d in designers], *week)
+
+    st.markdown(f"**{total} designers** · page {page_no} of {pages}")
+    if not designers:
+        st.info("No designers match these filters.")
 
     cols = st.columns(3)
-    for i, designer in enumerate(filtered):
+    for i, designer in enumerate(designers):
         with cols[i % 3]:
-            stars = "★" * int(designer['rating']) + "☆" * (5 - int(designer['rating']))
-            avail_color = "#27AE60" if designer['availability'] == "Available" else "#E74C3C"
-            st.markdown(f"""
-            <div class="designer-card">
-                <img src="{designer['image_url']}" style="width:80px;height:80px;border-radius:50%;
-                     border:3px solid #8B5E3C;object-fit:cover;margin-bottom:12px;" onerror="this.src='https://via.placeholder.com/80'">
-                <h4 style="font-family:'Playfair Display',serif;color:#2C1810;margin:0 0 4px;">{designer['name']}</h4>
-                <div style="font-size:0.82rem;color:#6B5A4A;margin-bottom:8px;">{designer['specialization']}</div>
-                <div class="designer-rating">{stars}</div>
-                <div style="font-size:0.82rem;color:#6B5A4A;margin:4px 0;">{designer['rating']}/5 · {designer['experience']}</div>
-                <div style="margin:8px 0;">
-                    <span style="background:{avail_color}22;color:{avail_color};border:1px solid {avail_color}66;
-                                 padding:2px 10px;border-radius:20px;font-size:0.75rem;font-weight:600;">
-                        ● {designer['availability']}
-                    </span>
-                </div>
-                <div style="font-size:1rem;font-weight:700;color:#8B5E3C;margin:6px 0;">
-                    ₹{int(designer['price_per_hour']*75):,} / hour
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            designer_card(designer, free[designer['id']], match_score(designer, style, budget) if style else None)
+            book_designer_button(designer, bool(free[designer['id']]), "book_d")
 
-            if designer['availability'] == "Available":
-                if st.button(f"📅 Book {designer['name'].split()[0]}", key=f"book_d_{designer['id']}", use_container_width=True, type="primary"):
-                    st.session_state.booking_designer_id = designer['id']
-                    st.session_state.booking_designer_name = designer['name']
-                    st.session_state.booking_designer_price = designer['price_per_hour']
-                    st.session_state.page = "payment"
-                    st.rerun()
-            else:
-                st.button("🕐 Unavailable", key=f"busy_{designer['id']}", use_container_width=True, disabled=True)
+    if pages > 1:
+        prev_col, _, next_col = st.columns([1, 3, 1])
+        if prev_col.button("← Previous", disabled=page_no <= 1, use_container_width=True):
+            session.designer_page = page_no - 1
+            st.rerun()
+        if next_col.button("Next →", disabled=page_no >= pages, use_container_width=True):
+            session.designer_page = page_no + 1
+            st.rerun()
 
 
 def page_payment():
     section_header("💳", "Book & Pay")
-    designer_name = st.session_state.get("booking_designer_name", "Expert Designer")
-    designer_id = st.session_state.get("booking_designer_id", 1)
-    hourly_price = st.session_state.get("booking_designer_price", 120)
-    designs = get_user_designs(st.session_state.user['id'])
+    designer_name = session.get("booking_designer_name", "Expert Designer")
+    designer_id = session.get("booking_designer_id", 1)
+    hourly_price = session.get("booking_designer_price", 120)
+    designs = get_user_designs(session.user['id'])
 
     col1, col2 = st.columns([2, 1])
     with col1:
@@ -1148,10 +1433,7 @@ def page_payment():
             col_a, col_b = st.columns(2)
             with col_a:
                 booking_date = st.date_input("📅 Select Date", min_value=date.today() + timedelta(days=1))
-                time_slot = st.selectbox("⏰ Time Slot", [
-                    "09:00 AM – 11:00 AM", "11:00 AM – 01:00 PM",
-                    "02:00 PM – 04:00 PM", "04:00 PM – 06:00 PM",
-                ])
+                time_slot = st.selectbox("⏰ Time Slot", TIME_SLOTS)
             with col_b:
                 service_type = st.selectbox("🛠️ Service Type", [
                     "Full Room Consultation (2hrs)",
@@ -1184,34 +1466,33 @@ def page_payment():
             </div>
             """, unsafe_allow_html=True)
 
-# --- QUICKCHART QR SECTION ---
-            upi_id = "9080599509@naviaxis"
-            # Format the UPI URL for the QR code
-            upi_url = f"upi://pay?pa={upi_id}&pn=Krishnan%20R&am={total_inr}&cu=INR"
-            
-            # This is the QuickChart API URL we used previously
-            qr_api = f"https://quickchart.io/qr?text={upi_url}&size=200"
-            
-            st.info(f"**UPI ID:** {upi_id}")
-            st.image(qr_api, caption="Scan to Pay via PhonePe / GPay / Paytm")
-            
+            # UPI QR is rendered locally and cached per amount
+            st.info(f"**UPI ID:** {UPI_ID}")
+            st.image(upi_qr_png(UPI_ID, total_inr), caption="Scan to Pay via PhonePe / GPay / Paytm")
+
             txn_id_input = st.text_input("Transaction ID / UTR Number", placeholder="Enter the 12-digit number here")
 
             if st.form_submit_button("✅ I have Paid - Confirm Booking", use_container_width=True, type="primary"):
                 if txn_id_input:
                     # Save to database
-                    create_booking(st.session_state.user['id'], designer_id, None, str(booking_date), time_slot, service_type, total_inr/75)
-                    st.balloons()
-                    toast_success("Booking Confirmed! Check 'My Bookings' for details.")
-                    st.session_state.page = "bookings"
-                    st.rerun()
+                    try:
+                        create_booking(session.user['id'], designer_id, None, str(booking_date), time_slot, service_type, total_inr/75)
+                    except SlotTakenError:
+                        open_slots = [slot for _, slot in get_free_slots([designer_id], booking_date, booking_date)[designer_id]]
+                        toast_warning(f"{designer_name} was just booked for {time_slot} on {booking_date}. "
+                                      + (f"Still free that day: {', '.join(open_slots)}." if open_slots else "Please pick another date."))
+                    else:
+                        st.balloons()
+                        toast_success("Booking Confirmed! Check 'My Bookings' for details.")
+                        session.page = "bookings"
+                        st.rerun()
                 else:
                     st.warning("Please enter your Transaction ID after paying.")
 
 
 def page_bookings():
     section_header("📅", "My Bookings")
-    bookings = get_user_bookings(st.session_state.user['id'])
+    bookings = get_user_bookings(session.user['id'])
 
     if not bookings:
         st.markdown("""
@@ -1222,7 +1503,7 @@ def page_bookings():
         </div>
         """, unsafe_allow_html=True)
         if st.button("👨‍🎨 Browse Designers", type="primary"):
-            st.session_state.page = "designers"
+            session.page = "designers"
             st.rerun()
         return
 
@@ -1288,13 +1569,13 @@ def page_admin():
     with ac1:
         st.info("📋 **Verify Payments & Bookings**")
         if st.button("Go to Booking Manager →", use_container_width=True):
-            st.session_state.page = "admin_bookings"
+            session.page = "admin_bookings"
             st.rerun()
             
     with ac2:
         st.info("👥 **Manage Registered Users**")
         if st.button("Go to User Manager →", use_container_width=True):
-            st.session_state.page = "admin_users"
+            session.page = "admin_users"
             st.rerun()
 
     st.markdown("<hr style='border-color:#EDE5DC;'>", unsafe_allow_html=True)
@@ -1412,31 +1693,97 @@ def page_admin_bookings():
             with c1:
                 if row['booking_status'] != 'Confirmed':
                     if st.button("✅ Verify & Confirm", key=f"conf_{row['id']}", type="primary"):
-                        update_booking_status(row['id'], "Confirmed")
-                        st.rerun()
+                        try:
+                            update_booking_status(row['id'], "Confirmed", actor_id=session.user['id'])
+                        except SlotTakenError as e:
+                            toast_warning(f"Can't confirm booking #{row['id']}: {e}. Ask the client to pick another slot.")
+                        else:
+                            st.rerun()
             with c2:
                 if row['booking_status'] != 'Rejected':
                     if st.button("❌ Reject", key=f"rej_{row['id']}"):
-                        update_booking_status(row['id'], "Rejected")
+                        update_booking_status(row['id'], "Rejected", actor_id=session.user['id'])
                         st.rerun()
 
+    # Audit trail of one booking, from the event log
+    st.markdown("---")
+    st.markdown("#### 🕓 Booking History")
+    booking_id = st.selectbox("Booking", df['id'].tolist(), format_func=lambda b: f"#{b}", key="history_booking")
+    events = booking_events(int(booking_id)) if booking_id is not None else []
+    if events:
+        st.dataframe(pd.DataFrame([{
+            "Time (UTC)": e['ts'][:19], "Event": e['kind'].replace("_", " ").title(),
+            "By": e['actor_id'] or "—",
+            "Details": ", ".join(f"{k}: {v}" for k, v in e['details'].items()),
+        } for e in events]), hide_index=True, use_container_width=True)
+    else:
+        st.caption("No events recorded for this booking.")
+
+def page_admin_performance():
+    section_header("⏱️", "Performance")
+    if not tracing.ENABLED:
+        st.info("Tracing is off. Start the app without TRACING=0 to record timings.")
+        return
+
+    c1, c2, c3 = st.columns([2, 2, 1])
+    with c1:
+        kind = st.selectbox("Show", ["All", "Pages", "Fragments", "Database queries", "Recommendations"])
+    with c2:
+        window = st.selectbox("Window", ["Everything buffered", "Last 5 minutes", "Last hour"])
+    with c3:
+        st.markdown("<br>", unsafe_allow_html=True)
+        if st.button("🧹 Clear", use_container_width=True):
+            tracing.clear()
+            st.rerun()
+
+    kinds = {"All": None, "Pages": "page", "Fragments": "fragment", "Database queries": "db", "Recommendations": "ai"}
+    since = {"Everything buffered": None, "Last 5 minutes": 300, "Last hour": 3600}[window]
+    rows = tracing.summary(kinds[kind], since=time.time() - since if since else None)
+    if not rows:
+        st.info("No spans recorded yet – browse a few pages first.")
+        return
+
+    df = pd.DataFrame(rows)
+    df = df.rename(columns={"kind": "Kind", "name": "Name", "count": "Calls", "p50_ms": "p50 (ms)",
+                            "p95_ms": "p95 (ms)", "p99_ms": "p99 (ms)", "max_ms": "Max (ms)",
+                            "total_s": "Total (s)", "rows": "Rows"})
+    st.dataframe(df.round(2), use_container_width=True, hide_index=True)
+
+    pages = [r for r in rows if r["kind"] == "page"]
+    if pages:
+        fig = go.Figure()
+        for q, colour in (("p50_ms", "#C4956A"), ("p95_ms", "#8B5E3C"), ("p99_ms", "#5C3317")):
+            fig.add_bar(name=q.split("_")[0], x=[r["name"] for r in pages], y=[r[q] for r in pages],
+                        marker_color=colour)
+        fig.update_layout(title="Page render time (ms)", barmode="group", height=350,
+                          paper_bgcolor="rgba(0,0,0,0)", margin=dict(t=40, b=10, l=10, r=10))
+        st.plotly_chart(fig, use_container_width=True)
+
+    hist_kind = kinds[kind] or "page"
+    buckets = tracing.histogram(hist_kind)
+    fig = px.bar(x=[b for b, _ in buckets], y=[n for _, n in buckets],
+                 labels={"x": "Latency", "y": "Spans"}, title=f"Latency histogram – {hist_kind}")
+    fig.update_traces(marker_color="#8B5E3C")
+    fig.update_layout(height=300, paper_bgcolor="rgba(0,0,0,0)", margin=dict(t=40, b=10, l=10, r=10))
+    st.plotly_chart(fig, use_container_width=True)
+
 # ── Router ─────────────────────────────────────────────────────────────────────
 def route():
     # Call the new header instead of the sidebar
     render_header()
     
-    page = st.session_state.page
+    page = session.page
 
     # Auth guard
     protected = ["dashboard", "design", "my_designs", "designers", "payment", "bookings",
-                 "admin", "admin_users", "admin_bookings"]
-    if page in protected and not st.session_state.logged_in:
-        st.session_state.page = "login"
+                 "admin", "admin_users", "admin_bookings", "admin_performance"]
+    if page in protected and not session.logged_in:
+        session.page = "login"
         page = "login"
 
-    admin_only = ["admin", "admin_users", "admin_bookings"]
-    if page in admin_only and st.session_state.user and st.session_state.user.get("role") != "admin":
-        st.session_state.page = "dashboard"
+    admin_only = ["admin", "admin_users", "admin_bookings", "admin_performance"]
+    if page in admin_only and session.user and session.user.get("role") != "admin":
+        session.page = "dashboard"
         page = "dashboard"
 
     router = {
@@ -1452,9 +1799,16 @@ def route():
         "admin": page_admin,
         "admin_users": page_admin_users,
         "admin_bookings": page_admin_bookings,
+        "admin_performance": page_admin_performance,
     }
-    router.get(page, page_home)()
+    # Recorded even when the page ends early via st.rerun()
+    with tracing.span("page", page if page in router else "home"):
+        router.get(page, page_home)()
 
 
 if __name__ == "__main__":
-    route()
+    try:
+        route()
+    finally:
+        # Also on st.rerun()/st.stop(), which leave route() by exception
+        get_store().save(session)
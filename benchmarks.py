@@ -0,0 +1,635 @@
+"""
+Benchmarks – standalone timing runs for hot paths
+Each benchmark returns {metric: seconds}. The runner prints them, can save
+them as JSON alongside the commit they were measured on, and can compare a
+run against an earlier file, failing when a metric slowed past its threshold.
+
+Database benchmarks run against synthetic datasets (users, design requests,
+bookings and payments from loadtest.generate) built once per scale under
+BENCH_DATA_DIR and reused.
+
+Usage:
+    python benchmarks.py                            # run everything
+    python benchmarks.py ai auth                    # run selected benchmarks by name
+    python benchmarks.py designs --scales 1000,100000,1000000
+    python benchmarks.py --json bench.json          # save results
+    python benchmarks.py --baseline bench.json      # exit 1 on a regression past threshold
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from categories import BUDGETS, CATEGORIES, FURNITURE_STYLES, LIFESTYLES, ROOM_SIZES, ROOM_TYPES
+from loadtest import PASSWORD, email, generate, use_database
+
+DEFAULT_SCALES = (1_000, 100_000, 1_000_000)
+BENCH_DATA_DIR = os.environ.get("BENCH_DATA_DIR", os.path.join(tempfile.gettempdir(), "interior_bench"))
+
+# Allowed slowdown against the baseline before a metric counts as a regression
+DEFAULT_THRESHOLD = 0.20
+THRESHOLDS = {
+    # Microsecond-scale paths jitter more from run to run
+    "matching.top5_query": 0.35,
+    "qr.cached": 0.50,
+    "similarity.popular": 0.50,
+    "similarity.nearest": 0.50,
+    "ai.compatibility": 0.35,
+    # Page renders include Streamlit's own script-run overhead
+    "pages.": 0.35,
+    "wizard.": 0.35,
+}
+
+
+def timed(fn, repeat):
+    """Mean seconds per call over `repeat` calls."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def sampled(fn, repeat):
+    """(median, p95) seconds per call, timing every call separately.
+
+    The median rather than the mean, so a stray scheduler hiccup doesn't read as a regression.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2], times[min(len(times) - 1, int(len(times) * 0.95))]
+
+
+def synthetic_designers(n, seed=7):
+    rng = random.Random(seed)
+    specs = ["Modern & Contemporary", "Traditional & Classic", "Minimalist & Zen", "Industrial & Rustic",
+             "Bohemian & Eclectic", "Scandinavian & Nordic", "Farmhouse & Rustic", "Luxury & Bespoke"]
+    return [
+        {"id": i, "name": f"Designer {i}", "specialization": rng.choice(specs),
+         "rating": round(rng.uniform(3.5, 5.0), 1), "price_per_hour": float(rng.randrange(60, 220, 5)),
+         "availability": "Available"}
+        for i in range(1, n + 1)
+    ]
+
+
+def wizard_answers(rng):
+    """One random set of wizard choices, in CATEGORIES order."""
+    return tuple(rng.choice(options) for _, options in CATEGORIES.values())
+
+
+def _session_store():
+    """Point the app at a throwaway session store, so AppTest runs don't touch sessions.db."""
+    import sessions
+
+    sessions._store = sessions.SessionStore(os.path.join(tempfile.mkdtemp(), "sessions.db"))
+    return sessions._store
+
+
+def _app_session(store, **values):
+    """Id of a stored session holding `values`; AppTest picks it up from session_state.sid."""
+    session = store.create()
+    session.update(values)
+    store.save(session)
+    return session.id
+
+
+# ── Synthetic datasets ─────────────────────────────────────────────────────────
+
+def dataset(designs):
+    """Path to a database holding `designs` design requests, generating it on first use.
+
+    About 100 designs per user and one booking (with its payment) per 10
+    designs; users sign in as email(id) with PASSWORD.
+    """
+    path = os.path.join(BENCH_DATA_DIR, f"designs_{designs}.db")
+    if os.path.exists(path):
+        return path
+    os.makedirs(BENCH_DATA_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    users = max(1, designs // 100)
+    generate(tmp, users, designs / users, designs / users / 10, seed=designs, log=lambda msg: None)
+    os.replace(tmp, path)
+    return path
+
+
+def _user_range(path):
+    conn = sqlite3.connect(path)
+    lo, hi = conn.execute("SELECT MIN(user_id), MAX(user_id) FROM design_requests").fetchone()
+    conn.close()
+    return lo, hi
+
+
+# ── Benchmarks ─────────────────────────────────────────────────────────────────
+
+def bench_ai(args):
+    from ai_engine import calculate_compatibility, generate_recommendations
+
+    rng = random.Random(11)
+    answers = [wizard_answers(rng) for _ in range(5_000)]
+    calls = iter(answers * 4)
+    single = timed(lambda: generate_recommendations(*next(calls), "two cats and a home office"), 20_000)
+    start = time.perf_counter()
+    for a in answers[:1_000]:
+        generate_recommendations(*a, "")
+    batch = time.perf_counter() - start
+    # CATEGORIES order: room, size, budget, theme, style, lifestyle
+    pairs = iter([(a[0], a[4], a[3], a[5]) for a in answers] * 10)
+    compat = timed(lambda: calculate_compatibility(*next(pairs)), 50_000)
+    return {"ai.recommendations_single": single, "ai.recommendations_batch_1000": batch,
+            "ai.compatibility": compat}
+
+
+def bench_auth(args):
+    import database
+
+    path = dataset(min(args.scales))
+    use_database(path)
+    lo, hi = _user_range(path)
+    run = time.time_ns()
+    emails = iter(f"new{run}_{i}@bench.test" for i in range(1_000))
+    register, register_p95 = sampled(lambda: database.register_user("New User", next(emails), "pw", "1"), 500)
+    rng = random.Random(13)
+    users = [email(i) for i in range(lo, hi + 1)]
+    login, login_p95 = sampled(lambda: database.login_user(rng.choice(users), PASSWORD), 2_000)
+    wrong = iter(f"nobody{i}@bench.test" for i in range(2_000))  # distinct, so the rate limiter stays out of it
+    failed = timed(lambda: database.login_user(next(wrong), "wrong"), 2_000)
+    # Keep the cached dataset identical from run to run
+    conn = sqlite3.connect(path)
+    conn.execute("DELETE FROM users WHERE email LIKE ?", (f"new{run}_%",))
+    conn.commit()
+    conn.close()
+    return {"auth.register_user": register, "auth.register_user_p95": register_p95,
+            "auth.login_user": login, "auth.login_user_p95": login_p95, "auth.login_user_failed": failed}
+
+
+def bench_ratelimit(args):
+    """Login limiter checks: one hot key, and a stream of distinct keys overflowing the LRU-bounded table."""
+    import database
+    from ratelimit import RateLimited, TokenBucketLimiter
+
+    limiter = TokenBucketLimiter("bench", rate=5 / 60, burst=5, max_keys=100_000)
+    hot = timed(lambda: limiter.take("victim@bench.test"), 200_000)
+    keys = iter([f"user{i}@bench.test" for i in range(1_000_000)])
+    distinct = timed(lambda: limiter.take(next(keys)), 1_000_000)
+    print(f"ratelimit: {1 / hot:,.0f} checks/s on one key, {1 / distinct:,.0f} checks/s over 1M keys "
+          f"({len(limiter):,} tracked)")
+
+    use_database(dataset(min(args.scales)))
+    for _ in range(10):  # use up the email's attempts
+        try:
+            database.login_user("stuffed@bench.test", "wrong")
+        except RateLimited:
+            pass
+
+    def refused():
+        try:
+            database.login_user("stuffed@bench.test", "wrong")
+        except RateLimited:
+            pass
+    return {"ratelimit.check_hot_key": hot, "ratelimit.check_distinct_keys": distinct,
+            "ratelimit.login_refused": timed(refused, 20_000)}
+
+
+def bench_designs(args):
+    import database
+
+    out = {}
+    for scale in args.scales:
+        path = dataset(scale)
+        use_database(path)
+        lo, hi = _user_range(path)
+        rng = random.Random(scale)
+        p50, p95 = sampled(lambda: database.get_user_designs(rng.randint(lo, hi)), 500)
+        out[f"designs.get_user_designs_{scale}"] = p50
+        out[f"designs.get_user_designs_{scale}_p95"] = p95
+    return out
+
+
+def bench_admin(args):
+    import database
+
+    out = {}
+    for scale in args.scales:
+        use_database(dataset(scale))
+        out[f"admin.admin_stats_{scale}"] = timed(database.admin_stats, 20)
+        out[f"admin.admin_all_bookings_{scale}"] = timed(database.admin_all_bookings, 3)
+    return out
+
+
+def bench_pages(args):
+    """Full script runs of each page through Streamlit's AppTest."""
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("pages: skipped – streamlit is not installed")
+        return {}
+    import database
+
+    path = dataset(min(args.scales))
+    use_database(path)
+    store = _session_store()
+    user = database.login_user(email(_user_range(path)[0]), PASSWORD)
+    admin = database.login_user("admin@interiordesign.com", "admin123")
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+    pages = [("home", None), ("login", None), ("dashboard", user), ("design", user), ("my_designs", user),
+             ("designers", user), ("payment", user), ("bookings", user),
+             ("admin", admin), ("admin_users", admin), ("admin_bookings", admin), ("admin_performance", admin)]
+    out = {}
+    for page, who in pages:
+        sid = _app_session(store, page=page, logged_in=who is not None, user=who)
+
+        def render():
+            at = AppTest.from_file(script, default_timeout=60)
+            at.session_state.sid = sid
+            at.run()
+            if at.exception:
+                raise RuntimeError(f"page {page}: {at.exception[0].message}")
+        render()  # warm imports and caches
+        out[f"pages.{page}"] = timed(render, 5)
+    return out
+
+
+def bench_wizard(args):
+    """Wizard results (step 3): the run that generates the plan, a later full rerun, and each fragment.
+
+    wizard.fragment.* is what an interaction inside that fragment costs; before the results were
+    stored and split into fragments, any interaction on the page cost a wizard.generate run.
+    """
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("wizard: skipped – streamlit is not installed")
+        return {}
+    import database
+    import tracing
+
+    path = dataset(min(args.scales))
+    use_database(path)
+    store = _session_store()
+    user = database.login_user(email(_user_range(path)[0]), PASSWORD)
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+    rng = random.Random(23)
+    generate, rerun = [], []
+    for _ in range(3):
+        answers = {f"w_{col}": choice for col, choice in zip(CATEGORIES, wizard_answers(rng))}
+        sid = _app_session(store, page="design", logged_in=True, user=user, wizard_step=3,
+                           w_special_notes="", **answers)
+        at = AppTest.from_file(script, default_timeout=60)
+        at.session_state.sid = sid
+        for runs in (generate, rerun):
+            start = time.perf_counter()
+            at.run()
+            runs.append(time.perf_counter() - start)
+            if at.exception:
+                raise RuntimeError(f"wizard: {at.exception[0].message}")
+
+    tracing.clear()
+    for _ in range(10):
+        at.run()
+    out = {"wizard.generate": sorted(generate)[1], "wizard.rerun": sorted(rerun)[1]}
+    for row in tracing.summary("fragment"):
+        out[f"wizard.fragment.{row['name']}"] = row["p50_ms"] / 1000
+    return out
+
+
+def bench_matching(args):
+    from matching import DesignerIndex
+
+    designers = synthetic_designers(10_000)
+    start = time.perf_counter()
+    index = DesignerIndex(designers)
+    build = time.perf_counter() - start
+
+    queries = [(s, b) for s in FURNITURE_STYLES for b in BUDGETS]
+    q = iter(queries * 10_000)
+    per_query = timed(lambda: index.top_k(*next(q), k=5), 50_000)
+    return {"matching.build_10000": build, "matching.top5_query": per_query}
+
+
+def bench_qr(args):
+    from payment_qr import UPI_ID, upi_qr_png
+
+    amounts = iter(range(1_000_000, 2_000_000))
+    cold = timed(lambda: upi_qr_png(UPI_ID, next(amounts)), 200)
+    upi_qr_png(UPI_ID, 9000)
+    warm = timed(lambda: upi_qr_png(UPI_ID, 9000), 100_000)
+    return {"qr.generate": cold, "qr.cached": warm}
+
+
+def bench_notes(args):
+    from notes import analyze_notes
+
+    rng = random.Random(3)
+    fragments = ["I have two cats", "need pet-friendly fabrics", "I work night shifts so need blackout options",
+                 "my mother uses a wheelchair", "toddler in the house", "asthma and dust allergies",
+                 "mostly WFH with video calls", "love warm colours", "big windows facing east", "no preference"]
+    notes = [". ".join(rng.sample(fragments, rng.randint(1, 4))) for _ in range(100_000)]
+    start = time.perf_counter()
+    for n in notes:
+        analyze_notes(n)
+    return {"notes.analyze": (time.perf_counter() - start) / len(notes)}
+
+
+def bench_similarity(args):
+    from similarity import SimilarityIndex
+
+    rng = random.Random(5)
+    sizes = [len(options) for _, options in CATEGORIES.values()]
+    rows = [tuple(rng.randint(1, n) for n in sizes) for _ in range(1_000_000)]
+    index = SimilarityIndex()
+    start = time.perf_counter()
+    for i, codes in enumerate(rows, 1):
+        index.add(i, codes)
+    build = time.perf_counter() - start
+
+    q = iter([(rng.choice(ROOM_TYPES), rng.choice(ROOM_SIZES), rng.choice(BUDGETS), rng.choice(LIFESTYLES))
+              for _ in range(20_000)])
+    popular = timed(lambda: index.popular_choices(*next(q)), 20_000)
+    rq = iter(rows)
+    nearest = timed(lambda: index.nearest(next(rq), k=10), 20_000)
+    return {"similarity.insert": build / len(rows), "similarity.popular": popular, "similarity.nearest": nearest}
+
+
+def bench_recommendations(args):
+    import itertools
+
+    import precompute
+    from ai_engine import generate_recommendations
+    from knowledge import current
+
+    kb = current()
+    combos = list(itertools.product(*(kb.options[col] for col in precompute.COLUMNS)))
+    calls = iter(combos * 4)
+    live = timed(lambda: generate_recommendations(*next(calls), ""), len(combos) * 2)
+
+    path = os.path.join(tempfile.mkdtemp(), "recommendations.bin")
+    start = time.perf_counter()
+    precompute.build(path, kb)
+    build = time.perf_counter() - start
+    original, precompute.PRECOMPUTED_PATH = precompute.PRECOMPUTED_PATH, path
+    precompute._checked_version = None
+    try:
+        mapped = timed(lambda: generate_recommendations(*next(calls), ""), len(combos) * 2)
+    finally:
+        precompute.PRECOMPUTED_PATH, precompute._checked_version = original, None
+    return {"recommendations.live": live, "recommendations.precomputed": mapped,
+            "recommendations.table_build": build}
+
+
+def bench_tracing(args):
+    import database
+    import tracing
+    from ai_engine import generate_recommendations
+
+    use_database(dataset(min(args.scales)))
+    answers = ("Bedroom", "Medium (100–250 sq ft)", BUDGETS[1], "Cool & Calm", "Minimalist", "Couple", "two cats")
+    cases = [("generate_recommendations", lambda: generate_recommendations(*answers), 20_000),
+             ("get_all_designers", database.get_all_designers, 5_000)]
+    before = tracing.ENABLED, tracing.SINKS_ENABLED
+    out = {}
+    for name, fn, repeat in cases:
+        # Alternate on/off runs so warm-up and drift hit both sides equally; "off" is
+        # TRACING=0 (ring buffer and metrics sink both off), "on" the default
+        runs = {False: [], True: []}
+        for _ in range(5):
+            for enabled in (False, True):
+                tracing.ENABLED = tracing.SINKS_ENABLED = enabled
+                runs[enabled].append(timed(fn, repeat))
+        out[f"tracing.{name}_off"], out[f"tracing.{name}_on"] = min(runs[False]), min(runs[True])
+        print(f"tracing: {name} overhead {out[f'tracing.{name}_on'] / out[f'tracing.{name}_off'] - 1:+.1%}")
+    tracing.ENABLED, tracing.SINKS_ENABLED = before
+    tracing.clear()
+    return out
+
+
+def bench_write_behind(args):
+    """Concurrent design saves: one commit per row vs. the group-committing write-behind queue."""
+    import shutil
+    from concurrent.futures import ThreadPoolExecutor
+
+    import database
+    from write_behind import BATCHES
+
+    work = tempfile.mkdtemp()
+    path = os.path.join(work, "saves.db")
+    shutil.copy(dataset(min(args.scales)), path)
+    use_database(path)
+    rng = random.Random(17)
+    rows = [(rng.randint(2, 10), dict(zip(CATEGORIES, wizard_answers(rng)), special_notes="")) for _ in range(4_000)]
+    threads = 16
+    out = {}
+    try:
+        for name, save in (("per_row_commit", lambda r: database._insert_design_requests([r])),
+                           ("group_commit", lambda r: database.save_design_request(*r))):
+            before = BATCHES.value(queue="design_requests")
+            start = time.perf_counter()
+            with ThreadPoolExecutor(threads) as pool:
+                list(pool.map(save, rows))
+            secs = time.perf_counter() - start
+            commits = len(rows) if name == "per_row_commit" else BATCHES.value(queue="design_requests") - before
+            print(f"write_behind: {name} {len(rows) / secs:,.0f} saves/s, {commits:,} commits "
+                  f"({commits / secs:,.0f}/s) from {threads} threads")
+            out[f"write_behind.{name}"] = secs / len(rows)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return out
+
+
+def bench_events(args):
+    """Event log: enqueue cost, group-committed throughput, and booking latency with and without events."""
+    import shutil
+    from concurrent.futures import ThreadPoolExecutor
+    from datetime import date, timedelta
+
+    import database
+
+    work = tempfile.mkdtemp()
+    path = os.path.join(work, "events.db")
+    shutil.copy(dataset(min(args.scales)), path)
+    use_database(path)
+    first_user = _user_range(path)[0]
+    designers = [d["id"] for d in database.get_all_designers()]
+    start_day = date.today() + timedelta(days=3_650)  # past any generated booking
+    n = iter(range(10**9))
+
+    def book():
+        i = next(n)
+        slot, designer = divmod(i, len(designers))
+        database.create_booking(first_user, designers[designer], None,
+                                str(start_day + timedelta(days=slot // 4)), database.TIME_SLOTS[slot % 4],
+                                "Full Room Design", 499.0)
+
+    out = {}
+    try:
+        record = database.record_event
+        database.record_event = lambda *a, **k: None
+        out["events.booking_without_log"] = sampled(book, 500)[0]
+        database.record_event = record
+        out["events.booking_with_log"] = sampled(book, 500)[0]
+        database._event_writes().flush()
+
+        out["events.record"] = timed(lambda: database.record_event("login", user_id=first_user, result="success"),
+                                     20_000)
+        database._event_writes().flush()
+
+        events, threads = 40_000, 16
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(lambda i: database.record_event("login", user_id=i, result="success"), range(events)))
+        database._event_writes().flush()
+        secs = time.perf_counter() - start
+        print(f"events: {events / secs:,.0f} events/s committed from {threads} threads")
+        out["events.throughput"] = secs / events
+
+        booking = database.booking_events  # history of a booking made above
+        bookings = database.get_user_bookings(first_user)
+        out["events.booking_history"] = timed(lambda: booking(bookings[0]["id"]), 500)
+    finally:
+        database.record_event = record
+        shutil.rmtree(work, ignore_errors=True)
+    return out
+
+
+def bench_scaling(args):
+    """Session throughput at 1, 2, 4… processes up to the core count, writes through one writer process.
+
+    Near-linear scaling shows as a flat seconds-per-session × processes.
+    """
+    import shutil
+
+    import writer
+    from loadtest import drive
+
+    work = tempfile.mkdtemp()  # 0700, as writer.spawn requires
+    path = os.path.join(work, "scaling.db")
+    shutil.copy(dataset(min(args.scales)), path)  # sessions write; keep the cached dataset as it was
+    address = os.path.join(work, "writer.sock")
+    proc = writer.spawn(address, env=dict(os.environ, DB_PATH=path, METRICS_PORT="0"))
+    cores = os.cpu_count() or 1
+    counts = sorted({1, cores, *(n for n in (2, 4, 8, 16, 32) if n < cores)})
+    out, base = {}, None
+    try:
+        for n in counts:
+            report = drive(path, processes=n, sessions=200, writer_address=address,
+                           writer_authkey=proc.authkey)
+            if report["errors"]:
+                raise RuntimeError(f"scaling: {len(report['errors'])} failed sessions, e.g. {report['errors'][0]}")
+            base = base or report["sessions_per_s"]
+            print(f"scaling: {n} process(es) {report['sessions_per_s']:,.0f} sessions/s, "
+                  f"{report['sessions_per_s'] / (base * n):.0%} of linear")
+            out[f"scaling.session_{n}_procs"] = report["seconds"] / report["sessions"]
+    finally:
+        proc.terminate()
+        shutil.rmtree(work, ignore_errors=True)
+    return out
+
+
+BENCHMARKS = {
+    "ai": bench_ai,
+    "auth": bench_auth,
+    "ratelimit": bench_ratelimit,
+    "designs": bench_designs,
+    "admin": bench_admin,
+    "pages": bench_pages,
+    "wizard": bench_wizard,
+    "matching": bench_matching,
+    "qr": bench_qr,
+    "notes": bench_notes,
+    "similarity": bench_similarity,
+    "recommendations": bench_recommendations,
+    "tracing": bench_tracing,
+    "write_behind": bench_write_behind,
+    "events": bench_events,
+    "scaling": bench_scaling,
+}
+
+
+# ── Results & regression check ─────────────────────────────────────────────────
+
+def fmt(seconds):
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.2f} µs"
+
+
+def threshold(metric):
+    """Allowed slowdown for a metric: exact name, then "prefix." entries, then the default."""
+    if metric in THRESHOLDS:
+        return THRESHOLDS[metric]
+    for prefix, limit in THRESHOLDS.items():
+        if prefix.endswith(".") and metric.startswith(prefix):
+            return limit
+    return DEFAULT_THRESHOLD
+
+
+def compare(results, baseline):
+    """Print each shared metric against the baseline; returns the regressed metric names."""
+    regressed = []
+    for metric in sorted(results.keys() & baseline.keys()):
+        old, new = baseline[metric], results[metric]
+        change = new / old - 1 if old else 0.0
+        flag = change > threshold(metric)
+        if flag:
+            regressed.append(metric)
+        print(f"  {metric:<44} {fmt(old):>10} → {fmt(new):>10}  {change:+7.1%}{'  REGRESSION' if flag else ''}")
+    return regressed
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time hot paths; optionally compare against a saved run.")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run (default: all) – {', '.join(BENCHMARKS)}")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="comma-separated design_requests row counts for the database benchmarks")
+    parser.add_argument("--json", metavar="PATH", help="save results to PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against results saved with --json")
+    args = parser.parse_args(argv)
+    unknown = [n for n in args.names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    args.scales = [int(s) for s in args.scales.split(",")]
+
+    results = {}
+    for name in args.names or BENCHMARKS:
+        for metric, seconds in BENCHMARKS[name](args).items():
+            print(f"{metric:<46} {fmt(seconds):>10}")
+            results[metric] = seconds
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"commit": _git_commit(), "python": platform.python_version(),
+                       "platform": platform.platform(), "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                       "scales": args.scales, "results": results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\nvs. {args.baseline} (commit {baseline.get('commit')}):")
+        regressed = compare(results, baseline["results"])
+        if regressed:
+            print(f"{len(regressed)} metric(s) regressed past threshold")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""
+Design Categories – the wizard's option lists as small-integer codes
+The lists come from the knowledge base (knowledge_base.json) and are shared
+by database.py (lookup tables referenced by design_requests), matching.py and
+similarity.py.
+
+Codes are 1-based positions in these tuples and are persisted, so only ever
+append new options – never reorder or remove existing ones. knowledge.py
+rejects a reload that would. encode/decode follow the active knowledge base,
+so an option appended by a hot reload gets its own code straight away; every
+positive code is reserved for the knowledge base, and labels outside it
+(legacy rows, free text) are stored under negative ids (see database.py).
+"""
+
+from knowledge import current
+
+# Options as of the knowledge base loaded at start-up; later versions may only append
+_OPTIONS = current().options
+
+ROOM_TYPES = _OPTIONS["room_type"]
+ROOM_SIZES = _OPTIONS["room_size"]
+BUDGETS = _OPTIONS["budget"]
+COLOR_THEMES = _OPTIONS["color_theme"]
+FURNITURE_STYLES = _OPTIONS["furniture_style"]
+LIFESTYLES = _OPTIONS["lifestyle"]
+
+# design_requests column -> (lookup table, options)
+CATEGORIES = {
+    "room_type": ("room_types", ROOM_TYPES),
+    "room_size": ("room_sizes", ROOM_SIZES),
+    "budget": ("budgets", BUDGETS),
+    "color_theme": ("color_themes", COLOR_THEMES),
+    "furniture_style": ("furniture_styles", FURNITURE_STYLES),
+    "lifestyle": ("lifestyles", LIFESTYLES),
+}
+
+
+
+def encode(column, label):
+    """Code for a label, or None if it is not an option of the active knowledge base."""
+    return current().code(column, label) or None
+
+
+def decode(column, code):
+    return current().label(column, code) if code else None
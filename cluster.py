@@ -0,0 +1,231 @@
+"""
+Cluster Mode – N app processes behind a local load balancer
+Runs one Streamlit process per worker on consecutive ports, a single writer
+process that all database writes go through (writer.py), a shared cache in
+/dev/shm (shared_cache.py) and a small proxy on the public port. No routing
+is sticky: any worker can serve any request, because session state lives in
+the shared session store (sessions.py). A tab keeps its session id in the
+worker's memory; when its WebSocket reconnects to a different worker, the
+single-use resume token in its URL is redeemed there for a fresh id, so no
+session id ever appears in a URL.
+
+The proxy balances WebSocket connections (one per browser tab) round-robin
+and pipes them through. Plain HTTP requests are forwarded one per
+connection; /media/ URLs (images and downloads) exist only in the process
+that rendered them, so those are tried on each worker until one has it.
+Either way the client's address is passed on in X-Forwarded-For.
+
+Workers that exit are restarted. Each worker serves its metrics on
+METRICS_PORT + worker number, the writer on METRICS_PORT + worker count.
+
+Usage:
+    python cluster.py --workers 4 --port 8501
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import tempfile
+
+import writer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEAD_LIMIT = 64 * 1024
+MEDIA_PREFIX = b"/media/"
+
+
+# ── Proxy ──────────────────────────────────────────────────────────────────────
+
+async def _pipe(reader, writer_):
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer_.write(data)
+            await writer_.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer_.close()
+
+
+def _forwarded_for(headers, peer):
+    """Headers with X-Forwarded-For replaced by the peer address, which the app rate-limits on."""
+    kept = [h for h in headers if not h.lower().startswith(b"x-forwarded-for:")]
+    if peer:
+        kept.append(b"X-Forwarded-For: " + peer[0].encode())
+    return kept
+
+
+class Proxy:
+    def __init__(self, backends):
+        self.backends = backends  # [(host, port)]
+        self._next = itertools.cycle(range(len(backends)))
+
+    def _order(self):
+        """Backends starting from the next in round-robin order."""
+        start = next(self._next)
+        return self.backends[start:] + self.backends[:start]
+
+    async def _connect(self, candidates):
+        for host, port in candidates:
+            try:
+                return await asyncio.open_connection(host, port)
+            except OSError:
+                continue  # worker down or restarting
+        return None
+
+    async def handle(self, client_reader, client_writer):
+        try:
+            head = await client_reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            client_writer.close()
+            return
+        lines = head[:-4].split(b"\r\n")
+        path = lines[0].split(b" ")[1] if lines[0].count(b" ") >= 2 else b"/"
+        headers = _forwarded_for(lines[1:], client_writer.get_extra_info("peername"))
+        if any(h.lower().startswith(b"upgrade:") for h in headers):
+            head = b"\r\n".join([lines[0], *headers, b"", b""])
+            await self._tunnel(head, client_reader, client_writer)
+        else:
+            await self._forward(lines[0], headers, path, client_reader, client_writer)
+
+    async def _tunnel(self, head, client_reader, client_writer):
+        backend = await self._connect(self._order())
+        if backend is None:
+            client_writer.write(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\n\r\n")
+            client_writer.close()
+            return
+        backend_reader, backend_writer = backend
+        backend_writer.write(head)
+        await asyncio.gather(_pipe(client_reader, backend_writer), _pipe(backend_reader, client_writer))
+
+    async def _forward(self, request_line, headers, path, client_reader, client_writer):
+        length = 0
+        kept = []
+        for h in headers:
+            name = h.split(b":", 1)[0].strip().lower()
+            if name == b"content-length":
+                length = int(h.split(b":", 1)[1])
+            if name not in (b"connection", b"keep-alive"):
+                kept.append(h)
+        body = await client_reader.readexactly(length) if length else b""
+        request = b"\r\n".join([request_line, *kept, b"Connection: close", b"", b""]) + body
+
+        candidates = self._order()
+        media = path.startswith(MEDIA_PREFIX)
+        for i, (host, port) in enumerate(candidates):
+            try:
+                backend_reader, backend_writer = await asyncio.open_connection(host, port)
+            except OSError:
+                continue
+            backend_writer.write(request)
+            status = await backend_reader.readline()
+            if media and b" 404 " in status and i < len(candidates) - 1:
+                backend_writer.close()  # rendered by another worker
+                continue
+            client_writer.write(status)
+            await _pipe(backend_reader, client_writer)
+            backend_writer.close()
+            return
+        client_writer.write(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\n\r\n")
+        client_writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port, limit=HEAD_LIMIT)
+        async with server:
+            await server.serve_forever()
+
+
+# ── Processes ──────────────────────────────────────────────────────────────────
+
+def cluster_env(runtime_dir):
+    """Environment shared by the writer and every worker."""
+    shm = "/dev/shm" if os.path.isdir("/dev/shm") else runtime_dir
+    env = dict(os.environ)
+    env.update({
+        "WRITER_ADDRESS": os.path.join(runtime_dir, "writer.sock"),
+        "WRITER_AUTHKEY": secrets.token_hex(16),
+        "SHARED_CACHE": os.path.join(shm, f"interior-cache-{os.getpid()}.db"),
+        "SESSIONS_SHARED": "1",
+        # Workers are reached only through the proxy below, which sets X-Forwarded-For
+        "TRUST_FORWARDED_FOR": "1",
+        # Same XSRF cookie secret everywhere, so a form posted to one worker validates on another
+        "STREAMLIT_SERVER_COOKIE_SECRET": env.get("STREAMLIT_SERVER_COOKIE_SECRET") or secrets.token_hex(32),
+    })
+    return env
+
+
+def start_worker(i, port, env):
+    worker_env = dict(env, METRICS_PORT=str(int(env.get("METRICS_PORT", 9464)) + i))
+    return subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(HERE, "app.py"),
+         "--server.port", str(port), "--server.address", "127.0.0.1", "--server.headless", "true"],
+        env=worker_env)
+
+
+async def supervise(workers, ports, env):
+    while True:
+        await asyncio.sleep(1.0)
+        for i, proc in enumerate(workers):
+            if proc.poll() is not None:
+                print(f"cluster: worker {i} exited with {proc.returncode}, restarting", file=sys.stderr)
+                workers[i] = start_worker(i, ports[i], env)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several app processes behind a local load balancer.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--port", type=int, default=8501, help="public port")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--first-worker-port", type=int, default=8601)
+    args = parser.parse_args()
+
+    import precompute
+    from knowledge import current
+
+    # Build the shared recommendation table up front so workers map one file instead of computing live
+    if precompute.table_for(current()) is None:
+        precompute.build()
+
+    runtime_dir = tempfile.mkdtemp(prefix="interior-cluster-")  # 0700, as writer.spawn requires
+    env = cluster_env(runtime_dir)
+    writer_proc = writer.spawn(env["WRITER_ADDRESS"],
+                               env=dict(env, METRICS_PORT=str(int(env.get("METRICS_PORT", 9464)) + args.workers)))
+    ports = [args.first_worker_port + i for i in range(args.workers)]
+    workers = [start_worker(i, port, env) for i, port in enumerate(ports)]
+    print(f"cluster: {args.workers} workers on {ports[0]}–{ports[-1]}, proxy on {args.host}:{args.port}",
+          file=sys.stderr)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        stop = loop.create_future()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set_result, None)
+        proxy = Proxy([("127.0.0.1", p) for p in ports])
+        tasks = [asyncio.create_task(proxy.serve(args.host, args.port)),
+                 asyncio.create_task(supervise(workers, ports, env))]
+        await stop
+        for t in tasks:
+            t.cancel()
+
+    try:
+        asyncio.run(run())
+    finally:
+        for proc in [*workers, writer_proc]:
+            proc.terminate()
+        for proc in [*workers, writer_proc]:
+            proc.wait(timeout=10)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(env["SHARED_CACHE"] + suffix):
+                os.unlink(env["SHARED_CACHE"] + suffix)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,186 @@
 import sqlite3
 import hashlib
+import json
 import os
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, date, timedelta, timezone
+from functools import wraps
 
-DB_PATH = "interior_design.db"
+from categories import CATEGORIES, encode
+from knowledge import current
+from matching import specialization_styles
+from storage import get_backend
+from tracing import trace_connection, trace_cursor
+from metrics import counter, histogram
+from ratelimit import RateLimited, check_login, login_succeeded
+from shared_cache import cached, invalidate
+from write_behind import WriteBehindQueue
+from writer import single_writer
+
+TIME_SLOTS = (
+    "09:00 AM – 11:00 AM", "11:00 AM – 01:00 PM",
+    "02:00 PM – 04:00 PM", "04:00 PM – 06:00 PM",
+)
+
+DESIGNER_COUNT_TTL = 60  # seconds a cached per-filter directory count stays valid
+DESIGNER_COUNT_KEYS = 256  # filter combinations whose counts are kept, least recently used dropped
+
+class SlotTakenError(Exception):
+    """The designer already has a booking in the requested date/slot."""
+
+# Callables run as hook(design_id, user_id, codes) after a design request is committed
+DESIGN_SAVED_HOOKS = []
+
+LOCK_RETRIES = 3         # extra attempts when SQLite reports "database is locked"
+LOCK_BACKOFF = 0.05      # seconds, doubled per attempt
+
+DB_LOCK_RETRIES = counter("db_lock_retries_total", "Writes retried after 'database is locked'.", ("function",))
+DB_LOCK_WAIT = histogram("db_lock_wait_seconds", "Time from first lock error to a successful write.", ("function",))
+LOGINS = counter("auth_logins_total", "Login attempts by result.", ("result",))
+BOOKINGS = counter("bookings_total", "Booking attempts by result.", ("result",))
+CACHE_LOOKUPS = counter("cache_lookups_total", "In-process cache lookups by result.", ("cache", "result"))
+
+def _retry_locked(fn):
+    """Re-run a write when another connection holds the SQLite write lock past the busy timeout."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        first_error = None
+        for attempt in range(LOCK_RETRIES + 1):
+            try:
+                result = fn(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) or attempt == LOCK_RETRIES:
+                    raise
+                first_error = first_error or time.monotonic()
+                DB_LOCK_RETRIES.inc(function=fn.__name__)
+            else:
+                if first_error is not None:
+                    DB_LOCK_WAIT.observe(time.monotonic() - first_error, function=fn.__name__)
+                return result
+            # Outside the except block, so the failed call's connection is already released
+            time.sleep(LOCK_BACKOFF * 2 ** attempt)
+    return wrapper
 
 def get_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return trace_connection(get_backend().connect())
+
+def get_analytics_connection():
+    """Read-only connection for admin analytics (snapshot or replica when configured)."""
+    return trace_connection(get_backend().analytics_connect())
+
+def server_cursor(conn):
+    """Cursor for large result sets – streamed server-side on PostgreSQL."""
+    return trace_cursor(get_backend().cursor(conn, server_side=True))
+
+DESIGN_CODE_COLUMNS = ",\n            ".join(
+    f"{col}_id INTEGER REFERENCES {table}(id)" for col, (table, _) in CATEGORIES.items())
+
+# Lookup ids: a positive id is the knowledge-base code of its label, reserved even
+# before the option exists; labels the knowledge base doesn't have get negative ids
+_SPARE_ID = "SELECT COALESCE(MIN(CASE WHEN id < 0 THEN id ELSE 0 END), 0) - 1"
+
+_claimed_codes = set()  # (column, code) rows known to hold the knowledge-base label
+
+def _category_id(c, column, label, claimed=None):
+    """Small-integer id for a wizard option, adding unseen labels to its lookup table.
+
+    Codes of options appended by a knowledge-base reload are claimed on first use
+    and added to `claimed`; the caller records them once its transaction commits.
+    """
+    if label is None:
+        return None
+    code = encode(column, label)
+    if code is not None:
+        if (column, code) not in _claimed_codes:
+            _claim_code(c, column, code, label)
+            if claimed is not None:
+                claimed.add((column, code))
+        return code
+    table = CATEGORIES[column][0]
+    c.execute(f"SELECT id FROM {table} WHERE label=?", (label,))
+    row = c.fetchone()
+    if row:
+        return row[0]
+    c.execute(f"""INSERT INTO {table} (id, label)
+                  {_SPARE_ID}, ? FROM {table} WHERE true
+                  ON CONFLICT DO NOTHING""", (label,))
+    c.execute(f"SELECT id FROM {table} WHERE label=?", (label,))
+    return c.fetchone()[0]
+
+def _claim_code(c, column, code, label):
+    """Make lookup row `code` hold `label`, moving aside whatever was there first."""
+    table = CATEGORIES[column][0]
+    c.execute(f"SELECT id, label FROM {table} WHERE id=? OR label=?", (code, label))
+    held = dict(c.fetchall())
+    if held.get(code) == label:
+        return
+    if code in held:
+        c.execute(f"{_SPARE_ID} FROM {table}")
+        _move_category(c, column, code, c.fetchone()[0])
+    previous = next((i for i, held_label in held.items() if held_label == label), None)
+    if previous is not None:
+        _move_category(c, column, previous, code)
+    else:
+        c.execute(f"INSERT INTO {table} (id, label) VALUES (?,?)", (code, label))
+
+def _move_category(c, column, old, new):
+    """Renumber a lookup row and the design requests that reference it."""
+    table = CATEGORIES[column][0]
+    c.execute(f"SELECT label FROM {table} WHERE id=?", (old,))
+    label = c.fetchone()[0]
+    # The label stays unique until the old row is gone, so park a placeholder first
+    c.execute(f"INSERT INTO {table} (id, label) VALUES (?,?)", (new, f"\t{table}:{old}"))
+    c.execute(f"UPDATE design_requests SET {column}_id=? WHERE {column}_id=?", (new, old))
+    c.execute(f"DELETE FROM {table} WHERE id=?", (old,))
+    c.execute(f"UPDATE {table} SET label=? WHERE id=?", (label, new))
+
+def _sync_categories(c):
+    """Bring the lookup tables in line with the active knowledge base.
+
+    Rows that a bad seed or an older append left on a code the knowledge base
+    reserves for another label are moved to negative ids, then every option is
+    claimed at its code.
+    """
+    kb = current()
+    _claimed_codes.clear()
+    for column, (table, _) in CATEGORIES.items():
+        c.execute(f"SELECT id, label FROM {table} WHERE id > 0")
+        for row_id, label in c.fetchall():
+            if kb.code(column, label) != row_id:
+                c.execute(f"{_SPARE_ID} FROM {table}")
+                _move_category(c, column, row_id, c.fetchone()[0])
+        for code, label in enumerate(kb.options[column], 1):
+            _claim_code(c, column, code, label)
+            _claimed_codes.add((column, code))
+
+def _migrate_legacy_designs(c):
+    """Copy text-column design_requests rows into the id-column table, then drop the old table."""
+    for column, (table, _) in CATEGORIES.items():
+        c.execute(f"""INSERT INTO {table} (id, label)
+                      SELECT ({_SPARE_ID} FROM {table}) + 1 - ROW_NUMBER() OVER (ORDER BY v), v
+                      FROM (SELECT DISTINCT {column} AS v FROM design_requests_legacy
+                            WHERE {column} IS NOT NULL
+                              AND {column} NOT IN (SELECT label FROM {table})) AS unseen""")
+    ids = ", ".join(f"(SELECT id FROM {t} WHERE label = l.{col})" for col, (t, _) in CATEGORIES.items())
+    c.execute(f"""INSERT INTO design_requests
+                  (id, user_id, {", ".join(f"{col}_id" for col in CATEGORIES)}, special_notes, status, created_at)
+                  SELECT l.id, l.user_id, {ids}, l.special_notes, l.status, l.created_at
+                  FROM design_requests_legacy l""")
+    c.execute("DROP TABLE design_requests_legacy")
+    get_backend().sync_id_sequence(c, "design_requests")
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
 def init_db():
+    backend = get_backend()
     conn = get_connection()
     c = conn.cursor()
 
-    c.execute("""
+    c.execute(backend.ddl("""
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
@@ -27,30 +190,51 @@ def init_db():
             role TEXT DEFAULT 'user',
             created_at TEXT DEFAULT CURRENT_TIMESTAMP
         )
-    """)
+    """))
 
-    c.execute("""
+    # Wizard categories live in small lookup tables; design_requests stores their ids.
+    # The seed skips conflicting rows; _sync_categories below settles those.
+    kb = current()
+    for column, (table, _) in CATEGORIES.items():
+        c.execute(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, label TEXT UNIQUE NOT NULL)")
+        c.executemany(f"INSERT INTO {table} (id, label) VALUES (?,?) ON CONFLICT DO NOTHING",
+                      list(enumerate(kb.options[column], 1)))
+
+    legacy = "room_type" in backend.table_columns(c, "design_requests")
+    if legacy:
+        c.execute("ALTER TABLE design_requests RENAME TO design_requests_legacy")
+
+    c.execute(backend.ddl(f"""
         CREATE TABLE IF NOT EXISTS design_requests (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id INTEGER NOT NULL,
-            room_type TEXT,
-            room_size TEXT,
-            budget TEXT,
-            color_theme TEXT,
-            furniture_style TEXT,
-            lifestyle TEXT,
+            {DESIGN_CODE_COLUMNS},
             special_notes TEXT,
             status TEXT DEFAULT 'pending',
             created_at TEXT DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY(user_id) REFERENCES users(id)
         )
-    """)
+    """))
+    c.execute("CREATE INDEX IF NOT EXISTS idx_design_requests_user ON design_requests(user_id, created_at)")
 
-    c.execute("""
+    if legacy:
+        _migrate_legacy_designs(c)
+    _sync_categories(c)
+
+    c.execute(backend.ddl(f"""
+        CREATE VIEW IF NOT EXISTS design_requests_labeled AS
+        SELECT d.id, d.user_id, {", ".join(f"{t}.label AS {col}" for col, (t, _) in CATEGORIES.items())},
+               d.special_notes, d.status, d.created_at
+        FROM design_requests d
+        {" ".join(f"LEFT JOIN {t} ON {t}.id = d.{col}_id" for col, (t, _) in CATEGORIES.items())}
+    """))
+
+    c.execute(backend.ddl("""
         CREATE TABLE IF NOT EXISTS bookings (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id INTEGER NOT NULL,
             design_id INTEGER,
+            designer_id INTEGER,
             designer_name TEXT,
             booking_date TEXT,
             time_slot TEXT,
@@ -61,9 +245,9 @@ def init_db():
             created_at TEXT DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY(user_id) REFERENCES users(id)
         )
-    """)
+    """))
 
-    c.execute("""
+    c.execute(backend.ddl("""
         CREATE TABLE IF NOT EXISTS payments (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id INTEGER NOT NULL,
@@ -75,9 +259,9 @@ def init_db():
             created_at TEXT DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY(user_id) REFERENCES users(id)
         )
-    """)
+    """))
 
-    c.execute("""
+    c.execute(backend.ddl("""
         CREATE TABLE IF NOT EXISTS designers (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
@@ -86,9 +270,36 @@ def init_db():
             rating REAL DEFAULT 4.5,
             price_per_hour REAL,
             availability TEXT DEFAULT 'Available',
-            image_url TEXT
+            image_url TEXT,
+            thumbnail TEXT
         )
-    """)
+    """))
+    if "thumbnail" not in backend.table_columns(c, "designers"):
+        c.execute("ALTER TABLE designers ADD COLUMN thumbnail TEXT")
+
+    # One row per taken (designer, date, slot); the unique key is what makes booking atomic
+    new_calendar = not backend.table_columns(c, "designer_slots")
+    c.execute(backend.ddl("""
+        CREATE TABLE IF NOT EXISTS designer_slots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            designer_id INTEGER NOT NULL,
+            slot_date TEXT NOT NULL,
+            slot TEXT NOT NULL,
+            booking_id INTEGER,
+            UNIQUE(designer_id, slot_date, slot),
+            FOREIGN KEY(designer_id) REFERENCES designers(id)
+        )
+    """))
+    c.execute("CREATE INDEX IF NOT EXISTS idx_designer_slots_booking ON designer_slots(booking_id)")
+    if "designer_id" not in backend.table_columns(c, "bookings"):
+        # Older bookings only recorded the designer's name
+        c.execute("ALTER TABLE bookings ADD COLUMN designer_id INTEGER")
+        c.execute("UPDATE bookings SET designer_id = (SELECT MIN(id) FROM designers WHERE name = bookings.designer_name)")
+    if new_calendar:
+        c.execute("""INSERT INTO designer_slots (designer_id, slot_date, slot, booking_id)
+                     SELECT designer_id, booking_date, time_slot, MIN(id) FROM bookings
+                     WHERE designer_id IS NOT NULL AND booking_status != 'Rejected'
+                     GROUP BY designer_id, booking_date, time_slot""")
 
     # Insert sample designers if empty
     c.execute("SELECT COUNT(*) FROM designers")
@@ -102,6 +313,21 @@ def init_db():
         ]
         c.executemany("INSERT INTO designers (name, specialization, experience, rating, price_per_hour, availability, image_url) VALUES (?,?,?,?,?,?,?)", designers)
 
+    # Style tags parsed from specialization so the directory can filter on an index
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS designer_styles (
+            designer_id INTEGER NOT NULL,
+            style_id INTEGER NOT NULL REFERENCES furniture_styles(id),
+            PRIMARY KEY(style_id, designer_id)
+        )
+    """)
+    c.execute("""SELECT id, specialization FROM designers
+                 WHERE id NOT IN (SELECT designer_id FROM designer_styles)""")
+    c.executemany("INSERT INTO designer_styles (designer_id, style_id) VALUES (?,?) ON CONFLICT DO NOTHING",
+                  [(r[0], code) for r in c.fetchall() for code in specialization_styles(r[1])])
+    c.execute("CREATE INDEX IF NOT EXISTS idx_designers_rating ON designers(rating DESC, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_designers_price ON designers(price_per_hour)")
+
     # Insert admin user
     c.execute("SELECT COUNT(*) FROM users WHERE role='admin'")
     if c.fetchone()[0] == 0:
@@ -111,6 +337,8 @@ def init_db():
     conn.commit()
     conn.close()
 
+@single_writer
+@_retry_locked
 def register_user(name, email, password, phone):
     conn = get_connection()
     c = conn.cursor()
@@ -119,40 +347,117 @@ def register_user(name, email, password, phone):
                   (name, email, hash_password(password), phone))
         conn.commit()
         return True, "Registration successful!"
-    except sqlite3.IntegrityError:
+    except get_backend().IntegrityError:
         return False, "Email already registered!"
     finally:
         conn.close()
 
-def login_user(email, password):
+def login_user(email, password, client=None):
+    """The user's row as a dict, or None for a wrong email/password.
+
+    Raises ratelimit.RateLimited – before touching the database – once `email`
+    or `client` (the caller's address, when known) has used up its attempts.
+    """
+    try:
+        check_login(email, client)
+    except RateLimited:
+        LOGINS.inc(result="throttled")
+        raise
     conn = get_connection()
     c = conn.cursor()
     c.execute("SELECT * FROM users WHERE email=? AND password=?", (email, hash_password(password)))
     user = c.fetchone()
     conn.close()
+    LOGINS.inc(result="success" if user else "failure")
+    if user:
+        login_succeeded(email)
+    record_event("login", user_id=user['id'] if user else None,
+                 result="success" if user else "failure", email=email)
     return dict(user) if user else None
 
 def save_design_request(user_id, data):
+    return save_design_request_async(user_id, data).result()
+
+def save_design_request_async(user_id, data):
+    """Queue a design request for the next group commit; the Future resolves to its id.
+
+    DESIGN_SAVED_HOOKS run once the row is committed, before the Future resolves.
+    """
+    missing = [k for k in (*CATEGORIES, "special_notes") if k not in data]
+    if missing:
+        raise KeyError(f"design request is missing {missing}")
+    saved = Future()
+
+    def committed(row):
+        try:
+            design_id, codes = row.result()
+            for hook in DESIGN_SAVED_HOOKS:
+                hook(design_id, user_id, codes)
+        except Exception as e:
+            saved.set_exception(e)
+        else:
+            saved.set_result(design_id)
+
+    _design_writes().submit((user_id, dict(data))).add_done_callback(committed)
+    return saved
+
+_design_queue = None
+_design_queue_lock = threading.Lock()
+
+def _design_writes():
+    global _design_queue
+    if _design_queue is None:
+        with _design_queue_lock:
+            if _design_queue is None:
+                _design_queue = WriteBehindQueue("design_requests", _insert_design_requests)
+    return _design_queue
+
+@single_writer
+@_retry_locked
+def _insert_design_requests(rows):
+    """Insert [(user_id, data)] in one transaction; returns [(design_id, codes)] in the same order."""
     conn = get_connection()
-    c = conn.cursor()
-    c.execute("""INSERT INTO design_requests 
-                 (user_id, room_type, room_size, budget, color_theme, furniture_style, lifestyle, special_notes)
-                 VALUES (?,?,?,?,?,?,?,?)""",
-              (user_id, data['room_type'], data['room_size'], data['budget'],
-               data['color_theme'], data['furniture_style'], data['lifestyle'], data['special_notes']))
-    design_id = c.lastrowid
-    conn.commit()
-    conn.close()
-    return design_id
+    try:
+        c = conn.cursor()
+        out, claimed = [], set()
+        for user_id, data in rows:
+            codes = [_category_id(c, col, data[col], claimed) for col in CATEGORIES]
+            c.execute("""INSERT INTO design_requests 
+                         (user_id, room_type_id, room_size_id, budget_id, color_theme_id, furniture_style_id, lifestyle_id, special_notes)
+                         VALUES (?,?,?,?,?,?,?,?)""",
+                      (user_id, *codes, data['special_notes']))
+            out.append((c.lastrowid, codes))
+        conn.commit()
+        _claimed_codes.update(claimed)
+    finally:
+        conn.close()
+    return out
+
+def fetch_design_codes(after_id=0, chunk_size=10_000):
+    """Stream (id, *category codes) for design requests with id > after_id, in id order."""
+    conn = get_connection()
+    try:
+        c = server_cursor(conn)
+        c.execute(f"""SELECT id, {", ".join(f"{col}_id" for col in CATEGORIES)}
+                      FROM design_requests WHERE id > ? ORDER BY id""", (after_id,))
+        while True:
+            rows = c.fetchmany(chunk_size)
+            if not rows:
+                break
+            for r in rows:
+                yield tuple(r)
+    finally:
+        conn.close()
 
 def get_user_designs(user_id):
     conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT * FROM design_requests WHERE user_id=? ORDER BY created_at DESC", (user_id,))
+    c = server_cursor(conn)
+    c.execute("SELECT * FROM design_requests_labeled WHERE user_id=? ORDER BY created_at DESC", (user_id,))
     rows = [dict(r) for r in c.fetchall()]
     conn.close()
     return rows
 
+@cached("designers", ttl=300)
 def get_all_designers():
     conn = get_connection()
     c = conn.cursor()
@@ -161,6 +466,87 @@ def get_all_designers():
     conn.close()
     return rows
 
+@single_writer
+@_retry_locked
+def set_designer_thumbnail(designer_id, filename):
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("UPDATE designers SET thumbnail=? WHERE id=?", (filename, designer_id))
+    conn.commit()
+    conn.close()
+    invalidate("designers")
+
+def _designer_filters(style=None, min_price=None, max_price=None, min_rating=None, free_between=None):
+    """WHERE clause + params for the designer directory. free_between=(start, end) keeps
+    only designers marked Available with at least one open slot in that range."""
+    where, params = [], []
+    if style:
+        where.append("d.id IN (SELECT designer_id FROM designer_styles WHERE style_id=?)")
+        params.append(encode("furniture_style", style))
+    if min_price is not None:
+        where.append("d.price_per_hour >= ?")
+        params.append(min_price)
+    if max_price is not None:
+        where.append("d.price_per_hour < ?")
+        params.append(max_price)
+    if min_rating is not None:
+        where.append("d.rating >= ?")
+        params.append(min_rating)
+    if free_between:
+        start, end = free_between
+        capacity = ((end - start).days + 1) * len(TIME_SLOTS)
+        where.append("""d.availability='Available' AND
+                        (SELECT COUNT(*) FROM designer_slots s
+                         WHERE s.designer_id=d.id AND s.slot_date BETWEEN ? AND ?) < ?""")
+        params += [str(start), str(end), capacity]
+    return (" WHERE " + " AND ".join(where) if where else ""), params
+
+def search_designers(page=1, page_size=12, **filters):
+    """One page of the designer directory, best rated first."""
+    where, params = _designer_filters(**filters)
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(f"SELECT d.* FROM designers d{where} ORDER BY d.rating DESC, d.id LIMIT ? OFFSET ?",
+              (*params, page_size, (page - 1) * page_size))
+    rows = [dict(r) for r in c.fetchall()]
+    conn.close()
+    return rows
+
+_designer_counts = OrderedDict()  # filter key -> (count, computed at), least recently used first
+_designer_counts_lock = threading.Lock()
+
+def count_designers(**filters):
+    """Number of designers matching filters, cached per filter combination for DESIGNER_COUNT_TTL.
+
+    Counts filtered on free_between are not cached: every booking changes them
+    (in cluster mode in another process), and each day brings new date ranges.
+    """
+    cacheable = not filters.get("free_between")
+    key = tuple(sorted(filters.items()))
+    if cacheable:
+        with _designer_counts_lock:
+            hit = _designer_counts.get(key)
+            if hit and time.monotonic() - hit[1] < DESIGNER_COUNT_TTL:
+                _designer_counts.move_to_end(key)
+                CACHE_LOOKUPS.inc(cache="designer_count", result="hit")
+                return hit[0]
+        CACHE_LOOKUPS.inc(cache="designer_count", result="miss")
+    where, params = _designer_filters(**filters)
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(f"SELECT COUNT(*) FROM designers d{where}", params)
+    n = c.fetchone()[0]
+    conn.close()
+    if cacheable:
+        with _designer_counts_lock:
+            _designer_counts[key] = (n, time.monotonic())
+            _designer_counts.move_to_end(key)
+            while len(_designer_counts) > DESIGNER_COUNT_KEYS:
+                _designer_counts.popitem(last=False)
+    return n
+
+@single_writer
+@_retry_locked
 def create_booking(user_id, designer_id, design_id, date, slot, service, amount):
     conn = get_connection()
     c = conn.cursor()
@@ -168,17 +554,55 @@ def create_booking(user_id, designer_id, design_id, date, slot, service, amount)
     designer = c.fetchone()
     import random, string
     txn = ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
-    c.execute("""INSERT INTO bookings (user_id, design_id, designer_name, booking_date, time_slot, service_type, amount, payment_status)
-                 VALUES (?,?,?,?,?,?,?,?)""",
-              (user_id, design_id, designer['name'] if designer else "TBD", date, slot, service, amount, "completed"))
+    c.execute("""INSERT INTO bookings (user_id, design_id, designer_id, designer_name, booking_date, time_slot, service_type, amount, payment_status)
+                 VALUES (?,?,?,?,?,?,?,?,?)""",
+              (user_id, design_id, designer_id, designer['name'] if designer else "TBD", date, slot, service, amount, "completed"))
     booking_id = c.lastrowid
+    try:
+        c.execute("INSERT INTO designer_slots (designer_id, slot_date, slot, booking_id) VALUES (?,?,?,?)",
+                  (designer_id, date, slot, booking_id))
+    except get_backend().IntegrityError:
+        conn.rollback()
+        conn.close()
+        BOOKINGS.inc(result="slot_taken")
+        raise SlotTakenError(f"{slot} on {date} is already booked")
     c.execute("""INSERT INTO payments (user_id, booking_id, amount, payment_method, transaction_id, status)
                  VALUES (?,?,?,?,?,?)""",
               (user_id, booking_id, amount, "Card", txn, "completed"))
     conn.commit()
     conn.close()
+    BOOKINGS.inc(result="created")
+    record_event("booking_created", user_id=user_id, booking_id=booking_id, actor_id=user_id,
+                 designer_id=designer_id, date=date, slot=slot, service=service, amount=amount)
+    record_event("payment_submitted", user_id=user_id, booking_id=booking_id, actor_id=user_id,
+                 transaction_id=txn, amount=amount, method="Card")
     return booking_id, txn
 
+def get_free_slots(designer_ids, start, end):
+    """Free (date, slot) pairs per designer for start..end inclusive, from one indexed query.
+
+    Designers marked 'Busy' get no free slots.
+    """
+    designer_ids = list(designer_ids)
+    if not designer_ids:
+        return {}
+    marks = ",".join("?" * len(designer_ids))
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute(f"SELECT id FROM designers WHERE id IN ({marks}) AND availability='Available'", designer_ids)
+    open_ids = {r[0] for r in c.fetchall()}
+    c.execute(f"""SELECT designer_id, slot_date, slot FROM designer_slots
+                  WHERE designer_id IN ({marks}) AND slot_date BETWEEN ? AND ?""",
+              (*designer_ids, str(start), str(end)))
+    taken = {(r[0], r[1], r[2]) for r in c.fetchall()}
+    conn.close()
+
+    days = [str(start + timedelta(days=i)) for i in range((end - start).days + 1)]
+    return {
+        d: [(day, slot) for day in days for slot in TIME_SLOTS if (d, day, slot) not in taken] if d in open_ids else []
+        for d in designer_ids
+    }
+
 def get_user_bookings(user_id):
     conn = get_connection()
     c = conn.cursor()
@@ -188,8 +612,9 @@ def get_user_bookings(user_id):
     return rows
 
 # ── Admin ──
+@cached("admin_stats", ttl=30)
 def admin_stats():
-    conn = get_connection()
+    conn = get_analytics_connection()
     c = conn.cursor()
     stats = {}
     c.execute("SELECT COUNT(*) FROM users WHERE role='user'"); stats['users'] = c.fetchone()[0]
@@ -200,16 +625,16 @@ def admin_stats():
     return stats
 
 def admin_all_users():
-    conn = get_connection()
-    c = conn.cursor()
+    conn = get_analytics_connection()
+    c = server_cursor(conn)
     c.execute("SELECT id,name,email,phone,role,created_at FROM users ORDER BY created_at DESC")
     rows = [dict(r) for r in c.fetchall()]
     conn.close()
     return rows
 
 def admin_all_bookings():
-    conn = get_connection()
-    c = conn.cursor()
+    conn = get_analytics_connection()
+    c = server_cursor(conn)
     c.execute("""SELECT b.*, u.name as user_name, u.email as user_email 
                  FROM bookings b JOIN users u ON b.user_id=u.id 
                  ORDER BY b.created_at DESC""")
@@ -217,10 +642,157 @@ def admin_all_bookings():
     conn.close()
     return rows
 # Add this to the bottom of database.py
-def update_booking_status(booking_id, status):
+def update_booking_status(booking_id, status, actor_id=None):
+    """Set a booking's status; `actor_id` (the admin making the change) goes into the event log."""
+    owner_id, previous = _set_booking_status(booking_id, status)
+    get_backend().invalidate_analytics()
+    invalidate("admin_stats")
+    record_event("status_changed", user_id=owner_id, booking_id=booking_id, actor_id=actor_id,
+                 previous=previous, status=status)
+    return True
+
+@single_writer
+@_retry_locked
+def _set_booking_status(booking_id, status):
+    """Returns (user_id, previous status) of the booking.
+
+    Raises SlotTakenError, changing nothing, when a rejected booking is confirmed again
+    but another booking has taken its slot meanwhile.
+    """
     conn = get_connection()
     c = conn.cursor()
+    c.execute("SELECT user_id, booking_status, designer_id, booking_date, time_slot FROM bookings WHERE id=?",
+              (booking_id,))
+    row = c.fetchone()
+    if status == "Rejected":
+        # Give the slot back to the calendar
+        c.execute("DELETE FROM designer_slots WHERE booking_id=?", (booking_id,))
+    elif row is not None and row[2] is not None:
+        # Re-confirming a rejected booking reclaims its slot if nobody took it meanwhile
+        c.execute("""INSERT INTO designer_slots (designer_id, slot_date, slot, booking_id)
+                     VALUES (?,?,?,?) ON CONFLICT DO NOTHING""", (row[2], row[3], row[4], booking_id))
+        if c.rowcount == 0:
+            c.execute("SELECT booking_id FROM designer_slots WHERE designer_id=? AND slot_date=? AND slot=?",
+                      (row[2], row[3], row[4]))
+            holder = c.fetchone()
+            if holder is not None and holder[0] != booking_id:
+                conn.rollback()
+                conn.close()
+                BOOKINGS.inc(result="slot_taken")
+                raise SlotTakenError(f"{row[4]} on {row[3]} was booked by booking #{holder[0]} meanwhile")
     c.execute("UPDATE bookings SET booking_status=? WHERE id=?", (status, booking_id))
     conn.commit()
     conn.close()
-    return True
+    return (row[0], row[1]) if row else (None, None)
+
+# ── Event log ──
+# Append-only audit trail: one events_YYYYMM table per month, created on first
+# use. Events are queued and group-committed by a write-behind queue, so
+# recording one costs the caller a queue append, not a commit; they become
+# readable within EVENT_FLUSH_MS. Old months are dropped whole (DROP TABLE).
+
+EVENT_KINDS = ("booking_created", "payment_submitted", "status_changed", "login")
+EVENT_PREFIX = "events_"
+# Longer than the design queue's window: fewer commits contending with bookings for the write lock
+EVENT_FLUSH_MS = float(os.environ.get("EVENT_LOG_MS", 100))
+
+_event_partitions = set()   # tables this process has already created
+_event_queue = None
+_event_queue_lock = threading.Lock()
+
+def record_event(kind, user_id=None, booking_id=None, actor_id=None, **details):
+    """Queue an event for the log; returns a Future of its id that callers may ignore."""
+    if kind not in EVENT_KINDS:
+        raise ValueError(f"unknown event kind {kind!r}")
+    ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+    row = (ts, kind, user_id, booking_id, actor_id, json.dumps(details, default=str))
+    return _event_writes().submit(row)
+
+def _event_writes():
+    global _event_queue
+    if _event_queue is None:
+        with _event_queue_lock:
+            if _event_queue is None:
+                _event_queue = WriteBehindQueue("events", _append_events, flush_ms=EVENT_FLUSH_MS)
+    return _event_queue
+
+def _event_partition(ts):
+    return f"{EVENT_PREFIX}{ts[:4]}{ts[5:7]}"
+
+def _create_event_partition(c, table):
+    backend = get_backend()
+    c.execute(backend.ddl(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            user_id INTEGER,
+            booking_id INTEGER,
+            actor_id INTEGER,
+            details TEXT NOT NULL DEFAULT '{{}}'
+        )
+    """))
+    c.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_booking ON {table}(booking_id, ts) WHERE booking_id IS NOT NULL")
+    c.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_user ON {table}(user_id, ts) WHERE user_id IS NOT NULL")
+    if backend.name == "sqlite":
+        for op in ("UPDATE", "DELETE"):
+            c.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_no_{op.lower()} BEFORE {op} ON {table}
+                          BEGIN SELECT RAISE(ABORT, 'the event log is append-only'); END""")
+
+@single_writer
+@_retry_locked
+def _append_events(rows):
+    """Insert [(ts, kind, user_id, booking_id, actor_id, details)] in one transaction; returns their ids."""
+    conn = get_connection()
+    try:
+        c = conn.cursor()
+        ids = []
+        for ts, kind, user_id, booking_id, actor_id, details in rows:
+            table = _event_partition(ts)
+            if table not in _event_partitions:
+                _create_event_partition(c, table)
+            c.execute(f"""INSERT INTO {table} (ts, kind, user_id, booking_id, actor_id, details)
+                          VALUES (?,?,?,?,?,?)""", (ts, kind, user_id, booking_id, actor_id, details))
+            ids.append(c.lastrowid)
+        conn.commit()
+    finally:
+        conn.close()
+    # Only after the commit: a rolled-back CREATE TABLE must be retried next batch
+    _event_partitions.update(_event_partition(row[0]) for row in rows)
+    return ids
+
+def _event_tables(c):
+    """Partitions newest month first."""
+    return sorted((t for t in get_backend().table_names(c, EVENT_PREFIX) if t[len(EVENT_PREFIX):].isdigit()),
+                  reverse=True)
+
+def _event_row(table, r):
+    event = dict(r)
+    event['details'] = json.loads(event['details'])
+    event['partition'] = table
+    return event
+
+def booking_events(booking_id):
+    """A booking's full history, oldest first: who created, paid, confirmed or rejected it, and when."""
+    conn = get_connection()
+    c = conn.cursor()
+    events = []
+    for table in reversed(_event_tables(c)):
+        c.execute(f"SELECT * FROM {table} WHERE booking_id=? ORDER BY ts, id", (booking_id,))
+        events += [_event_row(table, r) for r in c.fetchall()]
+    conn.close()
+    return events
+
+def user_events(user_id, limit=100):
+    """A user's most recent events, newest first; stops reading partitions once `limit` is reached."""
+    conn = get_connection()
+    c = conn.cursor()
+    events = []
+    for table in _event_tables(c):
+        c.execute(f"SELECT * FROM {table} WHERE user_id=? ORDER BY ts DESC, id DESC LIMIT ?",
+                  (user_id, limit - len(events)))
+        events += [_event_row(table, r) for r in c.fetchall()]
+        if len(events) >= limit:
+            break
+    conn.close()
+    return events
@@ -0,0 +1,142 @@
+"""
+Columnar Export – incremental Parquet / Arrow IPC dumps for offline analytics
+Streams bookings, payments and design_requests in fixed-size chunks, so memory
+stays bounded regardless of table size, and only exports rows whose id is above
+the high-water mark recorded by the previous run.
+
+Usage:
+    python export.py EXPORT_DIR [--format parquet|arrow] [--chunk-size N] [--tables t1,t2]
+
+Layout:
+    EXPORT_DIR/<table>/part-<first_id>-<last_id>.parquet
+    EXPORT_DIR/_watermarks.json
+"""
+
+import argparse
+import json
+import os
+
+from database import get_analytics_connection, server_cursor
+
+EXPORT_TABLES = {
+    "design_requests": [
+        ("id", "int64"), ("user_id", "int64"), ("room_type", "string"), ("room_size", "string"),
+        ("budget", "string"), ("color_theme", "string"), ("furniture_style", "string"),
+        ("lifestyle", "string"), ("special_notes", "string"), ("status", "string"), ("created_at", "string"),
+    ],
+    "bookings": [
+        ("id", "int64"), ("user_id", "int64"), ("design_id", "int64"), ("designer_id", "int64"),
+        ("designer_name", "string"),
+        ("booking_date", "string"), ("time_slot", "string"), ("service_type", "string"),
+        ("amount", "float64"), ("payment_status", "string"), ("booking_status", "string"), ("created_at", "string"),
+    ],
+    "payments": [
+        ("id", "int64"), ("user_id", "int64"), ("booking_id", "int64"), ("amount", "float64"),
+        ("payment_method", "string"), ("transaction_id", "string"), ("status", "string"), ("created_at", "string"),
+    ],
+}
+
+# Tables stored as lookup-table ids are exported with their labels resolved
+EXPORT_SOURCES = {"design_requests": "design_requests_labeled"}
+
+WATERMARK_FILE = "_watermarks.json"
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+def load_watermarks(export_dir):
+    path = os.path.join(export_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_watermarks(export_dir, marks):
+    path = os.path.join(export_dir, WATERMARK_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(marks, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _arrow_schema(pa, columns):
+    types = {"int64": pa.int64(), "float64": pa.float64(), "string": pa.string()}
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+def _open_writer(pa, path, schema, fmt):
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(path, schema, compression="zstd")
+    return pa.ipc.new_file(path, schema)
+
+
+def export_table(table, export_dir, since_id=0, chunk_size=DEFAULT_CHUNK_SIZE, fmt="parquet"):
+    """Append rows with id > since_id as one new part file. Returns (rows_written, new_high_water_mark)."""
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise RuntimeError("Columnar export requires pyarrow (pip install pyarrow)") from e
+
+    columns = EXPORT_TABLES[table]
+    schema = _arrow_schema(pa, columns)
+    names = [name for name, _ in columns]
+    table_dir = os.path.join(export_dir, table)
+    os.makedirs(table_dir, exist_ok=True)
+    ext = "parquet" if fmt == "parquet" else "arrow"
+    tmp_path = os.path.join(table_dir, f".part-{since_id + 1}.{ext}.tmp")
+
+    conn = get_analytics_connection()
+    c = server_cursor(conn)
+    c.execute(f"SELECT {', '.join(names)} FROM {EXPORT_SOURCES.get(table, table)} WHERE id > ? ORDER BY id", (since_id,))
+
+    writer = None
+    written, first_id, last_id = 0, None, since_id
+    try:
+        while True:
+            rows = c.fetchmany(chunk_size)
+            if not rows:
+                break
+            batch = pa.RecordBatch.from_arrays(
+                [pa.array([r[i] for r in rows], type=schema.field(i).type) for i in range(len(names))],
+                schema=schema,
+            )
+            if writer is None:
+                writer = _open_writer(pa, tmp_path, schema, fmt)
+                first_id = rows[0][0]
+            writer.write_batch(batch)
+            written += len(rows)
+            last_id = rows[-1][0]
+    finally:
+        conn.close()
+        if writer is not None:
+            writer.close()
+
+    if written:
+        os.replace(tmp_path, os.path.join(table_dir, f"part-{first_id}-{last_id}.{ext}"))
+    return written, last_id
+
+
+def export_all(export_dir, tables=None, chunk_size=DEFAULT_CHUNK_SIZE, fmt="parquet"):
+    """Incrementally export each table, advancing its watermark only after its part file is in place."""
+    os.makedirs(export_dir, exist_ok=True)
+    marks = load_watermarks(export_dir)
+    summary = {}
+    for table in tables or EXPORT_TABLES:
+        written, mark = export_table(table, export_dir, marks.get(table, 0), chunk_size, fmt)
+        marks[table] = mark
+        save_watermarks(export_dir, marks)
+        summary[table] = written
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export tables to Parquet / Arrow IPC incrementally.")
+    parser.add_argument("export_dir")
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--tables", help="comma-separated subset of " + ", ".join(EXPORT_TABLES))
+    args = parser.parse_args()
+    tables = args.tables.split(",") if args.tables else None
+    for table, n in export_all(args.export_dir, tables, args.chunk_size, args.format).items():
+        print(f"{table}: {n} new rows")
@@ -0,0 +1,124 @@
+"""
+Designer Portraits – local thumbnail cache and initials avatars (Pillow)
+Portraits are ingested once into fixed-size thumbnails under static/thumbs/,
+named by a hash of their bytes so a URL never changes content and can be
+cached indefinitely. Page renders only ever reference local files; designers
+without a thumbnail get a locally generated initials avatar.
+
+Usage:
+    python images.py ingest           # fetch/convert portraits for designers lacking a thumbnail
+    python images.py ingest --force   # redo all of them
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import urllib.request
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+THUMB_DIR = os.path.join(STATIC_DIR, "thumbs")
+STATIC_URL = "app/static/thumbs"  # Streamlit serves ./static at /app/static when enableStaticServing is on
+
+THUMB_SIZE = 160  # 2× the 80px card avatar for high-DPI screens
+FETCH_TIMEOUT = 5
+
+AVATAR_COLOURS = ("#8B5E3C", "#C4956A", "#5C3317", "#2C5F8A", "#5A8A5E", "#C1440E", "#16213E")
+
+
+def _square(img, size):
+    """Centre-crop to a square and resize."""
+    img = img.convert("RGB")
+    side = min(img.size)
+    left, top = (img.width - side) // 2, (img.height - side) // 2
+    return img.crop((left, top, left + side, top + side)).resize((size, size), Image.LANCZOS)
+
+
+def _store(img, fmt="WEBP"):
+    """Write under a content-hash name (no-op if it already exists) and return the file name."""
+    buf = io.BytesIO()
+    img.save(buf, fmt, quality=82)
+    data = buf.getvalue()
+    name = f"{hashlib.sha256(data).hexdigest()[:16]}.{fmt.lower().replace('jpeg', 'jpg')}"
+    path = os.path.join(THUMB_DIR, name)
+    if not os.path.exists(path):
+        os.makedirs(THUMB_DIR, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    return name
+
+
+def make_thumbnail(source, fmt="WEBP"):
+    """Thumbnail a local path, URL or bytes. Returns the stored file name."""
+    if isinstance(source, bytes):
+        data = source
+    elif source.startswith(("http://", "https://")):
+        with urllib.request.urlopen(source, timeout=FETCH_TIMEOUT) as resp:
+            data = resp.read()
+    else:
+        with open(source, "rb") as f:
+            data = f.read()
+    return _store(_square(Image.open(io.BytesIO(data)), THUMB_SIZE), fmt)
+
+
+def font(size):
+    """Pillow's bundled scalable font at `size` px (bitmap default on Pillow < 10.1)."""
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def initials(name):
+    parts = [p for p in (name or "").split() if p[:1].isalpha()]
+    return "".join(p[0] for p in parts[:2]).upper() or "?"
+
+
+@lru_cache(maxsize=4096)
+def initials_avatar(name):
+    """File name of a generated initials avatar for this name."""
+    text = initials(name)
+    colour = AVATAR_COLOURS[int(hashlib.md5(text.encode()).hexdigest(), 16) % len(AVATAR_COLOURS)]
+    img = Image.new("RGB", (THUMB_SIZE, THUMB_SIZE), colour)
+    draw = ImageDraw.Draw(img)
+    draw.text((THUMB_SIZE / 2, THUMB_SIZE / 2), text, fill="white", font=font(THUMB_SIZE // 2.5), anchor="mm")
+    return _store(img)
+
+
+def portrait_url(designer):
+    """Local URL for a designer's card image – never an external fetch."""
+    name = designer.get("thumbnail") or initials_avatar(designer.get("name"))
+    return f"{STATIC_URL}/{name}"
+
+
+def ingest_portraits(force=False):
+    """Thumbnail every designer's image_url; fall back to an initials avatar when it can't be fetched."""
+    from database import get_all_designers, set_designer_thumbnail
+
+    done = failed = 0
+    for d in get_all_designers():
+        if d.get("thumbnail") and not force:
+            continue
+        try:
+            name = make_thumbnail(d["image_url"]) if d.get("image_url") else initials_avatar(d["name"])
+            done += 1
+        except (OSError, ValueError) as e:
+            print(f"  {d['name']}: {e} – using initials avatar")
+            name = initials_avatar(d["name"])
+            failed += 1
+        set_designer_thumbnail(d["id"], name)
+    return done, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Designer portrait thumbnails.")
+    parser.add_argument("command", choices=["ingest"])
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+    done, failed = ingest_portraits(force=args.force)
+    print(f"{done} thumbnails stored, {failed} fell back to initials")
@@ -0,0 +1,295 @@
+"""
+Design Knowledge Base – versioned data file compiled into lookup tables
+Palettes, furniture, layout tips, budget advice, style descriptions and the
+wizard's option lists live in knowledge_base.json. A load validates the file
+and compiles it into an immutable KnowledgeBase whose tables are indexed by
+1-based option code (slot 0 = fallback), as ai_engine consumes them.
+
+The file is re-checked at most every RELOAD_CHECK_SECS; a changed, valid file
+is compiled off to the side and swapped in with one assignment, so requests
+already holding the previous KnowledgeBase finish on it undisturbed. An
+invalid file is reported and the current version stays active.
+
+Option lists are append-only across versions because their codes are
+persisted (see categories.py); a reload that reorders or drops one is rejected.
+
+Usage:
+    python knowledge.py check [path]   # validate a file and print its version
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from typing import NamedTuple
+
+KB_PATH = os.environ.get("KNOWLEDGE_BASE",
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge_base.json"))
+
+RELOAD_CHECK_SECS = 2.0
+
+COLUMNS = ("room_type", "room_size", "budget", "color_theme", "furniture_style", "lifestyle")
+
+PALETTE_KEYS = ("primary", "secondary", "accent", "wall", "description")
+
+
+class KnowledgeError(ValueError):
+    """The knowledge-base file is malformed or inconsistent."""
+
+
+class frozendict(dict):
+    """dict that refuses mutation (still JSON-serialisable, unlike MappingProxyType)."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("knowledge-base tables are read-only")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _readonly
+
+    def __hash__(self):
+        return id(self)
+
+    # Rebuild from the items: pickle's default fills a dict subclass via __setitem__
+    def __reduce__(self):
+        return frozendict, (dict(self),)
+
+
+def _freeze(obj):
+    if isinstance(obj, dict):
+        return frozendict((k, _freeze(v)) for k, v in obj.items())
+    if isinstance(obj, list):
+        return tuple(_freeze(v) for v in obj)
+    return obj
+
+
+class KnowledgeBase(NamedTuple):
+    version: str
+    options: frozendict           # column -> tuple of labels (code = position + 1)
+    defaults: frozendict          # column -> label assumed when the answer is missing
+    palettes: frozendict          # palette name -> colours + description
+    # Code-indexed tables, slot 0 = fallback
+    palette_for_theme: tuple
+    budget_info: tuple
+    style_description: tuple
+    layout_tips: tuple
+    furniture: tuple              # [style][room]
+    lifestyle_styles: tuple       # frozensets of style codes
+    theme_rooms: tuple            # frozensets of room codes
+    size_weeks: tuple
+    budget_weeks: tuple
+    sustainability_tips: tuple
+    smart_home: tuple
+    codes: frozendict             # column -> label -> code
+
+    # Identity is the version string, so caches can key on the KnowledgeBase itself
+    def __hash__(self):
+        return hash(self.version)
+
+    def __eq__(self, other):
+        return self is other or (isinstance(other, KnowledgeBase) and self.version == other.version)
+
+    def code(self, column, label):
+        """Code for a label, 0 if it is not an option in this version."""
+        return self.codes[column].get(label, 0)
+
+    def label(self, column, code):
+        options = self.options[column]
+        return options[code - 1] if 0 < code <= len(options) else None
+
+
+def _require(cond, message):
+    if not cond:
+        raise KnowledgeError(message)
+
+
+def _per_option(raw, section, column, options, check=None, fallback=None):
+    """Code-indexed tuple for raw[section] keyed by option label; slot 0 from "*" or `fallback`."""
+    table = raw.get(section)
+    _require(isinstance(table, dict), f"{section}: missing or not an object")
+    missing = [o for o in options if o not in table]
+    _require(not missing, f"{section}: no entry for {column} {missing}")
+    unknown = [k for k in table if k != "*" and k not in options]
+    _require(not unknown, f"{section}: unknown {column} {unknown}")
+    if "*" in table:
+        fallback = table["*"]
+    _require(fallback is not None, f'{section}: needs a "*" fallback entry')
+    values = [fallback] + [table[o] for o in options]
+    if check:
+        for key, value in zip(["*", *options], values):
+            check(f"{section}[{key}]", value)
+    return tuple(_freeze(v) for v in values)
+
+
+def _str_list(where, value):
+    _require(isinstance(value, list) and all(isinstance(v, str) for v in value), f"{where}: expected a list of strings")
+
+
+def _weeks(where, value):
+    _require(isinstance(value, int) and value >= 0, f"{where}: expected a non-negative integer")
+
+
+def _hex(where, value):
+    _require(isinstance(value, str) and len(value) == 7 and value[0] == "#"
+             and all(c in "0123456789abcdefABCDEF" for c in value[1:]), f"{where}: bad colour {value!r}")
+
+
+def compile_kb(raw, previous=None):
+    """Validate a parsed knowledge-base document and compile it. Raises KnowledgeError."""
+    _require(isinstance(raw, dict), "top level must be an object")
+    version = raw.get("version")
+    _require(isinstance(version, str) and version, "version: missing")
+
+    options = raw.get("options") or {}
+    for col in COLUMNS:
+        opts = options.get(col)
+        _require(isinstance(opts, list) and opts and all(isinstance(o, str) for o in opts),
+                 f"options.{col}: expected a non-empty list of strings")
+        _require(len(set(opts)) == len(opts), f"options.{col}: duplicate labels")
+        if previous is not None:
+            before = previous.options[col]
+            _require(tuple(opts[:len(before)]) == before,
+                     f"options.{col}: existing options may not be reordered or removed")
+    opts = {col: tuple(options[col]) for col in COLUMNS}
+    rooms, styles, themes = opts["room_type"], opts["furniture_style"], opts["color_theme"]
+
+    defaults = raw.get("defaults") or {}
+    for col in COLUMNS:
+        if col in defaults or col in ("room_type", "budget", "furniture_style"):
+            _require(defaults.get(col) in opts[col], f"defaults.{col}: must be one of options.{col}")
+
+    palettes = raw.get("palettes")
+    _require(isinstance(palettes, dict) and palettes, "palettes: missing")
+    for name, palette in palettes.items():
+        _require(isinstance(palette, dict) and all(k in palette for k in PALETTE_KEYS),
+                 f"palettes[{name}]: needs {', '.join(PALETTE_KEYS)}")
+        for k in PALETTE_KEYS[:-1]:
+            _hex(f"palettes[{name}].{k}", palette[k])
+
+    def palette_name(where, value):
+        _require(value in palettes, f"{where}: unknown palette {value!r}")
+
+    def budget_entry(where, value):
+        _require(isinstance(value, dict) and isinstance(value.get("label"), str), f"{where}: needs a label")
+        _str_list(f"{where}.tips", value.get("tips"))
+        alloc = value.get("allocation")
+        _require(isinstance(alloc, dict) and sum(alloc.values()) == 100, f"{where}.allocation: must sum to 100")
+
+    def furniture_rooms(where, value):
+        _require(isinstance(value, dict), f"{where}: expected an object of rooms")
+        for room in rooms:
+            _require(room in value, f"{where}: no entry for room_type {room!r}")
+            _str_list(f"{where}[{room}]", value[room])
+
+    def style_set(where, value):
+        _require(isinstance(value, list) and all(v in styles for v in value), f"{where}: unknown furniture_style")
+
+    def room_set(where, value):
+        _require(isinstance(value, list) and all(v in rooms for v in value), f"{where}: unknown room_type")
+
+    def text(where, value):
+        _require(isinstance(value, str), f"{where}: expected a string")
+
+    raw_furniture = raw.get("furniture") or {}
+    furniture = _per_option(raw, "furniture", "furniture_style", styles, furniture_rooms,
+                            raw_furniture.get(defaults["furniture_style"]))
+    furniture = tuple(
+        (by_room[defaults["room_type"]],) + tuple(by_room[r] for r in rooms) for by_room in furniture
+    )
+
+    raw_budget = raw.get("budget_advice") or {}
+    lifestyle_styles = _per_option(raw, "lifestyle_styles", "lifestyle", opts["lifestyle"], style_set, [])
+    theme_rooms = {"*": [], **{t: [] for t in themes}, **(raw.get("theme_rooms") or {})}
+    theme_rooms = _per_option({"theme_rooms": theme_rooms}, "theme_rooms", "color_theme", themes, room_set)
+    codes = {col: {label: i for i, label in enumerate(labels, 1)} for col, labels in opts.items()}
+
+    return KnowledgeBase(
+        version=version,
+        options=frozendict(opts),
+        defaults=frozendict({col: defaults.get(col, opts[col][0]) for col in COLUMNS}),
+        palettes=_freeze(palettes),
+        palette_for_theme=_per_option(raw, "theme_palettes", "color_theme", themes, palette_name),
+        budget_info=_per_option(raw, "budget_advice", "budget", opts["budget"], budget_entry,
+                                raw_budget.get(defaults["budget"])),
+        style_description=_per_option(raw, "style_descriptions", "furniture_style", styles, text, ""),
+        layout_tips=_per_option(raw, "layout_tips", "room_type", rooms, _str_list,
+                                (raw.get("layout_tips") or {}).get(defaults["room_type"])),
+        furniture=furniture,
+        lifestyle_styles=tuple(frozenset(codes["furniture_style"][s] for s in v) for v in lifestyle_styles),
+        theme_rooms=tuple(frozenset(codes["room_type"][r] for r in v) for v in theme_rooms),
+        size_weeks=_per_option(raw, "size_weeks", "room_size", opts["room_size"], _weeks),
+        budget_weeks=_per_option(raw, "budget_weeks", "budget", opts["budget"], _weeks),
+        sustainability_tips=_per_option(raw, "sustainability_tips", "furniture_style", styles, _str_list),
+        smart_home=_per_option(raw, "smart_home", "room_type", rooms, _str_list),
+        codes=frozendict((col, frozendict(m)) for col, m in codes.items()),
+    )
+
+
+def load(path=KB_PATH, previous=None):
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise KnowledgeError(f"{path}: {e}") from e
+    return compile_kb(raw, previous)
+
+
+# ── Active version & hot reload ────────────────────────────────────────────────
+
+_active = None
+_mtime = None
+_checked_at = 0.0
+_reload_lock = threading.Lock()
+
+
+def _stat():
+    try:
+        return os.stat(KB_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+
+def reload(force=False):
+    """Load KB_PATH if it changed. Returns the active KnowledgeBase.
+
+    Only one thread reloads at a time; others keep using the current version
+    rather than waiting. The first load raises on an invalid file; later ones
+    keep the previous version and print the error.
+    """
+    global _active, _mtime, _checked_at
+    if not _reload_lock.acquire(blocking=_active is None):
+        return _active
+    try:
+        _checked_at = time.monotonic()
+        mtime = _stat()
+        if _active is not None and not force and mtime == _mtime:
+            return _active
+        try:
+            kb = load(KB_PATH, previous=_active)
+        except KnowledgeError as e:
+            if _active is None:
+                raise
+            print(f"knowledge base: keeping {_active.version}, reload failed – {e}", file=sys.stderr)
+            _mtime = mtime  # don't retry until the file changes again
+            return _active
+        _active, _mtime = kb, mtime
+        return kb
+    finally:
+        _reload_lock.release()
+
+
+def current():
+    """The active KnowledgeBase. Hold on to the result for the length of one request."""
+    if _active is None or time.monotonic() - _checked_at >= RELOAD_CHECK_SECS:
+        return reload()
+    return _active
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "check":
+        sys.exit("usage: python knowledge.py check [path]")
+    try:
+        kb = load(sys.argv[2] if len(sys.argv) > 2 else KB_PATH, previous=current())
+    except KnowledgeError as e:
+        sys.exit(f"invalid: {e}")
+    print(f"ok: version {kb.version}, "
+          + ", ".join(f"{len(v)} {k}" for k, v in kb.options.items()))
@@ -0,0 +1,361 @@
+"""
+Load Testing – bulk synthetic data and a multi-process session driver
+`generate` fills a SQLite database with users, designers, design requests
+drawn from the real wizard option lists, bookings (each holding its calendar
+slot) and payments. Rows go in through executemany in large transactions with
+synchronous=OFF and the design_requests user index rebuilt once at the end,
+so millions of rows take seconds to minutes rather than hours.
+
+`drive` runs worker processes that replay the flow a real visitor takes
+through database.py – register, log in, wizard (recommendations + save),
+my designs, book a free slot, admin confirms – and reports throughput and
+per-step tail latency.
+
+Generated users sign in as user<id>@load.test with password PASSWORD.
+
+Usage:
+    python loadtest.py generate --db load.db --users 1000000
+    python loadtest.py drive --db load.db --processes 8 --sessions 500
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import time
+from array import array
+from datetime import date, datetime, timedelta
+
+from categories import CATEGORIES, FURNITURE_STYLES
+
+PASSWORD = "loadtest-pass"
+EMAIL_DOMAIN = "load.test"
+
+BATCH_ROWS = 50_000       # rows per executemany call
+COMMIT_ROWS = 1_000_000   # rows per transaction
+
+BOOKING_STATUSES = (("Confirmed", 0.7), ("pending", 0.2), ("Rejected", 0.1))
+SERVICES = (("Consultation", 99.0), ("Full Room Design", 499.0), ("Premium Package", 999.0))
+SPECIALIZATIONS = tuple(f"{style} Interiors" for style in FURNITURE_STYLES)
+
+
+def use_database(path):
+    """Point database.py at a SQLite file for the calls that follow."""
+    import storage
+    storage.set_backend(storage.SQLiteBackend(path))
+
+
+def email(user_id):
+    return f"user{user_id}@{EMAIL_DOMAIN}"
+
+
+# ── Bulk data generator ────────────────────────────────────────────────────────
+
+def _bulk(conn, sql, rows):
+    """executemany over `rows` in BATCH_ROWS chunks, committing every COMMIT_ROWS. Returns the row count."""
+    n = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, BATCH_ROWS))
+        if not chunk:
+            break
+        conn.executemany(sql, chunk)
+        n += len(chunk)
+        if n % COMMIT_ROWS < BATCH_ROWS:
+            conn.commit()
+    conn.commit()
+    return n
+
+
+def _timestamps(rng, days):
+    """created_at strings spread uniformly over the last `days` days."""
+    now = datetime.now().replace(microsecond=0)
+    span = days * 86400
+    while True:
+        yield (now - timedelta(seconds=rng.randrange(span))).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def generate(path, users, designs_per_user=3.0, bookings_per_user=0.5, designers=None, seed=1, log=print):
+    """Append synthetic rows to the database at `path` (created and initialised if needed).
+
+    `designs_per_user` and `bookings_per_user` are averages; designers default
+    to one per 1,000 bookings so calendars stay realistically sparse. Returns
+    {table: rows inserted}.
+    """
+    from database import TIME_SLOTS, hash_password, init_db
+    from matching import specialization_styles
+
+    use_database(path)
+    init_db()
+    rng = random.Random(seed)
+    n_designs = int(users * designs_per_user)
+    n_bookings = int(users * bookings_per_user)
+    n_designers = max(1, n_bookings // 1_000) if designers is None else designers
+    created_at = _timestamps(rng, 365)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA journal_mode=MEMORY")
+    conn.execute("PRAGMA cache_size=-262144")  # 256 MiB
+    next_id = {t: conn.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {t}").fetchone()[0]
+               for t in ("users", "designers", "design_requests", "bookings")}
+    counts = {}
+
+    def timed_insert(table, sql, rows):
+        start = time.perf_counter()
+        counts[table] = _bulk(conn, sql, rows)
+        secs = time.perf_counter() - start
+        log(f"{table}: {counts[table]:,} rows in {secs:.1f} s ({counts[table] / max(secs, 1e-9):,.0f} rows/s)")
+
+    first_user = next_id["users"]
+    password = hash_password(PASSWORD)
+    timed_insert("users", "INSERT INTO users (id, name, email, password, phone, created_at) VALUES (?,?,?,?,?,?)",
+                 ((i, f"Load User {i}", email(i), password, f"9{i % 10**9:09d}", next(created_at))
+                  for i in range(first_user, first_user + users)))
+
+    first_designer = next_id["designers"]
+    new_designers = [(i, f"Designer {i}", rng.choice(SPECIALIZATIONS), f"{rng.randint(2, 20)} Years",
+                      round(rng.uniform(3.8, 5.0), 1), float(rng.randrange(60, 220, 5)),
+                      "Available" if rng.random() < 0.9 else "Busy")
+                     for i in range(first_designer, first_designer + n_designers)]
+    timed_insert("designers", """INSERT INTO designers (id, name, specialization, experience, rating,
+                                                        price_per_hour, availability) VALUES (?,?,?,?,?,?,?)""",
+                 new_designers)
+    conn.executemany("INSERT INTO designer_styles (designer_id, style_id) VALUES (?,?) ON CONFLICT DO NOTHING",
+                     [(d[0], code) for d in new_designers for code in specialization_styles(d[2])])
+    conn.commit()
+    all_designers = [r[0] for r in conn.execute("SELECT id FROM designers ORDER BY id")]
+
+    # Index maintenance per row dominates bulk inserts; rebuild it once afterwards
+    conn.execute("DROP INDEX IF EXISTS idx_design_requests_user")
+    first_design = next_id["design_requests"]
+    design_user = array("I", (first_user + rng.randrange(users) for _ in range(n_designs)))
+    sizes = [len(options) for _, options in CATEGORIES.values()]
+    notes = ("", "", "", "two cats", "toddler in the house", "work from home", "asthma and dust allergies")
+    timed_insert("design_requests",
+                 """INSERT INTO design_requests (id, user_id, room_type_id, room_size_id, budget_id, color_theme_id,
+                                                 furniture_style_id, lifestyle_id, special_notes, created_at)
+                    VALUES (?,?,?,?,?,?,?,?,?,?)""",
+                 ((first_design + i, uid, *(rng.randint(1, n) for n in sizes), rng.choice(notes), next(created_at))
+                  for i, uid in enumerate(design_user)))
+    start = time.perf_counter()
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_design_requests_user ON design_requests(user_id, created_at)")
+    conn.commit()
+    log(f"idx_design_requests_user rebuilt in {time.perf_counter() - start:.1f} s")
+
+    # Booking k takes slot k // D of designer k % D, so generated slots never collide with each other
+    first_booking = next_id["bookings"]
+    first_day = date.today() - timedelta(days=180)
+    statuses, weights = zip(*BOOKING_STATUSES)
+    bookings = []
+
+    def booking_rows():
+        for k in range(n_bookings):
+            design = rng.randrange(n_designs) if n_designs else None
+            user = design_user[design] if design is not None else first_user + rng.randrange(users)
+            designer = all_designers[k % len(all_designers)]
+            slot = k // len(all_designers)
+            day = (first_day + timedelta(days=slot // len(TIME_SLOTS))).isoformat()
+            service, amount = rng.choice(SERVICES)
+            status = rng.choices(statuses, weights)[0]
+            booking_id = first_booking + k
+            bookings.append((booking_id, user, amount, designer, day, TIME_SLOTS[slot % len(TIME_SLOTS)], status))
+            yield (booking_id, user, None if design is None else first_design + design, designer,
+                   f"Designer {designer}", day, TIME_SLOTS[slot % len(TIME_SLOTS)], service, amount,
+                   "completed", status, next(created_at))
+            if len(bookings) >= BATCH_ROWS:
+                flush_slots_and_payments()
+
+    def flush_slots_and_payments():
+        conn.executemany("""INSERT INTO designer_slots (designer_id, slot_date, slot, booking_id) VALUES (?,?,?,?)
+                            ON CONFLICT DO NOTHING""",
+                         [(b[3], b[4], b[5], b[0]) for b in bookings if b[6] != "Rejected"])
+        conn.executemany("""INSERT INTO payments (user_id, booking_id, amount, payment_method, transaction_id, status)
+                            VALUES (?,?,?,?,?,?)""",
+                         [(b[1], b[0], b[2], "Card", f"GEN{b[0]:010d}", "completed") for b in bookings])
+        counts["payments"] = counts.get("payments", 0) + len(bookings)
+        bookings.clear()
+
+    timed_insert("bookings", """INSERT INTO bookings (id, user_id, design_id, designer_id, designer_name, booking_date,
+                                                      time_slot, service_type, amount, payment_status, booking_status,
+                                                      created_at) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)""",
+                 booking_rows())
+    flush_slots_and_payments()
+    conn.commit()
+    conn.execute("UPDATE bookings SET designer_name = (SELECT name FROM designers WHERE id = bookings.designer_id) "
+                 "WHERE id >= ? AND designer_id < ?", (first_booking, first_designer))
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return counts
+
+
+# ── Session driver ─────────────────────────────────────────────────────────────
+
+STEPS = ("register", "login", "recommendations", "save_design", "my_designs", "free_slots", "book", "admin_confirm")
+
+
+def _session(rng, run, worker, i, designer_ids, think):
+    """One visitor's flow; returns [(step, seconds)] in the order the steps ran."""
+    import database
+    from ai_engine import generate_recommendations
+
+    def step(name, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.append((name, time.perf_counter() - start))
+        if think:
+            time.sleep(rng.expovariate(1 / think))
+        return result
+
+    timings = []
+    address = f"run{run}.w{worker}.{i}@{EMAIL_DOMAIN}"
+    ok, message = step("register", database.register_user, f"Load {worker}.{i}", address, PASSWORD, "9000000000")
+    if not ok:
+        raise RuntimeError(message)
+    user = step("login", database.login_user, address, PASSWORD)
+
+    answers = {col: rng.choice(options) for col, (_, options) in CATEGORIES.items()}
+    answers["special_notes"] = rng.choice(("", "two cats", "work from home"))
+    step("recommendations", generate_recommendations, *answers.values())
+    design_id = step("save_design", database.save_design_request, user["id"], answers)
+    step("my_designs", database.get_user_designs, user["id"])
+
+    start = date.today() + timedelta(days=1)
+    for designer in rng.sample(designer_ids, min(5, len(designer_ids))):
+        free = step("free_slots", database.get_free_slots, [designer], start, start + timedelta(days=13))[designer]
+        if not free:
+            continue
+        day, slot = rng.choice(free)
+        try:
+            booking_id, _ = step("book", database.create_booking, user["id"], designer, design_id,
+                                 day, slot, "Full Room Design", 499.0)
+        except database.SlotTakenError:
+            timings.append(("slot_taken", 0.0))
+            continue
+        step("admin_confirm", database.update_booking_status, booking_id, "Confirmed")
+        break
+    return timings
+
+
+def _worker(task):
+    path, run, worker, sessions, duration, think, writer_address, writer_authkey = task
+    use_database(path)
+    if writer_address:
+        import writer
+        writer.use_writer(writer_address, writer_authkey)
+    rng = random.Random(f"{run}-{worker}")
+    conn = sqlite3.connect(path)
+    designer_ids = [r[0] for r in conn.execute("SELECT id FROM designers WHERE availability='Available'")]
+    conn.close()
+
+    timings, errors, done = [], [], 0
+    deadline = time.monotonic() + duration if duration else None
+    for i in itertools.count():
+        if (sessions and i >= sessions) or (deadline and time.monotonic() >= deadline):
+            break
+        try:
+            timings.extend(_session(rng, run, worker, i, designer_ids, think))
+            done += 1
+        except Exception as e:  # keep driving; report what failed
+            errors.append(f"{type(e).__name__}: {e}")
+    return done, timings, errors
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def drive(path, processes=4, sessions=100, duration=None, think=0.0, writer_address=None,
+          writer_authkey=None):
+    """Run `processes` workers, each replaying `sessions` sessions (or until `duration` seconds pass).
+
+    With `writer_address`, writes go through that writer process as in cluster mode,
+    authenticating with `writer_authkey` (default: WRITER_AUTHKEY).
+
+    Returns {"sessions", "seconds", "sessions_per_s", "errors", "steps": {step: stats}};
+    step stats are count, ops/s and p50/p95/p99/max in milliseconds.
+    """
+    run = time.time_ns()
+    tasks = [(path, run, w, sessions if not duration else 0, duration, think, writer_address, writer_authkey)
+             for w in range(processes)]
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.map(_worker, tasks)
+    wall = time.perf_counter() - start
+
+    by_step, errors, done = {}, [], 0
+    for n, timings, errs in results:
+        done += n
+        errors += errs
+        for name, secs in timings:
+            by_step.setdefault(name, []).append(secs)
+    steps = {}
+    for name in (*STEPS, "slot_taken"):
+        times = sorted(by_step.get(name, ()))
+        if times:
+            steps[name] = {"count": len(times), "ops_per_s": len(times) / wall,
+                           **{f"{q}_ms": _percentile(times, p) * 1000
+                              for q, p in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))},
+                           "max_ms": times[-1] * 1000}
+    return {"sessions": done, "seconds": wall, "sessions_per_s": done / wall, "errors": errors, "steps": steps}
+
+
+def print_report(report):
+    print(f"{report['sessions']:,} sessions in {report['seconds']:.1f} s "
+          f"({report['sessions_per_s']:,.1f} sessions/s), {len(report['errors'])} errors")
+    print(f"{'step':<16}{'count':>9}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, s in report["steps"].items():
+        print(f"{name:<16}{s['count']:>9,}{s['ops_per_s']:>10,.1f}{s.get('p50_ms', 0):>10.2f}"
+              f"{s.get('p95_ms', 0):>10.2f}{s.get('p99_ms', 0):>10.2f}{s['max_ms']:>10.2f}")
+    for e in sorted(set(report["errors"]))[:10]:
+        print(f"  error: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic data and load driver for the interior design database.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gen = sub.add_parser("generate", help="bulk-insert synthetic rows")
+    gen.add_argument("--db", default=os.environ.get("DB_PATH", "interior_design.db"))
+    gen.add_argument("--users", type=int, default=100_000)
+    gen.add_argument("--designs-per-user", type=float, default=3.0)
+    gen.add_argument("--bookings-per-user", type=float, default=0.5)
+    gen.add_argument("--designers", type=int, help="extra designers (default: one per 1,000 bookings)")
+    gen.add_argument("--seed", type=int, default=1)
+    drv = sub.add_parser("drive", help="replay register → wizard → book → confirm sessions")
+    drv.add_argument("--db", default=os.environ.get("DB_PATH", "interior_design.db"))
+    drv.add_argument("--processes", type=int, default=os.cpu_count() or 4)
+    drv.add_argument("--sessions", type=int, default=100, help="sessions per process")
+    drv.add_argument("--duration", type=float, help="run for this many seconds instead of a session count")
+    drv.add_argument("--think", type=float, default=0.0, help="mean think time between steps, seconds")
+    drv.add_argument("--writer", action="store_true", help="send writes through one writer process (cluster mode)")
+    drv.add_argument("--json", metavar="PATH", help="also save the report to PATH")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        start = time.perf_counter()
+        generate(args.db, args.users, args.designs_per_user, args.bookings_per_user, args.designers, args.seed)
+        print(f"done in {time.perf_counter() - start:.1f} s -> {args.db}")
+    else:
+        writer_proc = address = None
+        if args.writer:
+            import tempfile
+
+            import writer
+            address = os.path.join(tempfile.mkdtemp(), "writer.sock")  # 0700, as writer.spawn requires
+            writer_proc = writer.spawn(address, env=dict(os.environ, DB_PATH=args.db, METRICS_PORT="0"))
+        try:
+            report = drive(args.db, args.processes, args.sessions, args.duration, args.think, address,
+                           writer_proc and writer_proc.authkey)
+        finally:
+            if writer_proc is not None:
+                writer_proc.terminate()
+        print_report(report)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+        sys.exit(1 if report["errors"] else 0)
@@ -0,0 +1,127 @@
+"""
+Designer Matching – ranks designers for a design's style and budget
+Each designer's free-text specialization is turned into an affinity vector over
+the wizard's furniture styles; combined with price fit for the budget tier and
+rating, every (style, tier) ranking is precomputed when the index is built, so
+a top-k query is a slice of a ready-made list.
+
+Styles and budgets are the knowledge base's option lists, which may grow on a
+hot reload: a style without keywords below is recognised by its own name, a
+budget without a rate uses DEFAULT_RATE, and an index built before an option
+existed ranks it as an unknown style or budget.
+"""
+
+from array import array
+
+from knowledge import current
+
+# Words in a specialization that signal each style
+STYLE_KEYWORDS = {
+    "Modern": ("modern", "contemporary"),
+    "Classic": ("classic", "traditional"),
+    "Minimalist": ("minimalist", "minimal", "zen"),
+    "Rustic": ("rustic", "farmhouse"),
+    "Bohemian": ("bohemian", "boho", "eclectic"),
+    "Industrial": ("industrial", "loft"),
+    "Scandinavian": ("scandinavian", "nordic", "hygge"),
+}
+
+# Styles close enough that a specialist in one does credible work in the other
+STYLE_NEIGHBOURS = {
+    "Modern": ("Minimalist", "Scandinavian", "Industrial"),
+    "Classic": ("Rustic",),
+    "Minimalist": ("Modern", "Scandinavian"),
+    "Rustic": ("Industrial", "Classic", "Scandinavian", "Bohemian"),
+    "Bohemian": ("Rustic",),
+    "Industrial": ("Modern", "Rustic"),
+    "Scandinavian": ("Minimalist", "Modern", "Rustic"),
+}
+
+# Hourly rate (USD) that best fits each budget tier
+TIER_RATES = {
+    "Under ₹50,000 / $600": 90.0,
+    "₹50,000–₹1,50,000 / $600–$1,800": 115.0,
+    "₹1,50,000–₹5,00,000 / $1,800–$6,000": 140.0,
+    "Above ₹5,00,000 / $6,000+": 175.0,
+}
+DEFAULT_RATE = 120.0  # unknown budget, or one added to the knowledge base without a rate
+
+WEIGHTS = {"style": 0.6, "price": 0.25, "rating": 0.15}
+
+NEIGHBOUR_AFFINITY = 0.5
+
+
+def style_affinity(specialization, styles=None):
+    """Affinity per style code (index 0 = unknown style, always neutral)."""
+    styles = styles or current().options["furniture_style"]
+    text = " " + " ".join((specialization or "").lower().replace("&", " ").split()) + " "
+    direct = {s for s in styles
+              if any(f" {k} " in text for k in STYLE_KEYWORDS.get(s) or (s.lower(),))}
+    vec = [0.5] + [0.0] * len(styles)
+    for code, style in enumerate(styles, 1):
+        if style in direct:
+            vec[code] = 1.0
+        elif direct.intersection(STYLE_NEIGHBOURS.get(style, ())):
+            vec[code] = NEIGHBOUR_AFFINITY
+    return vec
+
+
+def tier_rates(budgets=None):
+    """Ideal hourly rate per budget code, slot 0 = unknown budget."""
+    budgets = budgets or current().options["budget"]
+    return (DEFAULT_RATE, *(TIER_RATES.get(b, DEFAULT_RATE) for b in budgets))
+
+
+def price_fit(price, ideal):
+    return 1.0 - min(abs((price or ideal) - ideal) / ideal, 1.0)
+
+
+def specialization_styles(specialization):
+    """Style codes a specialization names directly."""
+    return [code for code, a in enumerate(style_affinity(specialization)) if code and a == 1.0]
+
+
+def _score(affinity, price, rating, style, ideal):
+    return (WEIGHTS["style"] * affinity[style]
+            + WEIGHTS["price"] * price_fit(price, ideal)
+            + WEIGHTS["rating"] * min((rating or 0) / 5.0, 1.0))
+
+
+def match_score(designer, furniture_style, budget):
+    """Match 0-100 for a single designer, without building an index."""
+    kb = current()
+    style, tier = kb.code("furniture_style", furniture_style), kb.code("budget", budget)
+    aff = style_affinity(designer.get("specialization"), kb.options["furniture_style"])
+    ideal = tier_rates(kb.options["budget"])[tier]
+    return round(_score(aff, designer.get("price_per_hour"), designer.get("rating"), style, ideal) * 100)
+
+
+class DesignerIndex:
+    """Precomputed designer rankings for every (style, budget tier) pair."""
+
+    def __init__(self, designers, kb=None):
+        kb = kb or current()
+        self.designers = list(designers)
+        self._codes = kb.codes  # labels added by a later reload encode as 0 (unknown)
+        styles = kb.options["furniture_style"]
+        rates = tier_rates(kb.options["budget"])
+        affinities = [style_affinity(d.get("specialization"), styles) for d in self.designers]
+        self._ranked = {}
+        self._scores = {}
+        for style in range(len(styles) + 1):
+            for tier, ideal in enumerate(rates):
+                scores = [_score(aff, d.get("price_per_hour"), d.get("rating"), style, ideal)
+                          for d, aff in zip(self.designers, affinities)]
+                order = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+                self._ranked[style, tier] = array("i", order)
+                self._scores[style, tier] = array("d", (scores[i] for i in order))
+
+    def top_k(self, furniture_style, budget, k=3):
+        """[(designer, match 0-100)] best first for a design's style and budget labels."""
+        key = (self._codes["furniture_style"].get(furniture_style, 0), self._codes["budget"].get(budget, 0))
+        ranked, scores = self._ranked[key], self._scores[key]
+        return [(self.designers[ranked[i]], round(scores[i] * 100)) for i in range(min(k, len(ranked)))]
+
+    def rank(self, furniture_style, budget):
+        """All designers, best match first."""
+        return self.top_k(furniture_style, budget, k=len(self.designers))
@@ -0,0 +1,265 @@
+"""
+Metrics – Prometheus-style counters, gauges and histograms
+Metrics register once per process (get-or-create, so Streamlit reruns that
+re-execute app.py reuse them) and are served in the text exposition format
+from a small side HTTP server on METRICS_PORT (0 disables it). The server
+binds METRICS_ADDR, loopback by default; set METRICS_ADDR=0.0.0.0 to let a
+Prometheus on another host scrape it.
+
+Page, DB-query and recommendation timings arrive as tracing spans, so those
+code paths are timed once for both the Performance page and the metrics.
+
+Usage:
+    python metrics.py scrape [url]   # print what the endpoint serves
+"""
+
+import os
+import sys
+import threading
+import urllib.request
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import tracing
+
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 9464))
+METRICS_ADDR = os.environ.get("METRICS_ADDR", "127.0.0.1")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, doc, labelnames=(), fn=None):
+        self.name, self.doc, self.labelnames = name, doc, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        self._fn = fn  # optional callable returning {label values tuple: value} at scrape time
+
+    def _key(self, labels):
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def samples(self):
+        if self._fn is not None:
+            values = self._fn()
+        else:
+            with self._lock:
+                values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+    def render(self):
+        return "\n".join([f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}", *self.samples()])
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+INF_BOUND = 'le="+Inf"'
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, doc, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        self._observe(self._key(labels), value)
+
+    def _observe(self, key, value):
+        i = bisect_left(self.buckets, value)  # first bound >= value; len(buckets) = +Inf only
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {k: (list(c), s, n) for k, (c, s, n) in self._values.items()}
+        bounds = [f'le="{_number(b)}"' for b in self.buckets]
+        for key, (counts, total, n) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, bound)} {cumulative}"
+            yield f"{self.name}_bucket{_labels(self.labelnames, key, INF_BOUND)} {n}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {n}"
+
+    def counts(self):
+        """{label values: observations}, e.g. as the fn of a counter that mirrors it."""
+        with self._lock:
+            return {k: n for k, (_, _, n) in self._values.items()}
+
+
+def _get_or_create(cls, name, *args, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"metric {name} already registered as a {metric.kind}")
+        return metric
+
+
+def counter(name, doc, labelnames=(), fn=None):
+    return _get_or_create(Counter, name, doc, labelnames, fn=fn)
+
+
+def gauge(name, doc, labelnames=(), fn=None):
+    return _get_or_create(Gauge, name, doc, labelnames, fn=fn)
+
+
+def histogram(name, doc, labelnames=(), buckets=LATENCY_BUCKETS):
+    return _get_or_create(Histogram, name, doc, labelnames, buckets=buckets)
+
+
+def exposition():
+    """All registered metrics in Prometheus text format."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return "\n".join(m.render() for m in metrics) + "\n"
+
+
+# ── Span-driven metrics ────────────────────────────────────────────────────────
+
+# The totals are read from the histograms' counts at scrape time, so a span costs one update
+PAGE_SECONDS = histogram("app_page_render_seconds", "Page render wall time.", ("page",))
+PAGE_VIEWS = counter("app_page_views_total", "Page renders by page.", ("page",), fn=PAGE_SECONDS.counts)
+FRAGMENT_SECONDS = histogram("app_fragment_render_seconds", "Page fragment run wall time.", ("fragment",))
+DB_SECONDS = histogram("db_query_seconds", "Query execute wall time by statement type.", ("statement",))
+DB_QUERIES = counter("db_queries_total", "Queries executed by statement type.", ("statement",), fn=DB_SECONDS.counts)
+AI_SECONDS = histogram("recommendation_seconds", "generate_recommendations wall time.")
+
+
+# (kind, span name) -> (histogram or None, label values); the sink runs on every
+# span, so the label work is done once per distinct span name
+_span_targets = {}
+SPAN_TARGETS_MAX = 4096
+
+
+def _span_target(kind, name):
+    if kind == "db":
+        target = (DB_SECONDS, (name.split(" ", 1)[0].upper(),))
+    elif kind == "page":
+        target = (PAGE_SECONDS, (name,))
+    elif kind == "fragment":
+        target = (FRAGMENT_SECONDS, (name,))
+    elif kind == "ai":
+        target = (AI_SECONDS, ())
+    else:
+        target = (None, ())
+    if len(_span_targets) >= SPAN_TARGETS_MAX:
+        _span_targets.clear()
+    _span_targets[kind, name] = target
+    return target
+
+
+def _on_span(kind, name, seconds):
+    hist, key = _span_targets.get((kind, name)) or _span_target(kind, name)
+    if hist is not None:
+        hist._observe(key, seconds)
+
+
+tracing.SINKS.append(_on_span)
+
+
+# ── HTTP endpoint ──────────────────────────────────────────────────────────────
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = exposition().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # scrapes every few seconds would flood the app log
+
+
+_server = None
+
+
+def start_http_server(port=METRICS_PORT, addr=METRICS_ADDR):
+    """Serve /metrics on a daemon thread, once per process. Returns the server or None.
+
+    None when disabled (port 0) or the port is taken, e.g. by another app
+    process on the same host; that process's metrics are then not served.
+    """
+    global _server
+    with _registry_lock:
+        if _server is not None or not port:
+            return _server
+        try:
+            _server = ThreadingHTTPServer((addr, port), _Handler)
+        except OSError as e:
+            print(f"metrics: not serving on port {port} – {e}", file=sys.stderr)
+            return None
+        _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "scrape":
+        sys.exit("usage: python metrics.py scrape [url]")
+    url = sys.argv[2] if len(sys.argv) > 2 else f"http://127.0.0.1:{METRICS_PORT}/metrics"
+    with urllib.request.urlopen(url, timeout=5) as resp:
+        sys.stdout.write(resp.read().decode("utf-8"))
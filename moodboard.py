@@ -0,0 +1,117 @@
+"""
+Mood Boards – palette, style and furniture composed into a PNG (Pillow)
+Boards depend only on (palette, style, room) and the knowledge-base version,
+so each of the few hundred combinations is rendered once per version: kept in
+memory, written to MOODBOARD_DIR, and optionally pre-rendered in bulk at
+deploy time.
+
+Usage:
+    python moodboard.py prerender   # render every combination, report timing
+"""
+
+import argparse
+import io
+import os
+import time
+from functools import lru_cache
+
+from PIL import Image, ImageDraw
+
+from images import STATIC_DIR, font
+from knowledge import current
+
+MOODBOARD_DIR = os.environ.get("MOODBOARD_DIR", os.path.join(STATIC_DIR, "moodboards"))
+
+WIDTH, HEIGHT = 1200, 800
+INK = "#2C1810"
+
+
+def _text_colour(hex_colour):
+    r, g, b = (int(hex_colour[i:i + 2], 16) for i in (1, 3, 5))
+    return INK if (0.299 * r + 0.587 * g + 0.114 * b) > 150 else "white"
+
+
+def _file_name(version, palette_name, style, room):
+    slug = "-".join(p.lower().replace(" ", "_") for p in (version, palette_name, style, room))
+    return f"{slug}.png"
+
+
+def _draw(kb, palette_name, style, room):
+    palette = kb.palettes[palette_name]
+    furniture = kb.furniture[kb.code("furniture_style", style)][kb.code("room_type", room)]
+
+    img = Image.new("RGB", (WIDTH, HEIGHT), palette["wall"])
+    draw = ImageDraw.Draw(img)
+    title, body, small = font(44), font(22), font(18)
+
+    # Left: the 60-30-10 colour story as proportional blocks
+    x0, y0, w, h = 40, 140, 680, 620
+    blocks = [("Primary", palette["primary"], 0.6), ("Secondary", palette["secondary"], 0.3),
+              ("Accent", palette["accent"], 0.1)]
+    y = y0
+    for label, colour, share in blocks:
+        bh = round(h * share)
+        draw.rounded_rectangle((x0, y, x0 + w, y + bh - 8), radius=18, fill=colour)
+        draw.text((x0 + 24, y + 20), f"{label}  {colour}", fill=_text_colour(colour), font=small)
+        y += bh
+
+    # Header
+    draw.text((40, 40), f"{style} {room}", fill=_text_colour(palette["wall"]), font=title)
+    draw.text((40, 96), palette_name, fill=palette["secondary"], font=body)
+
+    # Right: furniture list on a card
+    cx0 = x0 + w + 30
+    draw.rounded_rectangle((cx0, y0, WIDTH - 40, y0 + h - 8), radius=18, fill="white", outline=palette["accent"], width=3)
+    draw.text((cx0 + 24, y0 + 24), "Key Pieces", fill=INK, font=body)
+    for i, item in enumerate(furniture):
+        iy = y0 + 80 + i * 56
+        draw.ellipse((cx0 + 24, iy + 4, cx0 + 40, iy + 20), fill=palette["primary"])
+        draw.text((cx0 + 52, iy), item, fill=INK, font=small)
+    draw.rectangle((cx0 + 24, y0 + h - 80, WIDTH - 64, y0 + h - 48), fill=palette["wall"])
+    draw.text((cx0 + 32, y0 + h - 76), f"Wall  {palette['wall']}", fill=_text_colour(palette["wall"]), font=small)
+    return img
+
+
+def render_moodboard(palette_name, style, room):
+    """PNG bytes for this combination under the active knowledge base."""
+    return _render(current(), palette_name, style, room)
+
+
+@lru_cache(maxsize=512)
+def _render(kb, palette_name, style, room):
+    # From memory, then disk, else freshly rendered
+    path = os.path.join(MOODBOARD_DIR, _file_name(kb.version, palette_name, style, room))
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    buf = io.BytesIO()
+    _draw(kb, palette_name, style, room).save(buf, "PNG", optimize=True)
+    data = buf.getvalue()
+    os.makedirs(MOODBOARD_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return data
+
+
+# Same hit/miss reporting as the other lru_cached renderers
+render_moodboard.cache_info = _render.cache_info
+
+
+def prerender_all():
+    """Render every (palette, style, room) combination; returns (count, seconds)."""
+    start = time.perf_counter()
+    kb = current()
+    combos = [(p, s, r) for p in kb.palettes for s in kb.options["furniture_style"] for r in kb.options["room_type"]]
+    for combo in combos:
+        render_moodboard(*combo)
+    return len(combos), time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Room mood-board images.")
+    parser.add_argument("command", choices=["prerender"])
+    parser.parse_args()
+    n, secs = prerender_all()
+    print(f"{n} mood boards in {secs:.2f} s ({secs / n * 1000:.1f} ms each) -> {MOODBOARD_DIR}")
@@ -0,0 +1,122 @@
+"""
+Special Notes Analysis – keyword rules that adjust recommendations
+All rule keywords are compiled into one regex whose alternation is factored
+as a trie, so scanning a note is a single left-to-right pass with no
+per-rule loops, however many keywords the table grows to.
+"""
+
+import re
+
+# rule -> keywords (lower-case phrases), extra furniture, extra tips, smart-home additions,
+#         score adjustment per furniture style ("*" = any style)
+NOTE_RULES = {
+    "Pet-friendly": {
+        "keywords": ["cat", "cats", "dog", "dogs", "pet", "pets", "puppy", "kitten", "pet-friendly"],
+        "furniture": ["Performance-fabric upholstery (microfibre or crypton)", "Scratch-resistant flooring"],
+        "tips": ["🐾 Skip loose weaves and delicate silks — pet claws snag them.",
+                 "🐾 Washable slipcovers and rugs keep fur manageable."],
+        "smart_home": ["Pet camera with treat dispenser"],
+        "score": {"Bohemian": -4, "Classic": -3, "Rustic": 3, "Industrial": 3},
+    },
+    "Child-safe": {
+        "keywords": ["kid", "kids", "child", "children", "baby", "toddler", "toddlers", "newborn"],
+        "furniture": ["Rounded-edge coffee table", "Low, closed toy storage"],
+        "tips": ["🧸 Anchor tall furniture to the wall and choose rounded corners.",
+                 "🧸 Wipeable matte paint survives crayons better than flat finishes."],
+        "smart_home": ["Smart plugs with child lock"],
+        "score": {"Industrial": -5, "Classic": -2, "Scandinavian": 3, "Rustic": 3},
+    },
+    "Allergy-aware": {
+        "keywords": ["allergy", "allergies", "allergic", "asthma", "dust", "hypoallergenic", "hay fever"],
+        "furniture": ["Hard, sealed flooring instead of wall-to-wall carpet", "Leather or tightly woven upholstery"],
+        "tips": ["🌬️ Fewer textiles and open shelves mean less dust to trap.",
+                 "🌬️ Choose low-VOC paints and finishes."],
+        "smart_home": ["HEPA air purifier with air-quality sensor"],
+        "score": {"Bohemian": -5, "Minimalist": 4, "Scandinavian": 2},
+    },
+    "Accessible": {
+        "keywords": ["wheelchair", "mobility", "accessible", "accessibility", "walker", "disability",
+                     "disabled", "elderly", "arthritis"],
+        "furniture": ["Lever door and cabinet handles", "Chairs with arms at 45–50 cm seat height"],
+        "tips": ["♿ Keep 90 cm clear paths and a 150 cm turning circle.",
+                 "♿ Mount switches and storage between 40 and 120 cm high."],
+        "smart_home": ["Voice-controlled lighting and locks"],
+        "score": {"Minimalist": 4, "Bohemian": -3},
+    },
+    "Blackout": {
+        "keywords": ["blackout", "night shift", "night shifts", "shift work", "light sleeper",
+                     "sleep during the day", "day sleeper"],
+        "furniture": ["Blackout curtains with wrap-around rails", "Dimmable warm bedside lighting"],
+        "tips": ["🌙 Layer a blackout liner behind curtains to seal light gaps.",
+                 "🌙 Keep daytime sleep zones on cooler, darker colours."],
+        "smart_home": ["Automated blackout blinds on a schedule"],
+        "score": {"*": 1},
+    },
+    "Home office": {
+        "keywords": ["work from home", "wfh", "home office", "remote work", "working from home",
+                     "video call", "video calls", "zoom", "study"],
+        "furniture": ["Ergonomic desk and chair", "Acoustic panel or bookcase behind the desk"],
+        "tips": ["💻 Put the desk side-on to the window to cut screen glare.",
+                 "💻 A soft backdrop improves video-call sound and framing."],
+        "smart_home": ["Smart desk lamp with circadian tuning"],
+        "score": {"Minimalist": 2, "Modern": 2, "Scandinavian": 2},
+    },
+}
+
+
+def _trie_pattern(words):
+    """Regex alternation for `words`, factored on shared prefixes."""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        end = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 and not end else f"(?:{'|'.join(branches)})"
+        return f"{body}?" if end else body
+
+    return build(trie)
+
+
+def _compile(rules):
+    keyword_rule = {kw: name for name, rule in rules.items() for kw in rule["keywords"]}
+    pattern = re.compile(rf"\b{_trie_pattern(keyword_rule)}\b", re.IGNORECASE)
+    return pattern, keyword_rule
+
+
+_PATTERN, _KEYWORD_RULE = _compile(NOTE_RULES)
+
+
+def analyze_notes(notes):
+    """Names of the rules triggered by a note, in first-mention order."""
+    if not notes:
+        return []
+    found = {}
+    for m in _PATTERN.finditer(notes):
+        found.setdefault(_KEYWORD_RULE[m.group(0).lower()], None)
+    return list(found)
+
+
+def apply_notes(recs, notes, style):
+    """Fold note-driven adjustments into a recommendations dict (in place) and return it."""
+    matched = analyze_notes(notes)
+    recs["note_insights"] = matched
+    if not matched:
+        return recs
+    furniture, tips, smart = list(recs["furniture"]), list(recs["layout_tips"]), list(recs["smart_home"])
+    score = recs["compatibility_score"]
+    for name in matched:
+        rule = NOTE_RULES[name]
+        furniture += rule["furniture"]
+        tips += rule["tips"]
+        smart += rule["smart_home"]
+        score += rule["score"].get(style, rule["score"].get("*", 0))
+    recs.update(furniture=furniture, layout_tips=tips, smart_home=smart,
+                compatibility_score=max(0, min(score, 99)))
+    return recs
@@ -0,0 +1,33 @@
+"""
+UPI Payment QR – rendered locally with qrcode + Pillow
+Replaces the per-render quickchart.io call: QR PNGs are built in-process and
+memoised by (upi_id, amount), so reruns of the booking form at an unchanged
+price cost a dictionary lookup and no network.
+"""
+
+import io
+from functools import lru_cache
+from urllib.parse import quote
+
+import qrcode
+
+UPI_ID = "9080599509@naviaxis"
+PAYEE_NAME = "Krishnan R"
+QR_SIZE = 200
+
+
+def upi_url(upi_id, amount, payee_name=PAYEE_NAME):
+    return f"upi://pay?pa={upi_id}&pn={quote(payee_name)}&am={amount}&cu=INR"
+
+
+@lru_cache(maxsize=512)
+def upi_qr_png(upi_id, amount, size=QR_SIZE):
+    """PNG bytes of the UPI payment QR for this payee and amount."""
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=2)
+    qr.add_data(upi_url(upi_id, amount))
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white").get_image()
+    img = img.resize((size, size), resample=0)  # nearest-neighbour keeps modules crisp
+    buf = io.BytesIO()
+    img.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
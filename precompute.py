@@ -0,0 +1,191 @@
+"""
+Precomputed Recommendations – the whole input space in one memory-mapped file
+Every (room, size, budget, theme, style, lifestyle) combination – including
+slot 0, the fallback for unknown labels – is evaluated once at build time:
+palette, furniture, completion time, smart-home list, sustainability tips and
+the deterministic part of the compatibility score. Strings and lists are
+interned into shared pools; each combination is a fixed-width record of pool
+offsets, addressed by its mixed-radix code. The file is mmap'd read-only, so
+every worker process shares the same page-cache pages.
+
+File layout (little-endian):
+    MAGIC | u32 header length | JSON header (version, radices, section offsets)
+    strings: u32 offsets[n + 1] | UTF-8 bytes
+    lists:   u32 offsets[n + 1] | u16 string ids
+    records: RECORD per combination
+
+A table is only used while its version matches the active knowledge base;
+otherwise ai_engine computes live as before.
+
+Usage:
+    python precompute.py build   # write PRECOMPUTED_PATH for the current knowledge base
+"""
+
+import argparse
+import itertools
+import json
+import mmap
+import os
+import struct
+import time
+from array import array
+
+from knowledge import COLUMNS, current
+
+PRECOMPUTED_PATH = os.environ.get("PRECOMPUTED_PATH",
+                                  os.path.join(os.path.dirname(os.path.abspath(__file__)), "recommendations.bin"))
+
+MAGIC = b"IDRECS01"
+
+# palette name, furniture list, completion time, smart-home list, sustainability list, base score
+RECORD = struct.Struct("<HHHHHB")
+
+
+def _radices(kb):
+    return tuple(len(kb.options[col]) + 1 for col in COLUMNS)
+
+
+def record_index(radices, codes):
+    i = 0
+    for radix, code in zip(radices, codes):
+        i = i * radix + code
+    return i
+
+
+class _Pool:
+    def __init__(self):
+        self.strings, self._sid = [], {}
+        self.lists, self._lid = [], {}
+
+    def string(self, s):
+        sid = self._sid.get(s)
+        if sid is None:
+            sid = self._sid[s] = len(self.strings)
+            self.strings.append(s)
+        return sid
+
+    def list(self, items):
+        key = tuple(self.string(s) for s in items)
+        lid = self._lid.get(key)
+        if lid is None:
+            lid = self._lid[key] = len(self.lists)
+            self.lists.append(key)
+        return lid
+
+
+def build(path=PRECOMPUTED_PATH, kb=None):
+    """Evaluate every combination and write the table atomically. Returns (records, bytes)."""
+    from ai_engine import _base_score, _completion_time
+
+    kb = kb or current()
+    radices = _radices(kb)
+    pool = _Pool()
+    records = bytearray()
+    for room, size, tier, theme, style, life in itertools.product(*(range(r) for r in radices)):
+        records += RECORD.pack(
+            pool.string(kb.palette_for_theme[theme]),
+            pool.list(kb.furniture[style][room]),
+            pool.string(_completion_time(kb, size, tier)),
+            pool.list(kb.smart_home[room]),
+            pool.list(kb.sustainability_tips[style]),
+            _base_score(kb, room, style, theme, life),
+        )
+
+    blobs = [s.encode("utf-8") for s in pool.strings]
+    str_offsets = array("I", itertools.accumulate((len(b) for b in blobs), initial=0))
+    list_offsets = array("I", itertools.accumulate((len(items) for items in pool.lists), initial=0))
+    list_items = array("H", itertools.chain.from_iterable(pool.lists))
+    sections = [str_offsets.tobytes() + b"".join(blobs), list_offsets.tobytes() + list_items.tobytes(), bytes(records)]
+
+    header = {"version": kb.version, "radices": radices, "strings": len(blobs), "lists": len(pool.lists)}
+    # Section offsets depend on the header length, which depends on the offsets: size it with placeholders
+    header["offsets"] = [0] * len(sections)
+    base = len(MAGIC) + 4 + len(json.dumps(header)) + 32
+    for i, section in enumerate(sections):
+        header["offsets"][i] = base
+        base += len(section)
+    head = json.dumps(header).encode().ljust(header["offsets"][0] - len(MAGIC) - 4)
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(head)) + head)
+        for section in sections:
+            f.write(section)
+    os.replace(tmp, path)
+    return len(records) // RECORD.size, base
+
+
+class RecommendationTable:
+    """Read-only view of a built table. Pool entries are decoded on first use and kept."""
+
+    def __init__(self, path=None):
+        path = path or PRECOMPUTED_PATH
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: not a precomputed recommendation table")
+        (head_len,) = struct.unpack_from("<I", self._mm, len(MAGIC))
+        header = json.loads(bytes(self._mm[len(MAGIC) + 4:len(MAGIC) + 4 + head_len]))
+        self.version = header["version"]
+        self.radices = tuple(header["radices"])
+        str_at, list_at, self._records_at = header["offsets"]
+        n_str, n_list = header["strings"], header["lists"]
+        self._str_offsets = memoryview(self._mm)[str_at:str_at + 4 * (n_str + 1)].cast("I")
+        self._str_base = str_at + 4 * (n_str + 1)
+        self._list_offsets = memoryview(self._mm)[list_at:list_at + 4 * (n_list + 1)].cast("I")
+        items_at = list_at + 4 * (n_list + 1)
+        self._list_items = memoryview(self._mm)[items_at:items_at + 2 * self._list_offsets[n_list]].cast("H")
+        self._strings = [None] * n_str
+        self._lists = [None] * n_list
+
+    def _string(self, sid):
+        s = self._strings[sid]
+        if s is None:
+            start, end = self._str_offsets[sid], self._str_offsets[sid + 1]
+            s = self._strings[sid] = self._mm[self._str_base + start:self._str_base + end].decode("utf-8")
+        return s
+
+    def _list(self, lid):
+        items = self._lists[lid]
+        if items is None:
+            sids = self._list_items[self._list_offsets[lid]:self._list_offsets[lid + 1]]
+            items = self._lists[lid] = tuple(self._string(sid) for sid in sids)
+        return items
+
+    def lookup(self, room, size, tier, theme, style, life):
+        """(palette name, furniture, completion time, smart home, sustainability tips, base score)."""
+        at = self._records_at + RECORD.size * record_index(self.radices, (room, size, tier, theme, style, life))
+        palette, furniture, weeks, smart, sustain, score = RECORD.unpack_from(self._mm, at)
+        return (self._string(palette), self._list(furniture), self._string(weeks),
+                self._list(smart), self._list(sustain), score)
+
+
+_table = None
+_checked_version = None
+
+
+def table_for(kb):
+    """The mapped table if one was built for this knowledge-base version, else None.
+
+    The file is (re)opened only when the knowledge-base version changes, so
+    build it before starting the app, as with the mood-board prerender.
+    """
+    global _table, _checked_version
+    if _checked_version != kb.version:
+        try:
+            table = RecommendationTable()
+        except (OSError, ValueError):
+            table = None
+        if table is not None and (table.version != kb.version or table.radices != _radices(kb)):
+            table = None
+        _table, _checked_version = table, kb.version
+    return _table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute every recommendation combination.")
+    parser.add_argument("command", choices=["build"])
+    parser.parse_args()
+    start = time.perf_counter()
+    n, size = build()
+    print(f"{n:,} combinations, {size / 1024:.0f} KiB in {time.perf_counter() - start:.2f} s -> {PRECOMPUTED_PATH}")
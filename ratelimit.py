@@ -0,0 +1,154 @@
+"""
+Rate Limiting – in-memory token buckets for login attempts
+Every login attempt takes a token from two buckets: one for the email being
+tried and one for the client it comes from (when the app can tell – see
+client_key). A bucket holds up to `burst` tokens and refills at
+`rate` per second, so a person mistyping a password a few times is never
+held up, while a credential-stuffing burst is refused after a handful of
+tries, before any query or password hash runs. A successful login refills
+its email's bucket.
+
+Each key costs one small entry (tokens, last refill time). Tables are LRU
+bounded at RATE_LIMIT_KEYS; buckets that have refilled completely carry no
+information, so every DECAY_SECS the least recently used ones that are full
+again are dropped. Limits are per process: N cluster workers allow up to N
+times the burst.
+
+Configuration (environment):
+    LOGIN_EMAIL_PER_MIN   attempts per minute per email (default 5)
+    LOGIN_EMAIL_BURST     attempts an email may make at once (default 5)
+    LOGIN_CLIENT_PER_MIN  attempts per minute per client address (default 30)
+    LOGIN_CLIENT_BURST    attempts a client may make at once (default 30)
+    RATE_LIMIT_KEYS       keys tracked per table (default 100000)
+    TRUST_FORWARDED_FOR   1 when a proxy that sets X-Forwarded-For sits in front
+                          (cluster.py sets it for its workers); otherwise the
+                          header is client-supplied and ignored (default 0)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import counter, gauge
+
+RATE_LIMIT_KEYS = int(os.environ.get("RATE_LIMIT_KEYS", 100_000))
+TRUST_FORWARDED_FOR = os.environ.get("TRUST_FORWARDED_FOR", "0") == "1"
+DECAY_SECS = 60            # min interval between sweeps of refilled buckets
+
+REJECTED = counter("rate_limit_rejected_total", "Requests refused by a rate limiter.", ("limiter",))
+
+_limiters = []
+
+
+class RateLimited(Exception):
+    """Too many attempts; retry_after is the wait in seconds until the next one is allowed."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"too many attempts, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucketLimiter:
+    def __init__(self, name, rate, burst, max_keys=RATE_LIMIT_KEYS):
+        self.name, self.rate, self.burst, self.max_keys = name, rate, float(burst), max_keys
+        self._buckets = OrderedDict()  # key -> [tokens, last refill], least recently used first
+        self._lock = threading.Lock()
+        self._decayed_at = time.monotonic()
+        _limiters.append(self)
+
+    def _refill(self, key, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def wait(self, key, now=None):
+        """Seconds until `key` has a token (0.0 if it has one now). Takes nothing."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens = self._refill(key, now)[0]
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def take(self, key, now=None):
+        """Take a token for `key`; returns 0.0, or the wait in seconds if it has none (nothing is taken)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if now - self._decayed_at > DECAY_SECS:
+                self._decay(now)
+            bucket = self._refill(key, now)
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+        REJECTED.inc(limiter=self.name)
+        return (1 - bucket[0]) / self.rate
+
+    def allow(self, key, now=None):
+        return self.take(key, now) == 0.0
+
+    def reset(self, key):
+        """Forget `key`: its next request starts from a full bucket."""
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def _decay(self, now):
+        # Oldest first; stop at the first bucket still refilling, so a sweep costs what it removes
+        self._decayed_at = now
+        while self._buckets:
+            key, (tokens, last) = next(iter(self._buckets.items()))
+            if tokens + (now - last) * self.rate < self.burst:
+                break
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+gauge("rate_limit_keys", "Keys tracked by each rate limiter.", ("limiter",),
+      fn=lambda: {(l.name,): len(l) for l in _limiters})
+
+# ── Login ──────────────────────────────────────────────────────────────────────
+
+EMAILS = TokenBucketLimiter("login_email", float(os.environ.get("LOGIN_EMAIL_PER_MIN", 5)) / 60,
+                            int(os.environ.get("LOGIN_EMAIL_BURST", 5)))
+CLIENTS = TokenBucketLimiter("login_client", float(os.environ.get("LOGIN_CLIENT_PER_MIN", 30)) / 60,
+                             int(os.environ.get("LOGIN_CLIENT_BURST", 30)))
+
+
+def client_key(headers, peer):
+    """Client address for the per-client bucket: the peer's, or the hop the trusted proxy saw.
+
+    Only the last X-Forwarded-For entry is the proxy's own; earlier ones come from the client.
+    """
+    if TRUST_FORWARDED_FOR:
+        forwarded = headers.get("X-Forwarded-For")
+        if forwarded:
+            return forwarded.split(",")[-1].strip()
+    return peer
+
+
+def check_login(email, client=None):
+    """Charge one login attempt to `email` and `client`; raises RateLimited if either is out of tokens."""
+    email = email.strip().lower()
+    now = time.monotonic()
+    # Check both before taking from either, so a refused attempt costs neither bucket
+    waits = [EMAILS.wait(email, now)]
+    if client:
+        waits.append(CLIENTS.wait(client, now))
+    if max(waits) > 0:
+        REJECTED.inc(limiter=EMAILS.name if waits[0] else CLIENTS.name)
+        raise RateLimited(max(waits))
+    # A concurrent attempt may have taken the last token since
+    wait = EMAILS.take(email, now) or (CLIENTS.take(client, now) if client else 0.0)
+    if wait:
+        raise RateLimited(wait)
+
+
+def login_succeeded(email):
+    EMAILS.reset(email.strip().lower())
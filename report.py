@@ -0,0 +1,182 @@
+"""
+Design Reports – self-contained HTML export of a wizard result
+Reports are rendered on a small background thread pool so the Streamlit
+thread never waits on them, and are cached by design id in memory and under
+REPORT_DIR, so repeat downloads are instant. Charts are rasterised once with
+Pillow and embedded as data URIs; the raw recommendation payload is embedded
+as JSON for re-import.
+"""
+
+import base64
+import html
+import io
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from PIL import Image, ImageDraw
+
+from images import STATIC_DIR, font
+from moodboard import render_moodboard
+
+REPORT_DIR = os.environ.get("REPORT_DIR", os.path.join(os.path.dirname(STATIC_DIR), "reports"))
+
+BUDGET_COLOURS = ("#8B5E3C", "#C4956A", "#D4AF7A", "#E8D5B0", "#F0EAE2")
+
+MAX_JOBS = 256  # finished reports kept in memory; older ones are re-read from disk
+REPORT_WAIT_SECS = 2.0  # how long a page waits for a render before showing it as pending
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="report")
+_jobs = {}
+_lock = threading.Lock()
+
+
+def _donut_png(labels, values, colours, size=360):
+    """Donut chart with a legend, as PNG bytes."""
+    legend_h = 28 * len(labels)
+    img = Image.new("RGB", (size, size + legend_h + 10), "white")
+    draw = ImageDraw.Draw(img)
+    total, start = float(sum(values)), -90.0
+    box = (20, 20, size - 20, size - 20)
+    for value, colour in zip(values, colours):
+        sweep = 360.0 * value / total
+        draw.pieslice(box, start, start + sweep, fill=colour, outline="white", width=2)
+        start += sweep
+    hole = size * 0.22
+    draw.ellipse((size / 2 - hole, size / 2 - hole, size / 2 + hole, size / 2 + hole), fill="white")
+    small = font(16)
+    for i, (label, value, colour) in enumerate(zip(labels, values, colours)):
+        y = size + i * 28
+        draw.rectangle((24, y + 2, 42, y + 20), fill=colour)
+        draw.text((52, y), f"{label} – {value}%", fill="#2C1810", font=small)
+    buf = io.BytesIO()
+    img.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+
+def _data_uri(png):
+    return "data:image/png;base64," + base64.b64encode(png).decode()
+
+
+def _list(items):
+    return "".join(f"<li>{html.escape(str(i))}</li>" for i in items)
+
+
+def render_report(design_id, data, recs):
+    """HTML bytes for a design. Pure function of its inputs; safe to run off-thread."""
+    palette = recs["palette"]
+    budget = recs["budget_info"]
+    e = html.escape
+    palette_chart = _donut_png(["Primary", "Secondary", "Accent"], [60, 30, 10],
+                               [palette["primary"], palette["secondary"], palette["accent"]])
+    budget_chart = _donut_png(list(budget["allocation"]), list(budget["allocation"].values()), BUDGET_COLOURS)
+    board = render_moodboard(recs["palette_name"], data["furniture_style"], data["room_type"])
+    swatches = "".join(
+        f'<div class="sw"><div style="background:{palette[k]}"></div>{k.title()}<br><code>{palette[k]}</code></div>'
+        for k in ("primary", "secondary", "accent", "wall")
+    )
+    concepts = "".join(
+        f"<div class='concept'><h3>{e(c['name'])} <small>— {e(c['mood'])}</small></h3>"
+        f"<p>{e(c['description'])}</p><ul>{_list(c['highlights'])}</ul></div>"
+        for c in recs["concepts"]
+    )
+    payload = json.dumps({"design_id": design_id, "inputs": data, "recommendations": recs}, ensure_ascii=False)
+    payload = payload.replace("</", "<\\/")  # keep the JSON from closing its <script> tag
+    doc = f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8">
+<title>Design #{design_id} – {e(data['furniture_style'])} {e(data['room_type'])}</title>
+<style>
+body {{ font-family: Georgia, serif; color:#2C1810; max-width:960px; margin:40px auto; padding:0 20px; }}
+h1, h2 {{ color:#5C3317; }} .meta span {{ background:#F0EAE2; padding:3px 10px; border-radius:12px; margin-right:6px; }}
+.sw {{ display:inline-block; text-align:center; margin:8px 14px; font-size:0.8rem; }}
+.sw div {{ width:64px; height:64px; border-radius:50%; margin:0 auto 6px; border:2px solid #eee; }}
+.row {{ display:flex; gap:24px; flex-wrap:wrap; }} .row > div {{ flex:1; min-width:280px; }}
+.concept {{ border-left:4px solid #C4956A; padding:4px 16px; margin:12px 0; background:#FAF7F4; }}
+img {{ max-width:100%; }}
+</style></head><body>
+<h1>{e(data['furniture_style'])} {e(data['room_type'])} Design</h1>
+<p class="meta"><span>Design #{design_id}</span><span>{e(data['room_size'])}</span><span>{e(data['budget'])}</span>
+<span>{e(data['lifestyle'])}</span><span>AI Match {recs['compatibility_score']}</span><span>⏱ {e(recs['estimated_time'])}</span></p>
+<p>{e(recs['style_description'])}</p>
+{f"<p><em>Notes: {e(data['special_notes'])}</em> {' '.join(f'<span>📝 {e(n)}</span>' for n in recs.get('note_insights', []))}</p>" if data.get('special_notes') else ""}
+<h2>Colour Palette – {e(recs['palette_name'])}</h2>
+<p>{e(palette['description'])}</p>
+<div>{swatches}</div>
+<div class="row"><div><img src="{_data_uri(palette_chart)}" alt="60-30-10 colour split"></div>
+<div><img src="{_data_uri(board)}" alt="Mood board"></div></div>
+<h2>Furniture &amp; Layout</h2>
+<div class="row"><div><h3>Recommended Furniture</h3><ol>{_list(recs['furniture'])}</ol></div>
+<div><h3>Layout Tips</h3><ul>{_list(recs['layout_tips'])}</ul></div></div>
+<h2>Design Concepts</h2>{concepts}
+<h2>{e(budget['label'])} Budget Plan</h2>
+<div class="row"><div><img src="{_data_uri(budget_chart)}" alt="Budget allocation"></div>
+<div><ul>{_list(budget['tips'])}</ul></div></div>
+<h2>Extras</h2>
+<div class="row"><div><h3>Sustainability</h3><ul>{_list(recs['sustainability_tips'])}</ul></div>
+<div><h3>Smart Home</h3><ul>{_list(recs['smart_home'])}</ul></div></div>
+<script type="application/json" id="design-data">{payload}</script>
+</body></html>"""
+    return doc.encode("utf-8")
+
+
+def _path(design_id):
+    return os.path.join(REPORT_DIR, f"design_{int(design_id)}.html")
+
+
+def _build(design_id, data, recs):
+    body = render_report(design_id, data, recs)
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    tmp = f"{_path(design_id)}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(body)
+    os.replace(tmp, _path(design_id))
+    return body
+
+
+def submit_report(design_id, data, recs):
+    """Start rendering in the background (once per design id) and return its Future."""
+    with _lock:
+        job = _jobs.get(design_id)
+        if job is None:
+            if os.path.exists(_path(design_id)):
+                job = _executor.submit(_read, design_id)
+            else:
+                job = _executor.submit(_build, design_id, data, recs)
+            _jobs[design_id] = job
+            if len(_jobs) > MAX_JOBS:
+                oldest = next((k for k, j in _jobs.items() if j.done()), None)
+                if oldest is not None:
+                    del _jobs[oldest]
+        return job
+
+
+def _read(design_id):
+    with open(_path(design_id), "rb") as f:
+        return f.read()
+
+
+def get_report(design_id):
+    """Finished report bytes, or None while it is still rendering (or was never requested)."""
+    job = _jobs.get(design_id)
+    if job is None or not job.done():
+        return None
+    if job.exception() is not None:
+        # Let the next submit retry
+        with _lock:
+            _jobs.pop(design_id, None)
+        return None
+    return job.result()
+
+
+def wait_for_report(design_id, data, recs, timeout=REPORT_WAIT_SECS):
+    """Report bytes, (re)starting the render if needed and waiting up to `timeout` seconds.
+
+    None if it is still rendering after that, or the render failed (the next call retries it).
+    """
+    report = get_report(design_id)
+    if report is None:
+        # Resubmitting is a no-op unless the job was dropped (e.g. after a restart) or failed
+        wait([submit_report(design_id, data, recs)], timeout=timeout)
+        report = get_report(design_id)
+    return report
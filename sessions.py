@@ -0,0 +1,283 @@
+"""
+Session Store – server-side session state with TTL and an in-memory hot set
+The app keeps only a session id in Streamlit state, which lives in server
+memory for the life of the browser tab's connection; the logged-in user,
+wizard answers, booking selection and paging live here.
+
+The id itself never goes in the page URL, where history, shared links and
+access logs would leak a bearer credential. The URL carries a resume token
+instead, so a reload, or a reconnect after a restart or to another process,
+finds the session again: the token is single-use, expires RESUME_TTL seconds
+after it was issued, and is swapped for a fresh session id (and a new token)
+when redeemed. A URL that leaks is therefore dead once the tab has reloaded,
+and useless to anyone RESUME_TTL after the tab was last active.
+
+Sessions persist as pickled dicts in a SQLite table and expire SESSION_TTL
+seconds after their last use. The HOT_SESSIONS most recently used ones stay
+in memory, so a rerun of an active session costs no database read; older
+ones are dropped from memory and reloaded on their next request. A session
+is written back only when a value was assigned during the run, and its
+expiry is pushed forward at most every TOUCH_SECS.
+
+With SESSIONS_SHARED=1 (several app processes, no sticky routing – see
+cluster.py) a hot session is trusted only after a primary-key read confirms
+no other process saved a newer version of it since.
+
+Configuration (environment):
+    SESSIONS_DB    SQLite path of the store (default: sessions.db next to the app)
+    SESSION_TTL    idle seconds before a session expires (default 86400)
+    HOT_SESSIONS   sessions kept in memory per process (default 1000)
+    SESSIONS_SHARED  "1" when other processes use the same store
+    SESSION_RESUME_TTL  seconds a resume token stays valid (default 900)
+"""
+
+import hashlib
+import os
+import pickle
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+SESSIONS_DB = os.environ.get("SESSIONS_DB",
+                             os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.db"))
+SESSION_TTL = float(os.environ.get("SESSION_TTL", 86_400))
+HOT_SESSIONS = int(os.environ.get("HOT_SESSIONS", 1_000))
+SESSIONS_SHARED = os.environ.get("SESSIONS_SHARED") == "1"
+RESUME_TTL = float(os.environ.get("SESSION_RESUME_TTL", 900))
+TOUCH_SECS = 300           # min interval between expiry bumps of an unchanged session
+PURGE_SECS = 600           # min interval between sweeps of expired rows
+
+
+class Session(dict):
+    """One session's values, readable as attributes like st.session_state.
+
+    Any assignment marks the session dirty so SessionStore.save writes it back.
+    """
+
+    __slots__ = ("id", "dirty", "expires_at", "version")
+
+    def __init__(self, sid, values=(), expires_at=0.0, version=0):
+        super().__init__(values)
+        self.id, self.dirty, self.expires_at, self.version = sid, False, expires_at, version
+
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+    def __setattr__(self, key, value):
+        if key in Session.__slots__:
+            object.__setattr__(self, key, value)
+        else:
+            self[key] = value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.dirty = True
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.dirty = True
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    # dict's own update/pop/popitem bypass __setitem__/__delitem__
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.dirty = True
+
+    def pop(self, key, *default):
+        value = super().pop(key, *default)
+        self.dirty = True
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self.dirty = True
+        return item
+
+    def clear(self):
+        super().clear()
+        self.dirty = True
+
+
+class SessionStore:
+    def __init__(self, path=SESSIONS_DB, ttl=SESSION_TTL, hot_size=HOT_SESSIONS, shared=SESSIONS_SHARED):
+        self.path, self.ttl, self.hot_size, self.shared = path, ttl, hot_size, shared
+        self._hot = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._purged_at = 0.0
+        with self._connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS sessions (
+                                id TEXT PRIMARY KEY,
+                                data BLOB NOT NULL,
+                                expires_at REAL NOT NULL,
+                                version INTEGER NOT NULL DEFAULT 0)""")
+            if "version" not in [r[1] for r in conn.execute("PRAGMA table_info(sessions)")]:
+                conn.execute("ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expiry ON sessions(expires_at)")
+            # Only a digest of each token is stored, so a copy of this file can't resume anything
+            conn.execute("""CREATE TABLE IF NOT EXISTS resume_tokens (
+                                digest TEXT PRIMARY KEY,
+                                sid TEXT NOT NULL,
+                                expires_at REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_resume_sid ON resume_tokens(sid)")
+
+    def _connect(self):
+        # One connection per thread; Streamlit runs each session's script on its own thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _remember(self, session):
+        with self._lock:
+            self._hot[session.id] = session
+            self._hot.move_to_end(session.id)
+            while len(self._hot) > self.hot_size:
+                self._hot.popitem(last=False)
+
+    def create(self):
+        """A new, empty session (stored on its first save)."""
+        session = Session(secrets.token_urlsafe(24))
+        session.dirty = True
+        self._remember(session)
+        return session
+
+    def get(self, sid):
+        """The live session for `sid`, or None if unknown or expired."""
+        now = time.time()
+        with self._lock:
+            session = self._hot.get(sid)
+            if session is not None:
+                self._hot.move_to_end(sid)
+        if session is not None and self.shared and session.version:
+            # Another process may have saved this session since we cached it
+            row = self._connect().execute("SELECT version FROM sessions WHERE id=?", (sid,)).fetchone()
+            if row is None or row[0] != session.version:
+                with self._lock:
+                    self._hot.pop(sid, None)
+                session = None
+        if session is None and sid:
+            row = self._connect().execute("SELECT data, expires_at, version FROM sessions WHERE id=?",
+                                          (sid,)).fetchone()
+            if row is not None:
+                session = Session(sid, pickle.loads(row[0]), row[1], row[2])
+                self._remember(session)
+        if session is None or (session.expires_at and session.expires_at < now):
+            if session is not None:
+                self.delete(sid)
+            return None
+        return session
+
+    def load(self, sid):
+        """The session for `sid`, or a fresh one when it is missing or expired."""
+        return self.get(sid) or self.create()
+
+    def save(self, session):
+        """Write the session back if it changed, else just extend its expiry when due."""
+        now = time.time()
+        conn = self._connect()
+        if session.dirty:
+            # A random tag rather than a counter: two processes saving the same version can't collide
+            version = secrets.randbits(62) or 1
+            conn.execute("INSERT INTO sessions (id, data, expires_at, version) VALUES (?,?,?,?) "
+                         "ON CONFLICT(id) DO UPDATE SET data=excluded.data, expires_at=excluded.expires_at, "
+                         "version=excluded.version",
+                         (session.id, pickle.dumps(dict(session), pickle.HIGHEST_PROTOCOL), now + self.ttl,
+                          version))
+            session.version = version
+            session.dirty = False
+            session.expires_at = now + self.ttl
+        elif session.expires_at - now < self.ttl - TOUCH_SECS:
+            conn.execute("UPDATE sessions SET expires_at=? WHERE id=?", (now + self.ttl, session.id))
+            session.expires_at = now + self.ttl
+        if now - self._purged_at > PURGE_SECS:
+            self._purged_at = now
+            self.purge_expired()
+
+    def rotate(self, session, keep=()):
+        """Replace the session with one under a new id (on login/logout, resume) and drop the old one.
+
+        Only the keys in `keep` carry over; the rest (wizard answers and results,
+        booking selection, paging) belonged to whoever was signed in before.
+        """
+        fresh = self.create()
+        dict.update(fresh, {k: session[k] for k in keep if k in session})
+        self.delete(session.id)
+        return fresh
+
+    def issue_resume(self, session, revoke=None):
+        """A new resume token for the session (the one to put in the page URL).
+
+        `revoke` is the token it replaces, which stops working at once.
+        """
+        token = secrets.token_urlsafe(24)
+        conn = self._connect()
+        if revoke:
+            conn.execute("DELETE FROM resume_tokens WHERE digest=?", (_digest(revoke),))
+        conn.execute("INSERT INTO resume_tokens (digest, sid, expires_at) VALUES (?,?,?)",
+                     (_digest(token), session.id, time.time() + RESUME_TTL))
+        return token
+
+    def resume(self, token):
+        """Redeem a resume token: the session it was issued for, under a fresh id, or None.
+
+        A token works once – of two processes redeeming it together only one wins
+        the delete – and the old id is dropped along with any other tokens for it.
+        """
+        conn = self._connect()
+        row = conn.execute("SELECT sid FROM resume_tokens WHERE digest=? AND expires_at >= ?",
+                           (_digest(token), time.time())).fetchone()
+        if row is None or conn.execute("DELETE FROM resume_tokens WHERE digest=?",
+                                       (_digest(token),)).rowcount != 1:
+            return None
+        session = self.get(row[0])
+        return None if session is None else self.rotate(session, keep=list(session))
+
+    def delete(self, sid):
+        with self._lock:
+            self._hot.pop(sid, None)
+        conn = self._connect()
+        conn.execute("DELETE FROM sessions WHERE id=?", (sid,))
+        conn.execute("DELETE FROM resume_tokens WHERE sid=?", (sid,))
+
+    def purge_expired(self):
+        """Delete expired sessions; returns how many were removed."""
+        now = time.time()
+        with self._lock:
+            for sid in [sid for sid, s in self._hot.items() if s.expires_at and s.expires_at < now]:
+                del self._hot[sid]
+        conn = self._connect()
+        conn.execute("DELETE FROM resume_tokens WHERE expires_at < ?", (now,))
+        return conn.execute("DELETE FROM sessions WHERE expires_at < ?", (now,)).rowcount
+
+    def hot_count(self):
+        return len(self._hot)
+
+
+def _digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide store, created on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SessionStore()
+    return _store
@@ -0,0 +1,106 @@
+"""
+Shared Cache – one TTL cache for every app process on the host
+Process-local caches (st.cache_resource, lru_cache, dicts) are per process, so
+with N app processes each one recomputes the same designer list or admin
+stats. When SHARED_CACHE names a file, functions decorated with @cached keep
+their results in it instead – a small SQLite table, placed in /dev/shm by
+cluster.py so reads come from shared memory – and every process sees one
+copy. Values are pickled; entries expire after their TTL or when a writer
+calls invalidate().
+
+With SHARED_CACHE unset (the single-process default) @cached functions just
+run, as before.
+
+Precomputed recommendations are already shared: every process maps the same
+recommendations.bin (see precompute.py), so they are not cached here.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from metrics import counter
+
+SHARED_CACHE = os.environ.get("SHARED_CACHE")
+
+LOOKUPS = counter("shared_cache_lookups_total", "Shared cache lookups by cache and result.", ("cache", "result"))
+
+
+class SharedCache:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute("""CREATE TABLE IF NOT EXISTS cache (
+                            key TEXT PRIMARY KEY,
+                            value BLOB NOT NULL,
+                            expires_at REAL NOT NULL)""")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # a cache: losing it on power failure is fine
+        return conn
+
+    def get(self, key):
+        """(True, value) for a live entry, else (False, None)."""
+        row = self._connect().execute("SELECT value, expires_at FROM cache WHERE key=?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return False, None
+        return True, pickle.loads(row[0])
+
+    def set(self, key, value, ttl):
+        self._connect().execute("INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?,?,?)",
+                                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), time.time() + ttl))
+
+    def delete_prefix(self, prefix):
+        # Range scan on the primary key; "￿" sorts after any key character we use
+        self._connect().execute("DELETE FROM cache WHERE key >= ? AND key < ?", (prefix, prefix + "￿"))
+
+    def purge_expired(self):
+        return self._connect().execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),)).rowcount
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """The host-wide cache, or None when SHARED_CACHE is not configured."""
+    global _cache
+    if _cache is None and SHARED_CACHE:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SharedCache(SHARED_CACHE)
+    return _cache
+
+
+def cached(name, ttl):
+    """Cache a function's results host-wide for `ttl` seconds, keyed by `name` and its arguments."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if cache is None:
+                return fn(*args, **kwargs)
+            key = f"{name}:{args!r}:{sorted(kwargs.items())!r}"
+            hit, value = cache.get(key)
+            LOOKUPS.inc(cache=name, result="hit" if hit else "miss")
+            if not hit:
+                value = fn(*args, **kwargs)
+                cache.set(key, value, ttl)
+            return value
+        return wrapper
+    return decorate
+
+
+def invalidate(name):
+    """Drop every cached result of the functions cached under `name`, in all processes."""
+    cache = get_cache()
+    if cache is not None:
+        cache.delete_prefix(f"{name}:")
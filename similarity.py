@@ -0,0 +1,180 @@
+"""
+Design Similarity – "popular with similar users" over historical designs
+Designs are one-hot vectors over the six wizard categories, which makes each
+one fully described by its tuple of category codes. The index therefore keeps
+  * popularity counters of (style, theme) choices per room context, at
+    several back-off levels, so a suggestion is an O(1) lookup, and
+  * design ids grouped by identical code tuple, so nearest-neighbour search
+    scans at most the number of distinct tuples, not the number of designs.
+Both are updated incrementally from rows with id above the last one seen.
+"""
+
+import heapq
+import threading
+import time
+from array import array
+from collections import Counter
+from itertools import product
+
+from categories import CATEGORIES, decode, encode
+from database import DESIGN_SAVED_HOOKS, fetch_design_codes
+
+FIELDS = tuple(CATEGORIES)  # room_type, room_size, budget, color_theme, furniture_style, lifestyle
+ROOM, SIZE, BUDGET, THEME, STYLE, LIFE = range(len(FIELDS))
+
+# Context fields for "similar users", most specific first
+BACKOFF = ((ROOM, SIZE, BUDGET, LIFE), (ROOM, BUDGET, LIFE), (ROOM, LIFE), (ROOM,), ())
+
+# Per-field weights of the one-hot cosine-style match used for nearest neighbours
+WEIGHTS = (3.0, 1.0, 1.5, 1.0, 1.0, 2.0)
+
+# Which fields agree, for every agree/differ combination, best weighted match first
+MASKS = sorted(product((True, False), repeat=len(FIELDS)),
+               key=lambda m: sum(w for w, agree in zip(WEIGHTS, m) if agree), reverse=True)
+
+MIN_SUPPORT = 20      # designs needed at a back-off level before trusting it
+REFRESH_SECS = 5.0    # how stale the index may get relative to other writers
+
+
+class SimilarityIndex:
+    def __init__(self):
+        self.last_id = 0
+        self.total = 0
+        self._popular = {}   # (level, context codes) -> Counter[(style, theme)]
+        self._buckets = {}   # full code tuple -> array of design ids
+        self._values = [set() for _ in FIELDS]  # codes seen per field
+        self._lock = threading.Lock()
+        self._refreshed_at = 0.0
+
+    def add(self, design_id, codes):
+        with self._lock:
+            self._add(design_id, codes)
+
+    def _add(self, design_id, codes):
+        # Caller holds _lock: readers iterate these dicts and Counters
+        codes = tuple(codes)
+        choice = (codes[STYLE], codes[THEME])
+        for level, fields in enumerate(BACKOFF):
+            key = (level, tuple(codes[f] for f in fields))
+            counter = self._popular.get(key)
+            if counter is None:
+                counter = self._popular[key] = Counter()
+            counter[choice] += 1
+        bucket = self._buckets.get(codes)
+        if bucket is None:
+            bucket = self._buckets[codes] = array("q")
+        bucket.append(design_id)
+        for seen, code in zip(self._values, codes):
+            seen.add(code)
+        self.total += 1
+        self.last_id = max(self.last_id, design_id)
+
+    def refresh(self, force=False):
+        """Pull rows inserted since the last refresh (by this or any other process)."""
+        if not force and time.monotonic() - self._refreshed_at < REFRESH_SECS:
+            return
+        with self._lock:
+            self._pull()
+
+    def _pull(self):
+        for row in fetch_design_codes(self.last_id):
+            self._add(row[0], row[1:])
+        self._refreshed_at = time.monotonic()
+
+    def add_saved(self, design_id, codes):
+        """Fold in a row this process just committed, without a database read when it is
+        the next id; after a gap (rows from another writer) the missing rows are pulled."""
+        with self._lock:
+            if design_id == self.last_id + 1:
+                self._add(design_id, codes)
+            elif design_id > self.last_id:
+                self._pull()
+
+    def popular_choices(self, room_type, room_size, budget, lifestyle, k=3):
+        """Most chosen (furniture_style, color_theme) among designs for a similar room.
+
+        Returns (choices, support) where choices is [(style, theme, share)] and support
+        the number of designs the suggestion is based on.
+        """
+        ctx = [None] * len(FIELDS)
+        ctx[ROOM], ctx[SIZE] = encode("room_type", room_type), encode("room_size", room_size)
+        ctx[BUDGET], ctx[LIFE] = encode("budget", budget), encode("lifestyle", lifestyle)
+        with self._lock:
+            for level, fields in enumerate(BACKOFF):
+                counter = self._popular.get((level, tuple(ctx[f] for f in fields)))
+                support = sum(counter.values()) if counter else 0
+                if support >= MIN_SUPPORT or (level == len(BACKOFF) - 1 and support):
+                    top = counter.most_common(k * 2)
+                    break
+            else:
+                return [], 0
+        choices = [
+            (decode("furniture_style", s), decode("color_theme", t), n / support)
+            for (s, t), n in top
+            if decode("furniture_style", s) and decode("color_theme", t)
+        ][:k]
+        return choices, support
+
+    def nearest(self, codes, k=10):
+        """Ids of the k designs most similar to a code tuple (newest first within a bucket).
+
+        Candidate buckets are probed best-match-first by key, so a dense index answers
+        from the first few probes; a sparse one falls back to scoring every bucket.
+        """
+        with self._lock:
+            return self._nearest(tuple(codes), k)
+
+    def _nearest(self, codes, k):
+        out, probes = [], 0
+        for mask in MASKS:
+            alternatives = [(code,) if agree else tuple(v for v in seen if v != code)
+                            for agree, code, seen in zip(mask, codes, self._values)]
+            for key in product(*alternatives):
+                probes += 1
+                if probes > len(self._buckets):
+                    return self._scan(codes, k)
+                ids = self._buckets.get(key)
+                if ids:
+                    out.extend(reversed(ids[-(k - len(out)):]))
+                    if len(out) >= k:
+                        return out
+        return out
+
+    def _scan(self, codes, k):
+        # Every bucket holds at least one id, so the k best buckets are always enough
+        scored = heapq.nlargest(
+            k, ((sum(w for w, a, b in zip(WEIGHTS, codes, key) if a == b), key) for key in self._buckets),
+            key=lambda sk: sk[0],
+        )
+        out = []
+        for _, key in scored:
+            ids = self._buckets[key]
+            out.extend(reversed(ids[-(k - len(out)):]))
+            if len(out) >= k:
+                break
+        return out[:k]
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Process-wide index, built on first use and topped up at most every REFRESH_SECS."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = SimilarityIndex()
+                index.refresh(force=True)
+                _index = index
+    _index.refresh()
+    return _index
+
+
+def on_design_saved(design_id, user_id, codes):
+    """save_design_request hook: fold the new row in straight away (hooks run in id order)."""
+    if _index is not None:
+        _index.add_saved(design_id, codes)
+
+
+DESIGN_SAVED_HOOKS.append(on_design_saved)
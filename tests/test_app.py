@@ -0,0 +1,128 @@
+"""
+Full script runs of app.py through Streamlit's AppTest (skipped without streamlit).
+"""
+
+import os
+import re
+import time
+
+import pytest
+
+pytest.importorskip("streamlit")
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import report  # noqa: E402
+import sessions  # noqa: E402
+from categories import CATEGORIES  # noqa: E402
+from knowledge import current  # noqa: E402
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+@pytest.fixture
+def store(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(report, "REPORT_DIR", str(tmp_path / "reports"))
+    monkeypatch.setattr(report, "_jobs", {})
+    monkeypatch.setattr(sessions, "_store", sessions.SessionStore(str(tmp_path / "sessions.db")))
+    return sessions._store
+
+
+@pytest.fixture
+def user(db):
+    db.register_user("Ann", "ann@test", "pw", "1")
+    return db.login_user("ann@test", "pw")
+
+
+def _app(store, **values):
+    session = store.create()
+    session.update(values)
+    store.save(session)
+    at = AppTest.from_file(SCRIPT, default_timeout=60)
+    at.session_state.sid = session.id
+    return at
+
+
+def test_wizard_results_offer_the_report_download(store, user, monkeypatch):
+    render = report.render_report
+    # Slower than the page: the button must not depend on the render winning the race
+    monkeypatch.setattr(report, "render_report", lambda *a: time.sleep(0.5) or render(*a))
+    answers = {f"w_{col}": options[0] for col, (_, options) in CATEGORIES.items()}
+    at = _app(store, page="design", logged_in=True, user=user, wizard_step=3, w_special_notes="", **answers)
+    at.run()
+    assert not at.exception
+    downloads = at.get("download_button")
+    assert "📄 Download Full Design Report" in [d.proto.label for d in downloads]
+    assert not [b for b in at.button if "Preparing" in b.label]
+
+
+def test_pending_report_download_turns_into_the_button(store, user, monkeypatch):
+    render, done = report.render_report, []
+    monkeypatch.setattr(report, "render_report", lambda *a: time.sleep(1.0) or done.append(1) or render(*a))
+    wait = report.wait_for_report
+    monkeypatch.setattr(report, "wait_for_report", lambda *a: wait(*a, timeout=0.01))
+    answers = {f"w_{col}": options[0] for col, (_, options) in CATEGORIES.items()}
+    at = _app(store, page="design", logged_in=True, user=user, wizard_step=3, w_special_notes="", **answers)
+    at.run()
+    assert not at.exception
+    assert [b for b in at.button if "Preparing" in b.label and b.disabled]
+
+    deadline = time.monotonic() + 30
+    while not done and time.monotonic() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.1)
+    at.run()  # what the pending fragment's timer triggers once the render is done
+    assert "📄 Download Full Design Report" in [d.proto.label for d in at.get("download_button")]
+
+
+def test_url_carries_a_resume_token_not_the_session_id(store, user):
+    at = _app(store, page="home", logged_in=True, user=user)
+    at.run()
+    assert not at.exception
+    sid, token = at.session_state.sid, at.query_params["resume"]
+    assert "sid" not in at.query_params and sid not in token
+
+    reload = AppTest.from_file(SCRIPT, default_timeout=60)  # a new tab on the same URL
+    reload.query_params["resume"] = token
+    reload.run()
+    assert reload.session_state.sid != sid and store.get(sid) is None
+    assert reload.query_params["resume"] != token
+    assert store.get(reload.session_state.sid)["user"]["id"] == user["id"]
+
+    again = AppTest.from_file(SCRIPT, default_timeout=60)  # the same URL a second time
+    again.query_params["resume"] = token
+    again.run()
+    assert store.get(again.session_state.sid)["user"] is None
+
+
+@pytest.mark.parametrize("band, low, high", [
+    ("Under ₹7,500 / hr", 0, 7_500),
+    ("₹7,500–₹10,000 / hr", 7_500, 10_000),
+    ("₹10,000+ / hr", 10_000, float("inf")),
+])
+def test_price_band_edges_match_their_rupee_labels(store, db, user, band, low, high):
+    # Either side of each edge: ₹7,499 / ₹7,500 and ₹9,999 / ₹10,000 at 75 per USD
+    prices = [99.99, 100.0, 133.33, 133.34]
+    conn = db.get_connection()
+    ids = [r[0] for r in conn.execute("SELECT id FROM designers ORDER BY id")]
+    for i, designer_id in enumerate(ids):
+        conn.execute("UPDATE designers SET price_per_hour=?, rating=? WHERE id=?",
+                     (prices[i] if i < len(prices) else 50.0, 5.0 if i < len(prices) else 1.0, designer_id))
+    conn.commit()
+    conn.close()
+
+    at = _app(store, page="designers", logged_in=True, user=user)
+    at.run()
+    next(s for s in at.selectbox if s.label == "Price").select(band).run()
+    assert not at.exception
+    shown = [int(p.replace(",", "")) for m in at.markdown for p in re.findall(r"₹([\d,]+) / hour", m.value)]
+    expected = [int(p * 75) for p in prices + [50.0] if low <= int(p * 75) < high]
+    assert sorted(set(shown)) == sorted(set(expected))
+
+
+def test_missing_wizard_answers_fall_back_to_the_knowledge_base_defaults(store, user):
+    at = _app(store, page="design", logged_in=True, user=user, wizard_step=3, w_room_type="Bedroom")
+    at.run()
+    assert not at.exception
+    data = store.get(at.session_state.sid)["wizard_result"]["data"]
+    assert data == {**current().defaults, "room_type": "Bedroom", "special_notes": ""}
@@ -0,0 +1,215 @@
+"""
+Cluster integration: a real writer process and several app-side worker
+processes sharing one database, shared cache and session store, wired up
+with cluster.cluster_env as cluster.py wires its Streamlit workers.
+"""
+
+import json
+import os
+import stat
+import subprocess
+import sys
+from datetime import date, timedelta
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+import pytest
+
+import cluster
+import writer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each worker evaluates one expression per stdin line and answers with a JSON line
+WORKER = r"""
+import json, sys, threading
+import database, sessions, shared_cache, writer
+from database import DB_LOCK_RETRIES, SlotTakenError
+from shared_cache import LOOKUPS
+
+def hammer(worker, users, day, slots):
+    '''Register `users` users and race every other worker for each slot, from several threads.'''
+    booked, errors = [], []
+    def run(i):
+        try:
+            email = f"w{worker}u{i}@test"
+            database.register_user(f"W{worker} U{i}", email, "pw", "1")
+            user = database.login_user(email, "pw")
+            slot = slots[i % len(slots)]
+            try:
+                database.create_booking(user["id"], 1, None, day, slot, "Consult", 10.0)
+                booked.append(slot)
+            except SlotTakenError:
+                pass
+        except Exception as e:
+            errors.append(repr(e))
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {"booked": booked, "errors": errors,
+            "writes": {route: sum(v for (fn, r), v in writer.WRITES._values.items() if r == route)
+                       for route in ("writer", "local")},
+            "lock_retries": sum(DB_LOCK_RETRIES._values.values())}
+
+def designer_thumbnail(designer_id):
+    return next(d["thumbnail"] for d in database.get_all_designers() if d["id"] == designer_id)
+
+def new_session(**values):
+    store = sessions.get_store()
+    s = store.create()
+    s.update(values)
+    store.save(s)
+    return s.id
+
+def session_values(sid):
+    s = sessions.get_store().get(sid)
+    return None if s is None else dict(s)
+
+def set_session(sid, **values):
+    store = sessions.get_store()
+    s = store.get(sid)
+    s.update(values)
+    store.save(s)
+
+def issue_resume(sid):
+    store = sessions.get_store()
+    return store.issue_resume(store.get(sid))
+
+def resume(token):
+    s = sessions.get_store().resume(token)
+    return None if s is None else [s.id, dict(s)]
+
+print("ready", flush=True)
+for line in sys.stdin:
+    try:
+        reply = {"value": eval(line)}
+    except Exception as e:
+        reply = {"error": repr(e)}
+    print(json.dumps(reply, default=str), flush=True)
+"""
+
+
+class Worker:
+    def __init__(self, env, cwd):
+        self.proc = subprocess.Popen([sys.executable, "-c", WORKER], env=env, cwd=cwd, text=True,
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        assert self.proc.stdout.readline().strip() == "ready"
+
+    def send(self, expr):
+        self.proc.stdin.write(expr + "\n")
+        self.proc.stdin.flush()
+
+    def receive(self):
+        reply = json.loads(self.proc.stdout.readline())
+        assert "error" not in reply, reply["error"]
+        return reply["value"]
+
+    def __call__(self, expr):
+        self.send(expr)
+        return self.receive()
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.wait(timeout=30)
+
+
+@pytest.fixture
+def env(tmp_path):
+    env = cluster.cluster_env(str(tmp_path))
+    env.update(DB_PATH=str(tmp_path / "app.db"), SESSIONS_DB=str(tmp_path / "sessions.db"),
+               SHARED_CACHE=str(tmp_path / "cache.db"), METRICS_PORT="0",
+               PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    env.pop("ANALYTICS_SNAPSHOT", None)
+    proc = writer.spawn(env["WRITER_ADDRESS"], env=env)
+    yield env
+    proc.terminate()
+    proc.wait(timeout=10)
+
+
+@pytest.fixture
+def workers(env, tmp_path):
+    started = []
+
+    def start(n):
+        started.extend(Worker(env, str(tmp_path)) for _ in range(n))
+        return started[-n:]
+
+    yield start
+    for w in started:
+        w.close()
+
+
+def test_writer_serialises_writes_from_every_worker(workers):
+    procs = workers(4)
+    procs[0]("database.init_db()")
+    day, slots = str(date.today() + timedelta(days=30)), ["09:00 AM – 11:00 AM", "11:00 AM – 01:00 PM"]
+    for i, w in enumerate(procs):  # all four run at once
+        w.send(f"hammer({i}, 25, {day!r}, {slots!r})")
+    results = [w.receive() for w in procs]
+
+    assert [r["errors"] for r in results] == [[]] * 4
+    assert sorted(slot for r in results for slot in r["booked"]) == sorted(slots)  # one winner per slot
+    # Every register_user and create_booking went through the writer, none ran locally
+    assert [r["writes"]["local"] for r in results] == [0] * 4
+    assert all(r["writes"]["writer"] >= 50 for r in results)
+    assert sum(r["lock_retries"] for r in results) == 0  # so none of them queued on the file lock
+    assert procs[1]("database.admin_stats()['users']") == 100
+    assert procs[2]("len(database.get_user_bookings(database.login_user('w0u0@test', 'pw')['id']))") <= 1
+
+
+def test_shared_cache_is_consistent_across_workers(workers):
+    a, b, c = workers(3)
+    a("database.init_db()")
+    before = a("designer_thumbnail(1)")
+    assert b("designer_thumbnail(1)") == before
+    assert b("LOOKUPS.value(cache='designers', result='hit')") == 1  # served from a's entry
+
+    c("database.set_designer_thumbnail(1, 'new.png')")  # runs in the writer, which invalidates
+    assert a("designer_thumbnail(1)") == "new.png"
+    assert b("designer_thumbnail(1)") == "new.png"
+
+
+def test_session_created_on_one_worker_is_read_on_another(workers):
+    a, b = workers(2)
+    sid = a("new_session(user={'id': 2}, page='wizard')")
+    assert b(f"session_values({sid!r})") == {"user": {"id": 2}, "page": "wizard"}
+
+    b(f"set_session({sid!r}, page='bookings')")
+    # a still holds the session in its hot set; the shared-mode version check must catch the change
+    assert a(f"session_values({sid!r})")["page"] == "bookings"
+
+
+def test_resume_token_issued_on_one_worker_is_redeemed_once_on_another(workers):
+    a, b, c = workers(3)
+    sid = a("new_session(user={'id': 2})")
+    token = a(f"issue_resume({sid!r})")
+    fresh, values = b(f"resume({token!r})")
+    assert fresh != sid and values == {"user": {"id": 2}}
+    assert c(f"resume({token!r})") is None
+    assert a(f"session_values({sid!r})") is None  # a's hot copy of the old id is dropped too
+
+
+def test_writer_socket_is_private_and_needs_the_key(env):
+    address = env["WRITER_ADDRESS"]
+    assert stat.S_IMODE(os.stat(address).st_mode) == 0o600
+    with pytest.raises(AuthenticationError):
+        Client(address, family="AF_UNIX", authkey=b"interior-design-writer")
+    with Client(address, family="AF_UNIX", authkey=env["WRITER_AUTHKEY"].encode()) as conn:
+        conn.send(("no_such_write", (), {}))
+        ok, error = conn.recv()
+        assert not ok and isinstance(error, ValueError)
+
+
+def test_writer_refuses_a_shared_directory_or_a_missing_key(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir(mode=0o777)
+    shared.chmod(0o777)
+    with pytest.raises(RuntimeError, match="0700"):
+        writer.spawn(str(shared / "writer.sock"))
+
+    env = dict(os.environ, PYTHONPATH=ROOT, WRITER_AUTHKEY="")
+    result = subprocess.run([sys.executable, os.path.join(ROOT, "writer.py"), "serve", str(tmp_path / "w.sock")],
+                            env=env, capture_output=True, text=True, timeout=30)
+    assert result.returncode != 0 and "WRITER_AUTHKEY" in result.stderr
@@ -0,0 +1,183 @@
+from datetime import date, timedelta
+
+import pytest
+
+from categories import CATEGORIES
+
+
+def _answers(**overrides):
+    data = {col: options[0] for col, (_, options) in CATEGORIES.items()}
+    data["special_notes"] = ""
+    data.update(overrides)
+    return data
+
+
+def _day(n=30):
+    return str(date.today() + timedelta(days=n))
+
+
+def test_register_and_login(db):
+    assert db.register_user("Ann", "ann@test", "pw", "1") == (True, "Registration successful!")
+    assert db.register_user("Ann", "ann@test", "pw", "1")[0] is False
+    user = db.login_user("ann@test", "pw")
+    assert user["name"] == "Ann" and user["role"] == "user"
+    assert db.login_user("ann@test", "wrong") is None
+
+
+def test_design_requests_round_trip(db):
+    db.register_user("Ann", "ann@test", "pw", "1")
+    user = db.login_user("ann@test", "pw")
+    first = db.save_design_request(user["id"], _answers(special_notes="two cats"))
+    second = db.save_design_request(user["id"], _answers())
+    assert second > first
+    designs = db.get_user_designs(user["id"])
+    assert {d["id"] for d in designs} == {first, second}
+    labels = {col: options[0] for col, (_, options) in CATEGORIES.items()}
+    assert all(designs[0][col] == label for col, label in labels.items())
+
+
+def test_save_design_request_rejects_missing_fields(db):
+    with pytest.raises(KeyError):
+        db.save_design_request(1, {"room_type": "Bedroom"})
+
+
+def test_booking_and_double_booking(db):
+    db.register_user("Ann", "ann@test", "pw", "1")
+    user = db.login_user("ann@test", "pw")
+    designer = db.get_all_designers()[0]["id"]
+    booking_id, txn = db.create_booking(user["id"], designer, None, _day(), db.TIME_SLOTS[0], "Consult", 10.0)
+    assert len(txn) == 10
+    with pytest.raises(db.SlotTakenError):
+        db.create_booking(user["id"], designer, None, _day(), db.TIME_SLOTS[0], "Consult", 10.0)
+    assert [b["id"] for b in db.get_user_bookings(user["id"])] == [booking_id]
+    free = db.get_free_slots([designer], date.today() + timedelta(days=30), date.today() + timedelta(days=30))
+    assert (_day(), db.TIME_SLOTS[0]) not in free[designer]
+
+
+def test_rejecting_frees_the_slot(db):
+    db.register_user("Ann", "ann@test", "pw", "1")
+    user = db.login_user("ann@test", "pw")
+    designer = db.get_all_designers()[0]["id"]
+    booking_id, _ = db.create_booking(user["id"], designer, None, _day(), db.TIME_SLOTS[1], "Consult", 10.0)
+    db.update_booking_status(booking_id, "Rejected", actor_id=1)
+    db.create_booking(user["id"], designer, None, _day(), db.TIME_SLOTS[1], "Consult", 10.0)
+
+
+def test_event_log(db):
+    db.register_user("Ann", "ann@test", "pw", "1")
+    user = db.login_user("ann@test", "pw")
+    designer = db.get_all_designers()[0]["id"]
+    booking_id, _ = db.create_booking(user["id"], designer, None, _day(), db.TIME_SLOTS[2], "Consult", 10.0)
+    db.update_booking_status(booking_id, "Confirmed", actor_id=1)
+    db._event_writes().flush(timeout=10)
+    kinds = [(e["kind"], e["actor_id"]) for e in db.booking_events(booking_id)]
+    assert kinds == [("booking_created", user["id"]), ("payment_submitted", user["id"]), ("status_changed", 1)]
+    assert db.user_events(user["id"], limit=1)[0]["kind"] == "status_changed"
+
+
+def test_admin_queries(db):
+    db.register_user("Ann", "ann@test", "pw", "1")
+    stats = db.admin_stats()
+    assert stats["users"] == 1 and stats["bookings"] == 0
+    assert {u["email"] for u in db.admin_all_users()} == {"ann@test", "admin@interiordesign.com"}
+
+
+def test_designer_search(db):
+    page = db.search_designers(page=1, page_size=2)
+    assert len(page) == 2
+    assert db.count_designers() == len(db.get_all_designers())
+    assert all(d["rating"] >= 4.8 for d in db.search_designers(min_rating=4.8))
+
+
+def test_designer_counts_are_bounded_and_follow_bookings(db, monkeypatch):
+    monkeypatch.setattr(db, "DESIGNER_COUNT_KEYS", 2)
+    for rating in (4.0, 4.5, 4.8):
+        db.count_designers(min_rating=rating)
+    assert list(db._designer_counts) == [(("min_rating", 4.5),), (("min_rating", 4.8),)]
+
+    db.register_user("Ann", "ann@test", "pw", "1")
+    ann = db.login_user("ann@test", "pw")
+    designer = next(d["id"] for d in db.get_all_designers() if d["availability"] == "Available")
+    day = date.fromisoformat(_day())
+    free = db.count_designers(free_between=(day, day))
+    for slot in db.TIME_SLOTS:  # a fully booked day takes the designer out of the count at once
+        db.create_booking(ann["id"], designer, None, str(day), slot, "Consult", 10.0)
+    assert db.count_designers(free_between=(day, day)) == free - 1
+    assert len(db._designer_counts) == 2
+
+
+def test_init_db_is_idempotent(db):
+    before = len(db.get_all_designers())
+    db.init_db()
+    assert len(db.get_all_designers()) == before
+
+
+def test_reconfirming_a_rejected_booking_whose_slot_was_taken(db):
+    db.register_user("Ann", "ann@test", "pw", "1")
+    db.register_user("Bob", "bob@test", "pw", "1")
+    ann, bob = db.login_user("ann@test", "pw"), db.login_user("bob@test", "pw")
+    designer = db.get_all_designers()[0]["id"]
+    rejected, _ = db.create_booking(ann["id"], designer, None, _day(), db.TIME_SLOTS[3], "Consult", 10.0)
+    db.update_booking_status(rejected, "Rejected", actor_id=1)
+    db.create_booking(bob["id"], designer, None, _day(), db.TIME_SLOTS[3], "Consult", 10.0)
+    with pytest.raises(db.SlotTakenError):
+        db.update_booking_status(rejected, "Confirmed", actor_id=1)
+    assert db.get_user_bookings(ann["id"])[0]["booking_status"] == "Rejected"
+
+
+def test_reconfirming_a_free_slot_and_confirming_twice(db):
+    db.register_user("Ann", "ann@test", "pw", "1")
+    ann = db.login_user("ann@test", "pw")
+    designer = db.get_all_designers()[0]["id"]
+    booking, _ = db.create_booking(ann["id"], designer, None, _day(), db.TIME_SLOTS[0], "Consult", 10.0)
+    db.update_booking_status(booking, "Confirmed", actor_id=1)  # already holds its slot
+    db.update_booking_status(booking, "Rejected", actor_id=1)
+    db.update_booking_status(booking, "Confirmed", actor_id=1)  # slot still free: reclaimed
+    with pytest.raises(db.SlotTakenError):
+        db.create_booking(ann["id"], designer, None, _day(), db.TIME_SLOTS[0], "Consult", 10.0)
+
+
+def _style_rows(db):
+    conn = db.get_connection()
+    try:
+        c = conn.cursor()
+        c.execute("SELECT id, label FROM furniture_styles")
+        return dict(c.fetchall())
+    finally:
+        conn.close()
+
+
+def test_hot_added_option_is_stored_under_its_code(db, add_option):
+    db.register_user("Ann", "ann@test", "pw", "1")
+    user = db.login_user("ann@test", "pw")
+    free_text = db.save_design_request(user["id"], _answers(furniture_style="Wabi-sabi"))
+    early = db.save_design_request(user["id"], _answers(furniture_style="Japandi"))
+    assert all(code < 0 for code, label in _style_rows(db).items() if label in ("Wabi-sabi", "Japandi"))
+
+    code = add_option("furniture_style", "Japandi")
+    late = db.save_design_request(user["id"], _answers(furniture_style="Japandi"))
+    rows = _style_rows(db)
+    assert rows[code] == "Japandi" and list(rows.values()).count("Japandi") == 1
+    styles = {d["id"]: d["furniture_style"] for d in db.get_user_designs(user["id"])}
+    assert styles == {free_text: "Wabi-sabi", early: "Japandi", late: "Japandi"}
+
+
+def test_init_db_moves_labels_off_reserved_codes(db, add_option):
+    db.register_user("Ann", "ann@test", "pw", "1")
+    user = db.login_user("ann@test", "pw")
+    design = db.save_design_request(user["id"], _answers())
+    reserved = len(CATEGORIES["furniture_style"][1]) + 1
+    conn = db.get_connection()
+    try:
+        c = conn.cursor()  # what the old MAX(id)+1 append left behind
+        c.execute("INSERT INTO furniture_styles (id, label) VALUES (?,?)", (reserved, "Oddity"))
+        c.execute("UPDATE design_requests SET furniture_style_id=? WHERE id=?", (reserved, design))
+        conn.commit()
+    finally:
+        conn.close()
+
+    assert add_option("furniture_style", "Japandi") == reserved
+    db.init_db()
+    rows = _style_rows(db)
+    assert rows[reserved] == "Japandi" and [i for i, l in rows.items() if l == "Oddity"][0] < 0
+    assert db.get_user_designs(user["id"])[0]["furniture_style"] == "Oddity"
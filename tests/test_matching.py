@@ -0,0 +1,28 @@
+from categories import BUDGETS, FURNITURE_STYLES
+from matching import DesignerIndex, match_score, style_affinity
+
+DESIGNERS = [
+    {"id": 1, "specialization": "Modern & Minimalist", "price_per_hour": 90.0, "rating": 4.9},
+    {"id": 2, "specialization": "Japandi Interiors", "price_per_hour": 150.0, "rating": 4.5},
+    {"id": 3, "specialization": "Rustic Farmhouse", "price_per_hour": 120.0, "rating": 4.7},
+]
+
+
+def test_top_k_prefers_style_specialists():
+    index = DesignerIndex(DESIGNERS)
+    assert index.top_k("Rustic", BUDGETS[0], k=1)[0][0]["id"] == 3
+    assert [d["id"] for d, _ in index.rank("Modern", BUDGETS[0])][0] == 1
+    assert index.top_k("Not a style", "Not a budget", k=3)
+
+
+def test_hot_added_style_and_budget(add_option):
+    stale = DesignerIndex(DESIGNERS)  # built before the options existed
+    style = add_option("furniture_style", "Japandi")
+    add_option("budget", "Ultra Luxury")
+    assert len(stale.top_k("Japandi", "Ultra Luxury")) == 3
+
+    index = DesignerIndex(DESIGNERS)
+    assert style == len(FURNITURE_STYLES) + 1
+    assert style_affinity("Japandi Interiors")[style] == 1.0  # recognised by its own name
+    assert index.top_k("Japandi", "Ultra Luxury", k=1)[0][0]["id"] == 2
+    assert 0 <= match_score(DESIGNERS[1], "Japandi", "Ultra Luxury") <= 100
@@ -0,0 +1,45 @@
+import socket
+import urllib.error
+import urllib.request
+
+import pytest
+
+import metrics
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(metrics, "_server", None)
+    server = metrics.start_http_server(_free_port())
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_scrape_serves_exposition_format(server):
+    metrics.counter("test_scrapes_total", "Scrapes made by the test.", ("path",)).inc(path='a"b')
+    host, port = server.server_address
+    with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as resp:
+        assert resp.headers["Content-Type"] == metrics.CONTENT_TYPE
+        text = resp.read().decode("utf-8")
+    assert "# TYPE test_scrapes_total counter" in text
+    assert 'test_scrapes_total{path="a\\"b"} 1' in text
+    assert "# TYPE db_query_seconds histogram" in text
+    with pytest.raises(urllib.error.HTTPError):
+        urllib.request.urlopen(f"http://{host}:{port}/nope", timeout=5)
+
+
+def test_binds_loopback_by_default(server):
+    assert server.server_address[0] == "127.0.0.1"
+    assert metrics.start_http_server(_free_port()) is server  # once per process
+
+
+def test_port_zero_disables(monkeypatch):
+    monkeypatch.setattr(metrics, "_server", None)
+    assert metrics.start_http_server(0) is None
@@ -0,0 +1,39 @@
+import pytest
+
+import cluster
+import ratelimit
+from ratelimit import RateLimited, check_login, client_key
+
+SPOOFED = {"X-Forwarded-For": "10.9.9.9, 203.0.113.7"}
+
+
+@pytest.fixture(autouse=True)
+def fresh_buckets():
+    yield
+    for limiter in (ratelimit.EMAILS, ratelimit.CLIENTS):
+        limiter._buckets.clear()
+
+
+def test_forwarded_for_ignored_without_a_trusted_proxy(monkeypatch):
+    monkeypatch.setattr(ratelimit, "TRUST_FORWARDED_FOR", False)
+    assert client_key(SPOOFED, "198.51.100.1") == "198.51.100.1"
+    assert client_key({}, None) is None
+
+
+def test_forwarded_for_last_hop_behind_a_trusted_proxy(monkeypatch):
+    monkeypatch.setattr(ratelimit, "TRUST_FORWARDED_FOR", True)
+    assert client_key(SPOOFED, "127.0.0.1") == "203.0.113.7"
+    assert client_key({}, "127.0.0.1") == "127.0.0.1"
+
+
+def test_cluster_workers_trust_the_proxy(tmp_path):
+    assert cluster.cluster_env(str(tmp_path))["TRUST_FORWARDED_FOR"] == "1"
+
+
+def test_rotating_forwarded_for_does_not_escape_the_client_limit(monkeypatch):
+    monkeypatch.setattr(ratelimit, "TRUST_FORWARDED_FOR", False)
+    burst = int(ratelimit.CLIENTS.burst)
+    with pytest.raises(RateLimited):
+        for i in range(burst + 1):
+            headers = {"X-Forwarded-For": f"10.0.{i // 256}.{i % 256}"}
+            check_login(f"user{i}@test", client_key(headers, "198.51.100.1"))
@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("PIL")
+
+import report  # noqa: E402
+from ai_engine import generate_recommendations  # noqa: E402
+from categories import CATEGORIES  # noqa: E402
+
+
+@pytest.fixture
+def plan(tmp_path, monkeypatch):
+    monkeypatch.setattr(report, "REPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(report, "_jobs", {})
+    data = {col: options[0] for col, (_, options) in CATEGORIES.items()}
+    data["special_notes"] = ""
+    return data, generate_recommendations(**data)
+
+
+def test_wait_for_report_returns_the_rendered_report(plan):
+    data, recs = plan
+    body = report.wait_for_report(41, data, recs, timeout=30)
+    assert body.startswith(b"<!DOCTYPE html>") or b"<html" in body[:200]
+    assert report.get_report(41) == body
+
+
+def test_pending_report_is_none_until_rendered(plan, monkeypatch):
+    data, recs = plan
+    monkeypatch.setattr(report, "render_report", lambda *a: __import__("time").sleep(0.5) or b"late")
+    assert report.wait_for_report(42, data, recs, timeout=0.01) is None
+    assert report.wait_for_report(42, data, recs, timeout=30) == b"late"  # same job, not a second one
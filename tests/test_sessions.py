@@ -0,0 +1,72 @@
+import pickle
+
+import pytest
+
+from ai_engine import generate_recommendations
+from categories import CATEGORIES
+from knowledge import current, frozendict
+from sessions import SessionStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "sessions.db")
+
+
+def test_frozendict_pickles_and_stays_read_only():
+    palettes = pickle.loads(pickle.dumps(current().palettes, pickle.HIGHEST_PROTOCOL))
+    assert palettes == current().palettes and isinstance(palettes, frozendict)
+    with pytest.raises(TypeError):
+        palettes["new"] = {}
+
+
+def test_wizard_result_survives_a_reload_in_another_process(path):
+    data = {col: options[0] for col, (_, options) in CATEGORIES.items()}
+    recs = generate_recommendations(**data, special_notes="")
+    store = SessionStore(path, hot_size=1)
+    session = store.create()
+    session.wizard_result = {"design_id": 7, "data": data, "recs": recs}
+    store.save(session)
+
+    other = SessionStore(path)  # another worker, or this one after a restart
+    assert other.get(session.id)["wizard_result"]["recs"] == recs
+    store.create()  # evicts the session from this process's hot set
+    assert store.get(session.id)["wizard_result"]["recs"] == recs
+
+
+def test_rotate_carries_only_the_allowed_keys(path):
+    store = SessionStore(path)
+    session = store.create()
+    session.update(logged_in=True, user={"id": 2}, wizard_step=3, w_budget="x",
+                   wizard_result={"design_id": 1}, page="wizard")
+    store.save(session)
+    fresh = store.rotate(session, keep=("page",))
+    assert fresh.id != session.id and dict(fresh) == {"page": "wizard"}
+    assert store.get(session.id) is None
+    assert dict(store.rotate(fresh)) == {}
+
+
+def test_resume_token_works_once_under_a_fresh_id(path):
+    store = SessionStore(path, shared=True)
+    session = store.create()
+    session.update(logged_in=True, user={"id": 2})
+    store.save(session)
+    token = store.issue_resume(session)
+
+    other = SessionStore(path, shared=True)  # the reconnect lands on another worker
+    resumed = other.resume(token)
+    assert resumed.id != session.id and dict(resumed) == {"logged_in": True, "user": {"id": 2}}
+    assert other.resume(token) is None and store.resume(token) is None
+    assert store.get(session.id) is None  # the id the old token led to is gone too
+
+
+def test_resume_token_expires_and_is_revoked_on_reissue(path, monkeypatch):
+    store = SessionStore(path)
+    session = store.create()
+    store.save(session)
+    first = store.issue_resume(session)
+    second = store.issue_resume(session, revoke=first)
+    assert store.resume(first) is None
+
+    monkeypatch.setattr("sessions.RESUME_TTL", -1)
+    assert store.resume(store.issue_resume(session, revoke=second)) is None
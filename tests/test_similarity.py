@@ -0,0 +1,83 @@
+import random
+import threading
+
+from categories import CATEGORIES
+from similarity import MIN_SUPPORT, SimilarityIndex
+
+SIZES = [len(options) for _, options in CATEGORIES.values()]
+
+
+def _codes(rng):
+    return tuple(rng.randint(1, n) for n in SIZES)
+
+
+def test_popular_choices_and_nearest():
+    index = SimilarityIndex()
+    rng = random.Random(1)
+    for design_id in range(1, 2_001):
+        index.add(design_id, _codes(rng))
+    labels = {col: options[0] for col, (_, options) in CATEGORIES.items()}
+    choices, support = index.popular_choices(labels["room_type"], labels["room_size"],
+                                             labels["budget"], labels["lifestyle"])
+    assert support >= MIN_SUPPORT and 0 < len(choices) <= 3
+    assert abs(sum(share for _, _, share in choices)) <= 1.0
+    assert len(index.nearest(_codes(rng), k=10)) == 10
+
+
+def test_reads_during_concurrent_adds():
+    index = SimilarityIndex()
+    rng = random.Random(2)
+    labels = [tuple(options) for _, options in CATEGORIES.values()]
+    errors = []
+    stop = threading.Event()
+
+    def write(start):
+        r = random.Random(start)
+        for design_id in range(start, start + 20_000):
+            index.add(design_id, _codes(r))
+
+    def read():
+        try:
+            while not stop.is_set():
+                index.popular_choices(rng.choice(labels[0]), rng.choice(labels[1]),
+                                      rng.choice(labels[2]), rng.choice(labels[5]))
+                index.nearest(_codes(rng), k=5)
+        except Exception as e:  # e.g. "dictionary changed size during iteration"
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    writers = [threading.Thread(target=write, args=(start,)) for start in (1, 1_000_001)]
+    for t in readers + writers:
+        t.start()
+    for t in writers:
+        t.join()
+    stop.set()
+    for t in readers:
+        t.join()
+    assert errors == []
+    assert index.total == 40_000
+
+
+def test_saved_rows_are_added_without_reloading(monkeypatch):
+    import similarity
+
+    pulls = []
+    stored = {}
+
+    def fetch(after_id=0):
+        pulls.append(after_id)
+        return [(i, *stored[i]) for i in sorted(stored) if i > after_id]
+
+    monkeypatch.setattr(similarity, "fetch_design_codes", fetch)
+    index = SimilarityIndex()
+    rng = random.Random(3)
+    for design_id in range(1, 501):  # one write-behind batch, hooks in id order
+        stored[design_id] = _codes(rng)
+        index.add_saved(design_id, stored[design_id])
+    assert pulls == [] and index.total == 500
+
+    stored[501] = _codes(rng)  # another process's row
+    stored[502] = _codes(rng)
+    index.add_saved(502, stored[502])
+    index.add_saved(502, stored[502])  # already pulled in
+    assert pulls == [500] and index.total == 502 and index.last_id == 502
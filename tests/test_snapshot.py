@@ -0,0 +1,75 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from storage import AnalyticsSnapshot
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = str(tmp_path / "live.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, body TEXT)")
+    conn.executemany("INSERT INTO t (body) VALUES (?)", [("x" * 1000,) for _ in range(20_000)])  # ~20 MB
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _count(conn):
+    return conn.execute("SELECT COUNT(*) FROM t").fetchone()[0]
+
+
+def test_refresh_completes_under_constant_writes(source, tmp_path):
+    snapshot = AnalyticsSnapshot(source, str(tmp_path / "copy.db"), ttl=60)
+    stop = threading.Event()
+
+    def write():
+        conn = sqlite3.connect(source, timeout=30)
+        while not stop.is_set():
+            conn.execute("INSERT INTO t (body) VALUES ('w')")
+            conn.commit()
+            time.sleep(0.005)
+        conn.close()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        start = time.monotonic()
+        snapshot.connect().close()  # no copy yet: waits for the first one
+        snapshot.refresh()
+        assert time.monotonic() - start < 10
+    finally:
+        stop.set()
+        writer.join()
+
+
+def test_stale_read_waits_for_the_change(source, tmp_path):
+    snapshot = AnalyticsSnapshot(source, str(tmp_path / "copy.db"), ttl=60)
+    conn = snapshot.connect()
+    before = _count(conn)
+    conn.close()
+
+    live = sqlite3.connect(source)
+    live.execute("INSERT INTO t (body) VALUES ('admin change')")
+    live.commit()
+    live.close()
+    snapshot.mark_stale()
+    conn = snapshot.connect()
+    assert _count(conn) == before + 1
+    conn.close()
+
+
+def test_expired_copy_is_served_while_refreshing(source, tmp_path):
+    snapshot = AnalyticsSnapshot(source, str(tmp_path / "copy.db"), ttl=0)
+    snapshot.connect().close()
+    start = time.monotonic()
+    conn = snapshot.connect()  # past the TTL: refresh starts in the background, this read doesn't wait
+    assert time.monotonic() - start < 0.05
+    assert _count(conn) >= 20_000
+    conn.close()
+    with snapshot._cond:
+        while snapshot._refreshing:
+            snapshot._cond.wait()
@@ -0,0 +1,221 @@
+import types
+
+import pytest
+
+import storage
+from storage import insert_target, pg_query
+
+
+# ── Query translation (PostgreSQL) ─────────────────────────────────────────────
+
+@pytest.mark.parametrize("query, expected", [
+    ("SELECT * FROM users WHERE email=? AND password=?",
+     "SELECT * FROM users WHERE email=%s AND password=%s"),
+    ("SELECT name FROM t WHERE name LIKE ?", "SELECT name FROM t WHERE name LIKE %s"),
+    ("SELECT '?' AS q, a FROM t WHERE b=?", "SELECT '?' AS q, a FROM t WHERE b=%s"),
+    ("SELECT a FROM t WHERE b LIKE 'events_%' AND c=?", "SELECT a FROM t WHERE b LIKE 'events_%%' AND c=%s"),
+    ("SELECT 'it''s ?' FROM t WHERE a=?", "SELECT 'it''s ?' FROM t WHERE a=%s"),
+    ("SELECT a % 2 FROM t", "SELECT a %% 2 FROM t"),
+])
+def test_pg_query(query, expected):
+    assert pg_query(query) == expected
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("INSERT INTO users (name) VALUES (?)", "users"),
+    ("  insert into designer_slots (designer_id) VALUES (?) ON CONFLICT DO NOTHING", "designer_slots"),
+    ("INSERT INTO t (a) VALUES (?) RETURNING a", None),
+    ("INSERT INTO notes (body) VALUES ('returning soon')", "notes"),
+    ("UPDATE users SET name=? WHERE id=?", None),
+    ("SELECT * FROM users", None),
+])
+def test_insert_target(query, expected):
+    assert insert_target(query) == expected
+
+
+class _FakeRawCursor:
+    """Stands in for a psycopg2 cursor: records what it is sent, answers from canned rows."""
+
+    def __init__(self, tables, rows=()):
+        self.tables, self.rows, self.executed = tables, list(rows), []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=()):
+        self.executed.append((query, params))
+
+    def executemany(self, query, seq):
+        self.executed.append((query, list(seq)))
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        query, params = self.executed[-1]
+        if "information_schema.columns" in query:
+            return [(col,) for col in self.tables.get(params[0], ())]
+        rows, self.rows = self.rows, []
+        return rows
+
+
+class _FakeRawConnection:
+    def __init__(self, tables):
+        self.tables, self.lookups = tables, []
+
+    def cursor(self):
+        cur = _FakeRawCursor(self.tables)
+        self.lookups.append(cur)
+        return cur
+
+
+@pytest.fixture
+def pg():
+    """A _PgCursor over fake psycopg2 objects – the postgres code path without a server."""
+    backend = object.__new__(storage.PostgresBackend)  # skips the pool (and psycopg2)
+    backend._id_tables = {}
+    raw = _FakeRawConnection({"with_id": ("id", "label"), "pairs": ("a", "b")})
+    conn = types.SimpleNamespace(backend=backend, raw=raw)
+    return storage._PgCursor(_FakeRawCursor(raw.tables), conn), raw
+
+
+def test_pg_cursor_returns_id_for_lastrowid(pg):
+    cur, raw = pg
+    cur.cur.rows = [(7,), (8,)]
+    cur.execute("INSERT INTO with_id (label) VALUES (?)", ("one",))
+    assert cur.lastrowid == 7
+    cur.execute("INSERT INTO with_id (label) VALUES (?)", ("50%",))
+    assert cur.lastrowid == 8
+    assert cur.cur.executed == [("INSERT INTO with_id (label) VALUES (%s) RETURNING id", ("one",)),
+                                ("INSERT INTO with_id (label) VALUES (%s) RETURNING id", ("50%",))]
+    assert len(raw.lookups) == 1  # the id column lookup is cached per table
+
+
+def test_pg_cursor_leaves_other_statements_alone(pg):
+    cur, raw = pg
+    cur.execute("INSERT INTO pairs (a, b) VALUES (?,?) ON CONFLICT DO NOTHING", (1, 2))
+    cur.execute("INSERT INTO with_id (label) VALUES (?) RETURNING label", ("x",))
+    cur.execute("SELECT label FROM with_id WHERE label LIKE '%?' AND id > ?", (0,))
+    cur.executemany("UPDATE with_id SET label=? WHERE id=?", [("a", 1)])
+    assert [q for q, _ in cur.cur.executed] == [
+        "INSERT INTO pairs (a, b) VALUES (%s,%s) ON CONFLICT DO NOTHING",
+        "INSERT INTO with_id (label) VALUES (%s) RETURNING label",
+        "SELECT label FROM with_id WHERE label LIKE '%%?' AND id > %s",
+        "UPDATE with_id SET label=%s WHERE id=%s",
+    ]
+    assert cur.lastrowid is None
+
+
+def test_pg_cursor_skipped_insert_and_missing_table(pg):
+    cur, raw = pg
+    cur.execute("INSERT INTO with_id (label) VALUES (?) ON CONFLICT DO NOTHING", ("dup",))
+    assert cur.cur.executed[-1][0].endswith("ON CONFLICT DO NOTHING RETURNING id")
+    assert cur.lastrowid is None  # no row came back
+    # A table that doesn't exist yet isn't cached as id-less
+    cur.execute("INSERT INTO later (id) VALUES (?)", (1,))
+    raw.tables["later"] = ("id",)
+    cur.execute("INSERT INTO later (id) VALUES (?)", (2,))
+    assert cur.cur.executed[-2][0] == "INSERT INTO later (id) VALUES (%s)"
+    assert cur.cur.executed[-1][0] == "INSERT INTO later (id) VALUES (%s) RETURNING id"
+
+
+def test_named_pg_cursor_only_translates(pg):
+    _, raw = pg
+    cur = storage._PgCursor(_FakeRawCursor(raw.tables))  # server-side: no connection, read-only
+    cur.execute("INSERT INTO with_id (label) VALUES (?)", ("x",))
+    assert cur.cur.executed == [("INSERT INTO with_id (label) VALUES (%s)", ("x",))] and not raw.lookups
+
+
+# ── Both backends ──────────────────────────────────────────────────────────────
+
+def _create(c, backend):
+    c.execute(backend.ddl("CREATE TABLE with_id (id INTEGER PRIMARY KEY AUTOINCREMENT, label TEXT UNIQUE)"))
+    c.execute("CREATE TABLE pairs (a INTEGER NOT NULL, b INTEGER NOT NULL, PRIMARY KEY(a, b))")
+
+
+def test_lastrowid_and_tables_without_id(backend):
+    conn = backend.connect()
+    c = conn.cursor()
+    _create(c, backend)
+    c.execute("INSERT INTO with_id (label) VALUES (?)", ("one",))
+    first = c.lastrowid
+    c.execute("INSERT INTO with_id (label) VALUES (?)", ("two",))
+    assert c.lastrowid == first + 1
+    # No id column: must not grow a RETURNING id
+    c.execute("INSERT INTO pairs (a, b) VALUES (?,?)", (1, 2))
+    c.execute("INSERT INTO pairs (a, b) VALUES (?,?) ON CONFLICT DO NOTHING", (1, 2))
+    assert c.rowcount == 0
+    conn.commit()
+    c.execute("SELECT COUNT(*) FROM pairs")
+    assert c.fetchone()[0] == 1
+    conn.close()
+
+
+def test_literal_question_mark_and_percent(backend):
+    conn = backend.connect()
+    c = conn.cursor()
+    _create(c, backend)
+    c.execute("INSERT INTO with_id (label) VALUES ('what?')")
+    c.execute("INSERT INTO with_id (label) VALUES (?)", ("50%",))
+    c.execute("SELECT label FROM with_id WHERE label LIKE '%?'")
+    assert [r[0] for r in c.fetchall()] == ["what?"]
+    c.execute("SELECT label FROM with_id WHERE label LIKE '%\\%' ESCAPE '\\' AND id > ?", (0,))
+    assert [r[0] for r in c.fetchall()] == ["50%"]
+    conn.close()
+
+
+def test_table_names_and_columns(backend):
+    conn = backend.connect()
+    c = conn.cursor()
+    _create(c, backend)
+    conn.commit()
+    assert backend.table_names(c, "with_") == ["with_id"]
+    assert backend.table_columns(c, "with_id") == ["id", "label"]
+    conn.close()
+
+
+def test_server_cursor_streams_all_rows(backend):
+    conn = backend.connect()
+    c = conn.cursor()
+    _create(c, backend)
+    c.executemany("INSERT INTO pairs (a, b) VALUES (?,?)", [(i, i) for i in range(5_000)])
+    conn.commit()
+    cur = backend.cursor(conn, server_side=True)
+    cur.execute("SELECT a FROM pairs WHERE b >= ? ORDER BY a", (0,))
+    seen = 0
+    while True:
+        rows = cur.fetchmany(777)
+        if not rows:
+            break
+        seen += len(rows)
+    assert seen == 5_000
+    conn.close()
+
+
+def test_rollback_discards(backend):
+    conn = backend.connect()
+    c = conn.cursor()
+    _create(c, backend)
+    conn.commit()
+    c.execute("INSERT INTO with_id (label) VALUES (?)", ("gone",))
+    conn.rollback()
+    c.execute("SELECT COUNT(*) FROM with_id")
+    assert c.fetchone()[0] == 0
+    conn.close()
+
+
+def test_integrity_error_type(backend):
+    conn = backend.connect()
+    c = conn.cursor()
+    _create(c, backend)
+    c.execute("INSERT INTO with_id (label) VALUES (?)", ("dup",))
+    with pytest.raises(backend.IntegrityError):
+        c.execute("INSERT INTO with_id (label) VALUES (?)", ("dup",))
+    conn.close()
+
+
+def test_set_backend_swaps_process_backend(backend):
+    assert storage.get_backend() is backend
@@ -0,0 +1,42 @@
+import pytest
+
+import metrics
+import tracing
+
+
+@pytest.fixture
+def switches(monkeypatch):
+    tracing.clear()  # spans left by other tests' queries
+
+    def set_switches(enabled, sinks):
+        monkeypatch.setattr(tracing, "ENABLED", enabled)
+        monkeypatch.setattr(tracing, "SINKS_ENABLED", sinks)
+    yield set_switches
+    tracing.clear()
+
+
+def test_tracing_off_switches_sinks_off(switches, monkeypatch):
+    seen = []
+    monkeypatch.setattr(tracing, "SINKS", [*tracing.SINKS, lambda *span: seen.append(span)])
+    switches(False, False)
+    assert not tracing.active()
+    with tracing.span("page", "home"):
+        pass
+    assert seen == [] and tracing.summary() == []
+
+    switches(False, True)  # metrics only
+    assert tracing.active()
+    with tracing.span("page", "home"):
+        pass
+    assert [s[:2] for s in seen] == [("page", "home")] and tracing.summary() == []
+
+
+def test_span_metrics(switches):
+    switches(True, True)
+    before = metrics.DB_SECONDS.counts().get(("SELECT",), 0)
+    tracing.record("db", "SELECT id FROM users WHERE email=?", 0.003)
+    tracing.record("db", "select 1", 10.0)  # past the last bucket: only +Inf
+    assert metrics.DB_SECONDS.counts()[("SELECT",)] == before + 2
+    text = metrics.exposition()
+    assert f'db_queries_total{{statement="SELECT"}} {before + 2}' in text
+    assert f'db_query_seconds_bucket{{statement="SELECT",le="+Inf"}} {before + 2}' in text
@@ -0,0 +1,41 @@
+import threading
+
+from write_behind import FAILED_ROWS, WriteBehindQueue
+
+
+def _queue(write_batch, name):
+    return WriteBehindQueue(name, write_batch, flush_ms=50)
+
+
+def test_bad_row_fails_alone():
+    calls = []
+
+    def write(rows):
+        calls.append(len(rows))
+        if "bad" in rows:
+            raise ValueError("constraint failed")
+        return [row.upper() for row in rows]
+
+    queue = _queue(write, "test_bad_row")
+    futures = [queue.submit(row) for row in ("a", "b", "bad", "c")]
+    assert queue.flush(timeout=10)
+    assert [f.result() for f in futures if f.exception() is None] == ["A", "B", "C"]
+    assert isinstance(futures[2].exception(), ValueError)
+    assert calls == [4, 1, 1, 1, 1]
+    assert FAILED_ROWS.value(queue="test_bad_row") == 1
+    queue.close()
+
+
+def test_transient_batch_failure_loses_nothing():
+    failed = threading.Event()
+
+    def write(rows):
+        if not failed.is_set():
+            failed.set()
+            raise RuntimeError("database is locked")
+        return list(rows)
+
+    queue = _queue(write, "test_transient")
+    futures = [queue.submit(i) for i in range(10)]
+    assert [f.result(timeout=10) for f in futures] == list(range(10))
+    queue.close()
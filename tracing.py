@@ -0,0 +1,230 @@
+"""
+Tracing – wall-time spans for page renders, DB queries and recommendations
+Spans go into a fixed-size in-memory ring buffer (oldest dropped first), so
+recording is a clock read and a deque append. Percentiles are computed only
+when the admin Performance page asks for a summary.
+
+Span kinds:
+    page      one route() dispatch, named by page key
+    fragment  one run of a page fragment (app.fragment), named by function;
+              a widget inside a fragment reruns only that fragment
+    db        one cursor execute, named by the query's fingerprint; rows counts
+              rows fetched (SELECT) or affected (INSERT/UPDATE/DELETE)
+    ai        one generate_recommendations call
+
+Finished spans are also passed to every callable in SINKS as
+sink(kind, name, seconds); metrics.py registers one.
+
+A span costs about 2 µs with both the ring buffer and the metrics sink on
+(`python benchmarks.py tracing` measures it). That is well under 1% of a page
+render or a query, but roughly a tenth of a generate_recommendations call
+answered from memory (~15 µs). Spans are therefore kept to page, fragment,
+query and recommendation granularity, never inner loops.
+
+Configuration:
+    TRACING=0          turn tracing off: no ring buffer and, unless
+                       TRACING_SINKS says otherwise, no sinks – pages, cursors
+                       and traced functions then run uninstrumented
+    TRACING_SINKS=0|1  switch the sinks separately (default: same as TRACING),
+                       e.g. TRACING=0 TRACING_SINKS=1 keeps only the metrics
+    TRACING_RING_SIZE  spans kept for the Performance page (default 50000)
+"""
+
+import os
+import re
+import time
+from collections import deque
+from functools import lru_cache, wraps
+
+ENABLED = os.environ.get("TRACING", "1") != "0"
+SINKS_ENABLED = os.environ.get("TRACING_SINKS", "1" if ENABLED else "0") != "0"
+RING_SIZE = int(os.environ.get("TRACING_RING_SIZE", 50_000))
+
+# Entries are [kind, name, seconds, rows, unix time]; rows may be updated after the append
+_ring = deque(maxlen=RING_SIZE)
+
+SINKS = []
+
+_clock = time.perf_counter
+
+
+def active():
+    return ENABLED or (SINKS_ENABLED and bool(SINKS))
+
+
+def record(kind, name, seconds, rows=None):
+    """Store one finished span; returns the entry so callers can add rows later."""
+    entry = [kind, name, seconds, rows, time.time()]
+    if ENABLED:
+        _ring.append(entry)
+    if SINKS_ENABLED:
+        for sink in SINKS:
+            sink(kind, name, seconds)
+    return entry
+
+
+class span:
+    """Context manager timing a block: `with span("page", "home"): ...`."""
+
+    __slots__ = ("kind", "name", "start")
+
+    def __init__(self, kind, name):
+        self.kind, self.name = kind, name
+
+    def __enter__(self):
+        self.start = _clock()
+        return self
+
+    def __exit__(self, *exc):
+        if ENABLED or (SINKS_ENABLED and SINKS):
+            record(self.kind, self.name, _clock() - self.start)
+        return False
+
+
+def traced(kind, name=None):
+    """Decorator recording each call of a function as a span."""
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not (ENABLED or (SINKS_ENABLED and SINKS)):
+                return fn(*args, **kwargs)
+            start = _clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(kind, label, _clock() - start)
+        return wrapper
+    return decorate
+
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql):
+    """Query text with literals replaced by ? and whitespace collapsed."""
+    return _SPACE.sub(" ", _LITERALS.sub("?", sql)).strip()
+
+
+class TracedCursor:
+    """Cursor proxy recording each execute as a db span; fetches add to its row count."""
+
+    __slots__ = ("_cur", "_entry")
+
+    def __init__(self, cur):
+        self._cur = cur
+        self._entry = None
+
+    def _run(self, method, query, params):
+        start = _clock()
+        method(query, params)
+        self._entry = record("db", fingerprint(query), _clock() - start,
+                             self._cur.rowcount if self._cur.rowcount >= 0 else 0)
+        return self
+
+    def execute(self, query, params=()):
+        return self._run(self._cur.execute, query, params)
+
+    def executemany(self, query, seq):
+        return self._run(self._cur.executemany, query, seq)
+
+    def _count(self, n):
+        if self._entry is not None:
+            self._entry[3] += n
+
+    def fetchone(self):
+        row = self._cur.fetchone()
+        self._count(row is not None)
+        return row
+
+    def fetchmany(self, size):
+        rows = self._cur.fetchmany(size)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cur.fetchall()
+        self._count(len(rows))
+        return rows
+
+    def __iter__(self):
+        for row in self._cur:
+            self._count(1)
+            yield row
+
+    def __getattr__(self, attr):
+        return getattr(self._cur, attr)
+
+
+class TracedConnection:
+    """Connection proxy whose cursors are traced."""
+
+    __slots__ = ("_conn",)
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return TracedCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, attr):
+        return getattr(self._conn, attr)
+
+
+def trace_connection(conn):
+    return TracedConnection(conn) if active() else conn
+
+
+def trace_cursor(cur):
+    return cur if not active() or isinstance(cur, TracedCursor) else TracedCursor(cur)
+
+
+# ── Aggregation ────────────────────────────────────────────────────────────────
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def summary(kind=None, since=None):
+    """Per (kind, name) stats over the buffered spans, slowest p95 first.
+
+    Each row: kind, name, count, p50/p95/p99/max in milliseconds, total seconds, rows.
+    """
+    groups = {}
+    for k, name, secs, rows, ts in list(_ring):
+        if (kind is None or k == kind) and (since is None or ts >= since):
+            g = groups.setdefault((k, name), [[], 0])
+            g[0].append(secs)
+            g[1] += rows or 0
+    out = []
+    for (k, name), (times, rows) in groups.items():
+        times.sort()
+        out.append({
+            "kind": k, "name": name, "count": len(times),
+            "p50_ms": _percentile(times, 0.50) * 1000, "p95_ms": _percentile(times, 0.95) * 1000,
+            "p99_ms": _percentile(times, 0.99) * 1000, "max_ms": times[-1] * 1000,
+            "total_s": sum(times), "rows": rows,
+        })
+    out.sort(key=lambda r: r["p95_ms"], reverse=True)
+    return out
+
+
+def histogram(kind, name=None, buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)):
+    """Span counts per latency bucket (upper bounds in ms, last bucket open-ended)."""
+    counts = [0] * (len(buckets) + 1)
+    for k, n, secs, _, _ in list(_ring):
+        if k == kind and (name is None or n == name):
+            ms = secs * 1000
+            i = 0
+            while i < len(buckets) and ms > buckets[i]:
+                i += 1
+            counts[i] += 1
+    labels = [f"≤{b} ms" for b in buckets] + [f">{buckets[-1]} ms"]
+    return list(zip(labels, counts))
+
+
+def clear():
+    _ring.clear()
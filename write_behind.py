@@ -0,0 +1,150 @@
+"""
+Write-Behind Queue – group commit for non-critical inserts
+Callers submit a row and get a Future back immediately; one background
+thread per queue collects rows and hands them to the queue's batch function,
+which writes them all in a single transaction. A batch is flushed once it
+holds FLUSH_ROWS rows or its first row has waited FLUSH_MS, so under a burst
+one commit (one fsync) covers many rows, while a lone row waits at most
+FLUSH_MS.
+
+Each Future resolves to that row's result (e.g. its new id) after the commit,
+or raises the row's error. If the batch transaction fails (one bad row, or a
+lock that outlasts the batch function's retries), its rows are written again
+one per transaction, so only the rows that fail on their own are lost; those
+are counted in write_behind_failed_rows_total. Every queue is flushed at
+interpreter exit, so rows accepted before a shutdown are written.
+
+Configuration (environment):
+    WRITE_BEHIND_MS     max wait before a partial batch is flushed (default 10)
+    WRITE_BEHIND_ROWS   rows that trigger an immediate flush (default 500)
+"""
+
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from metrics import counter, gauge
+
+FLUSH_MS = float(os.environ.get("WRITE_BEHIND_MS", 10))
+FLUSH_ROWS = int(os.environ.get("WRITE_BEHIND_ROWS", 500))
+
+BATCHES = counter("write_behind_batches_total", "Group commits by queue.", ("queue",))
+ROWS = counter("write_behind_rows_total", "Rows written through write-behind queues.", ("queue",))
+BATCH_FAILURES = counter("write_behind_batch_failures_total",
+                         "Batches whose transaction failed and were retried row by row.", ("queue",))
+FAILED_ROWS = counter("write_behind_failed_rows_total", "Rows that could not be written.", ("queue",))
+
+_queues = []
+
+
+class WriteBehindQueue:
+    """Batches rows for `write_batch(rows) -> results`, one result (or Exception) per row, in order."""
+
+    def __init__(self, name, write_batch, flush_ms=FLUSH_MS, max_rows=FLUSH_ROWS):
+        self.name, self.write_batch = name, write_batch
+        self.flush_secs, self.max_rows = flush_ms / 1000, max_rows
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._busy = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"write-behind-{name}", daemon=True)
+        self._thread.start()
+        _queues.append(self)
+
+    def submit(self, row):
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"write-behind queue {self.name} is closed")
+            self._pending.append((row, future, time.monotonic()))
+            self._cond.notify_all()
+        return future
+
+    def depth(self):
+        return len(self._pending)
+
+    def _take_batch(self):
+        """Block until a batch is due; returns it (empty once closed and drained)."""
+        with self._cond:
+            while True:
+                if self._pending:
+                    due = self._pending[0][2] + self.flush_secs
+                    wait = due - time.monotonic()
+                    if len(self._pending) >= self.max_rows or wait <= 0 or self._closed:
+                        n = min(len(self._pending), self.max_rows)
+                        self._busy = True
+                        return [self._pending.popleft() for _ in range(n)]
+                    self._cond.wait(wait)
+                elif self._closed:
+                    return []
+                else:
+                    self._cond.wait()
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            results = self._write([row for row, _, _ in batch])
+            for (_, future, _), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def _write(self, rows):
+        """One result or Exception per row; a failed batch is split so good rows still commit."""
+        try:
+            results = self.write_batch(rows)
+        except Exception as e:
+            if len(rows) == 1:
+                FAILED_ROWS.inc(queue=self.name)
+                print(f"write-behind {self.name}: row failed – {e!r}", file=sys.stderr)
+                return [e]
+            BATCH_FAILURES.inc(queue=self.name)
+            print(f"write-behind {self.name}: batch of {len(rows)} failed – {e!r}; "
+                  "writing its rows one by one", file=sys.stderr)
+            return [result for row in rows for result in self._write([row])]
+        BATCHES.inc(queue=self.name)
+        ROWS.inc(len(rows), queue=self.name)
+        FAILED_ROWS.inc(sum(isinstance(r, Exception) for r in results), queue=self.name)
+        return results
+
+    def flush(self, timeout=None):
+        """Write everything submitted so far; True once it is committed (False on timeout)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            # Flush now rather than after FLUSH_MS
+            if self._pending:
+                self._pending[0] = (*self._pending[0][:2], 0.0)
+                self._cond.notify_all()
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Stop accepting rows, write the rest and stop the thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+
+gauge("write_behind_queue_depth", "Rows waiting in each write-behind queue.", ("queue",),
+      fn=lambda: {(q.name,): q.depth() for q in _queues})
+
+
+@atexit.register
+def _flush_all():
+    for q in _queues:
+        q.close(timeout=30)
@@ -0,0 +1,197 @@
+"""
+Single Writer – serialise database writes from many app processes
+SQLite takes one writer at a time; with several app processes writing
+directly they queue on the file lock, back off and retry (see
+database._retry_locked). When WRITER_ADDRESS names a Unix socket, functions
+decorated with @single_writer instead send their call to one writer process
+that runs them one after another on its own connections and returns the
+result (or re-raises the exception, e.g. SlotTakenError) in the caller.
+
+Each app thread keeps one connection to the writer. If the writer can't be
+reached the call runs locally, as in single-process mode, so a writer
+restart costs lock contention rather than errors.
+
+The writer unpickles whatever its clients send, so it takes two locks: the
+socket is created 0600 in a directory only its owner can enter, and every
+connection must answer a challenge with WRITER_AUTHKEY, which has no default
+– serve refuses to start without one, and spawn generates one when its
+environment has none (WriterProcess.authkey then tells the clients).
+
+Usage:
+    WRITER_ADDRESS=$XDG_RUNTIME_DIR/interior-writer.sock WRITER_AUTHKEY=<secret> python writer.py serve
+"""
+
+import os
+import secrets
+import stat
+import subprocess
+import sys
+import threading
+import time
+from functools import wraps
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+import metrics
+from metrics import counter
+
+WRITER_ADDRESS = os.environ.get("WRITER_ADDRESS")
+AUTHKEY = os.environ.get("WRITER_AUTHKEY", "").encode() or None
+
+WRITES = counter("db_writer_calls_total", "Write-function calls by where they ran.", ("function", "route"))
+
+# name -> local implementation, filled in by @single_writer as database.py is imported
+WRITE_FUNCTIONS = {}
+
+_serving = False
+_local = threading.local()
+
+
+def use_writer(address, authkey=None):
+    """Send writes to the writer at `address` from now on (None = write locally)."""
+    global WRITER_ADDRESS, AUTHKEY
+    WRITER_ADDRESS = address
+    if authkey:
+        AUTHKEY = authkey.encode()
+    _local.__dict__.clear()
+
+
+def _client():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        if not AUTHKEY:
+            raise OSError("WRITER_AUTHKEY is not set")
+        conn = _local.conn = Client(WRITER_ADDRESS, family="AF_UNIX", authkey=AUTHKEY)
+    return conn
+
+
+def _drop_client():
+    conn = getattr(_local, "conn", None)
+    _local.conn = None
+    if conn is not None:
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+
+def single_writer(fn):
+    """Run `fn` in the writer process when one is configured."""
+    WRITE_FUNCTIONS[fn.__name__] = fn
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _serving or not WRITER_ADDRESS:
+            return fn(*args, **kwargs)
+        try:
+            conn = _client()
+            conn.send((fn.__name__, args, kwargs))
+        except OSError as e:
+            # Nothing was sent, so running here can't apply the write twice
+            _drop_client()
+            print(f"writer: {WRITER_ADDRESS} unreachable, writing locally – {e}", file=sys.stderr)
+            WRITES.inc(function=fn.__name__, route="local")
+            return fn(*args, **kwargs)
+        try:
+            ok, value = conn.recv()
+        except (OSError, EOFError):
+            # The writer may or may not have committed; let the caller decide
+            _drop_client()
+            raise
+        WRITES.inc(function=fn.__name__, route="writer")
+        if not ok:
+            raise value
+        return value
+    return wrapper
+
+
+def _handle(conn, lock):
+    with conn:
+        while True:
+            try:
+                name, args, kwargs = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                fn = WRITE_FUNCTIONS.get(name)
+                if fn is None:
+                    raise ValueError(f"{name} is not a write function")
+                with lock:
+                    reply = (True, fn(*args, **kwargs))
+            except Exception as e:
+                reply = (False, e)
+            try:
+                conn.send(reply)
+            except Exception as e:  # e.g. an exception that doesn't pickle
+                conn.send((False, RuntimeError(f"{name}: {e!r}")))
+
+
+def serve(address=None):
+    """Accept connections forever, running one write at a time."""
+    global _serving
+    import database  # noqa: F401 – registers the write functions
+
+    address = address or WRITER_ADDRESS
+    if not address:
+        sys.exit("writer: set WRITER_ADDRESS to a socket path")
+    if not AUTHKEY:
+        sys.exit("writer: set WRITER_AUTHKEY to a secret shared with the app processes")
+    _serving = True
+    if os.path.exists(address):
+        os.unlink(address)
+    lock = threading.Lock()
+    metrics.start_http_server()  # write-side counters (bookings, lock retries) are recorded here
+    umask = os.umask(0o177)  # the socket is born 0600, with no window before a chmod
+    try:
+        listener = Listener(address, family="AF_UNIX", authkey=AUTHKEY)
+    finally:
+        os.umask(umask)
+    with listener:
+        print(f"writer: serving {len(WRITE_FUNCTIONS)} write functions on {address}", file=sys.stderr)
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError, AuthenticationError) as e:  # failed handshake; keep serving
+                print(f"writer: rejected connection – {e}", file=sys.stderr)
+                continue
+            threading.Thread(target=_handle, args=(conn, lock), daemon=True).start()
+
+
+class WriterProcess(subprocess.Popen):
+    """The writer's Popen, plus the authkey its clients need (see use_writer)."""
+
+    authkey = None
+
+
+def spawn(address, env=None, timeout=10.0):
+    """Start `python writer.py serve address` and wait until it accepts connections.
+
+    The socket's directory must be private (0700, as tempfile.mkdtemp makes
+    it). Without WRITER_AUTHKEY in `env` a fresh key is generated. Returns a
+    WriterProcess.
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "writer.py")
+    mode = os.stat(os.path.dirname(os.path.abspath(address))).st_mode
+    if stat.S_IMODE(mode) & 0o077:
+        raise RuntimeError(f"writer: {os.path.dirname(address)} is mode {stat.S_IMODE(mode):o}; "
+                           "the socket needs a directory only its owner can use (0700)")
+    env = dict(os.environ if env is None else env)
+    env["WRITER_AUTHKEY"] = env.get("WRITER_AUTHKEY") or secrets.token_hex(16)
+    if os.path.exists(address):
+        os.unlink(address)
+    proc = WriterProcess([sys.executable, script, "serve", address], env=env)
+    proc.authkey = env["WRITER_AUTHKEY"]
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(address):
+        if proc.poll() is not None or time.monotonic() > deadline:
+            proc.kill()
+            raise RuntimeError(f"writer did not start on {address}")
+        time.sleep(0.05)
+    return proc
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "serve":
+        sys.exit("usage: python writer.py serve [address]")
+    import writer  # run under the module name database.py registers with, not __main__
+    writer.serve(sys.argv[2] if len(sys.argv) > 2 else None)